@@ -1,21 +1,275 @@
 # import the required libraries 
 import os, sys
-from flask import Flask, request, jsonify, render_template
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed
+from flask import Flask, Response, request, jsonify, render_template, g
 # add the path to the backend models
 backend_dir = os.path.abspath("backend")
 sys.path.append(backend_dir)
-from inference import get_text_from_lip_reading, get_text_from_stt, classify_input
+from inference import get_text_from_lip_reading, get_text_from_stt, classify_input, SIMILARITY_THRESHOLD
+from inference import decoding_profiles, TRANSCRIPTION_PROFILES, warmup_whisper, warmup_lip_reading
 from preprocessing import preprocess_video
-from inference_image import predict_image
+from inference_image import predict_image, predict_images, load_image, IMAGE_MODEL, warmup_image
+from jobs import create_job_backend, QueueFullError, DONE, FAILED
+from scratch import make_scratch_dir, remove_scratch_dir, scratch_dir
+from result_cache import ResultCache, hash_file, hash_bytes, cache_key
+from segments import video_duration, plan_windows, cut_segment, aggregate_segments, is_silent
+from triage import run_triage, TriageError
+from warmup import ModelRegistry, READY
+from metrics import MetricsRegistry, SIZE_BUCKETS, model_load_seconds
+import settings
 
 # define the paths to the tools for preprocessing 
 face_predictor_path = "models/shape_predictor_68_face_landmarks.dat"
 mean_face_path = "models/20words_mean_face.npy"
-# define the path to save the mouth roi video after preprocessing
-mouth_roi_path = "mouth_roi/roi.mp4"
+# define the folder to save the mouth roi videos after preprocessing (only with SAVE_MOUTH_ROI, for debugging)
+mouth_roi_dir = "mouth_roi"
 
-# create a Flask app
+# create a Flask app and load the configuration from backend/settings.py
 app = Flask(__name__)
+app.config.from_object(settings)
+
+# background job backend running the video pipeline for the /jobs routes
+job_backend = create_job_backend(app.config["JOB_BACKEND"], workers=app.config["JOB_WORKERS"],
+                                 max_pending=app.config["JOB_QUEUE_SIZE"], ttl=app.config["JOB_TTL"])
+
+# cache of the results of already analysed uploads
+result_cache = ResultCache(app.config["RESULT_CACHE_SIZE"], app.config["RESULT_CACHE_DB"] or None)
+
+# load state of the models, warmed up at startup (see create_app) and reported by /readyz
+model_registry = ModelRegistry({"image": warmup_image, "whisper": warmup_whisper, "lip_reading": warmup_lip_reading})
+
+# metrics of the process exported by /metrics in the Prometheus text format
+metrics = MetricsRegistry()
+request_count = metrics.counter("fake_reveal_requests_total", "Requests by endpoint, method and status code",
+                                ["endpoint", "method", "status"])
+request_seconds = metrics.histogram("fake_reveal_request_seconds", "Latency of the requests by endpoint", ["endpoint"])
+requests_in_flight = metrics.gauge("fake_reveal_requests_in_flight", "Requests being processed")
+upload_bytes = metrics.histogram("fake_reveal_upload_bytes", "Size of the request bodies by endpoint", ["endpoint"],
+                                 buckets=SIZE_BUCKETS)
+stage_seconds = metrics.histogram("fake_reveal_stage_seconds", "Latency of the stages of the pipelines", ["stage"])
+roi_frames = metrics.histogram("fake_reveal_roi_frames", "Frames of the mouth roi given to the lip reading model",
+                               buckets=(25, 50, 100, 250, 500, 1000, 2500, 5000, 10000))
+model_ready = metrics.gauge("fake_reveal_model_ready", "1 when the model finished its startup warmup", ["model"])
+model_warmup_seconds = metrics.gauge("fake_reveal_model_warmup_seconds", "Seconds spent loading and warming up the model",
+                                     ["model"])
+# load times recorded by the backend loaders (warmup or first use)
+metrics.register(model_load_seconds)
+cache_hits = metrics.counter("fake_reveal_result_cache_hits_total", "Lookups answered by the result cache")
+cache_misses = metrics.counter("fake_reveal_result_cache_misses_total", "Lookups not found in the result cache")
+cache_entries = metrics.gauge("fake_reveal_result_cache_entries", "Results kept in memory by the result cache")
+
+# function to copy the state of the models and the result cache counters into the metrics before an export
+def collect_metrics():
+    for name, model in model_registry.status().items():
+        model_ready.set(int(model["state"] == READY), model=name)
+        if model["warmup_seconds"] is not None:
+            model_warmup_seconds.set(model["warmup_seconds"], model=name)
+    stats = result_cache.stats()
+    cache_hits.set_total(stats["hits"])
+    cache_misses.set_total(stats["misses"])
+    cache_entries.set(stats["entries"])
+
+metrics.add_collector(collect_metrics)
+
+# function to run one stage of a pipeline and record its latency in stage_seconds
+def timed_stage(stage, function, *args, **kwargs):
+    with stage_seconds.time(stage=stage):
+        return function(*args, **kwargs)
+
+# function to return the route of the request (the metric label, e.g. /jobs/<job_id>), unknown routes share one name
+def request_endpoint():
+    return request.url_rule.rule if request.url_rule else "unknown"
+
+# record the start of every request: in-flight requests and size of the upload
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    requests_in_flight.inc()
+    if request.content_length:
+        upload_bytes.observe(request.content_length, endpoint=request_endpoint())
+
+# record the status code and the latency of every request
+@app.after_request
+def record_request_metrics(response):
+    request_count.inc(endpoint=request_endpoint(), method=request.method, status=response.status_code)
+    request_seconds.observe(time.perf_counter() - g.request_start, endpoint=request_endpoint())
+    return response
+
+# the request is no longer in flight once it is torn down, also when it failed
+@app.teardown_request
+def end_request_metrics(error=None):
+    requests_in_flight.dec()
+
+# settings of app.config passed to preprocess_video that change the mouth roi (part of the video cache keys)
+ROI_CACHE_SETTINGS = ("PREPROCESS_STREAMING", "FACE_DETECT_EVERY", "FACE_TRACK_MIN_CONFIDENCE",
+                      "FACE_DETECT_WIDTH", "FACE_DETECT_UPSAMPLE", "ROI_MAX_GAP")
+
+"""
+function to return the version of the models, settings and thresholds behind a video result (part of the cache keys)
+every value is read from where the pipeline reads it: the preprocessing settings from app.config
+(see run_lip_reading_branch), the model settings from the backend settings module (see backend/inference.py)
+"""
+def video_cache_version(decoding_profile, transcription_profile):
+    roi = "_".join(str(app.config[name]) for name in ROI_CACHE_SETTINGS)
+    lip_reading = "int8" if settings.LIP_READING_QUANTIZE else "fp32"
+    lip_reading += f"_{decoding_profile}"
+    if decoding_profile == "adaptive":
+        lip_reading += f"_{settings.LIP_ADAPTIVE_MIN_SCORE}"
+    speech = f"{settings.WHISPER_MODEL}_{transcription_profile}"
+    if transcription_profile != "default":
+        speech += f"_{settings.WHISPER_LANGUAGE}"
+    if settings.WHISPER_VAD:
+        speech += "_vad"
+    return (f"{app.config['RESULT_CACHE_VERSION']}-roi_{roi}-lip_{lip_reading}"
+            f"-whisper_{speech}-threshold_{SIMILARITY_THRESHOLD}")
+
+# function to return the version of the model behind an image result (part of the cache keys),
+# the backend and decode size are read from the backend settings module like backend/inference_image.py does
+def image_cache_version():
+    return (f"{app.config['RESULT_CACHE_VERSION']}-{IMAGE_MODEL}-{settings.IMAGE_BACKEND}"
+            f"-decode_{settings.IMAGE_DECODE_SIZE}")
+
+# executor running the speech-to-text branch next to the lip reading branch
+branch_executor = ThreadPoolExecutor(thread_name_prefix="stt-branch")
+# executor running the windows of the segmented analysis
+segment_executor = ThreadPoolExecutor(max_workers=app.config["SEGMENT_WORKERS"], thread_name_prefix="segment")
+
+# function to preprocess the video and get text from lip reading model
+def run_lip_reading_branch(video_path, decoding_profile=None):
+    # the mouth roi is returned in memory and written to disk only for debugging
+    roi_output_path = None
+    if app.config["SAVE_MOUTH_ROI"]:
+        roi_output_path = os.path.join(mouth_roi_dir, f"roi_{uuid.uuid4().hex[:8]}.mp4")
+    rois = timed_stage("preprocess_video", preprocess_video, video_path, roi_output_path,
+                       face_predictor_path, mean_face_path,
+                       streaming=app.config["PREPROCESS_STREAMING"],
+                       detect_every=app.config["FACE_DETECT_EVERY"],
+                       track_min_confidence=app.config["FACE_TRACK_MIN_CONFIDENCE"],
+                       workers=app.config["LANDMARK_WORKERS"],
+                       chunk_size=app.config["LANDMARK_CHUNK_SIZE"],
+                       max_detect_width=app.config["FACE_DETECT_WIDTH"],
+                       detect_upsample=app.config["FACE_DETECT_UPSAMPLE"],
+                       max_gap=app.config["ROI_MAX_GAP"])
+    if rois is not None:
+        roi_frames.observe(len(rois))
+    return timed_stage("lip_reading", get_text_from_lip_reading, rois, profile=decoding_profile)
+
+"""
+function to run the video deepfake detection pipeline on a saved video and return the result
+with CONCURRENT_BRANCHES the speech-to-text branch (which only needs the video) runs next to
+face preprocessing and lip reading, and both are joined for the classification
+decoding_profile is the decoding profile of the lip reading model (defaults to LIP_DECODING_PROFILE)
+transcription_profile is the transcription profile of the speech-to-text model (defaults to WHISPER_PROFILE)
+"""
+def run_video_pipeline(video_path, decoding_profile=None, transcription_profile=None):
+    if app.config["CONCURRENT_BRANCHES"]:
+        # both branches share the torch threads of the process (see configure_torch_threads in backend/inference.py)
+        stt_future = branch_executor.submit(timed_stage, "stt", get_text_from_stt, video_path,
+                                            profile=transcription_profile)
+        try:
+            lip_text = run_lip_reading_branch(video_path, decoding_profile=decoding_profile)
+        except Exception:
+            # do not leave the speech-to-text branch reading a video that is about to be removed
+            if not stt_future.cancel():
+                wait([stt_future])
+            raise
+        audio_text = stt_future.result()
+    else:
+        lip_text = run_lip_reading_branch(video_path, decoding_profile=decoding_profile)
+        # get text from speech-to-text model
+        audio_text = timed_stage("stt", get_text_from_stt, video_path, profile=transcription_profile)
+
+    # compare similarity
+    similarity, label = timed_stage("classify_input", classify_input, lip_text, audio_text)
+    return {
+        "label": label,
+        "score": f"{similarity:.2f}",
+        "lip_reading_text": lip_text,
+        "speech_text": audio_text,
+    }
+
+# function to run the cheap triage checks on a video when TRIAGE_ENABLED, raises TriageError for a useless upload
+def triage_video(video_path, max_duration=None):
+    if not app.config["TRIAGE_ENABLED"]:
+        return None
+    return timed_stage("triage", run_triage, video_path,
+                       min_duration=app.config["TRIAGE_MIN_DURATION"],
+                       max_duration=max_duration,
+                       min_height=app.config["TRIAGE_MIN_HEIGHT"],
+                       face_samples=app.config["TRIAGE_FACE_SAMPLES"],
+                       min_face_ratio=app.config["TRIAGE_MIN_FACE_RATIO"],
+                       min_speech_seconds=app.config["TRIAGE_MIN_SPEECH_SECONDS"])
+
+# function to return the cached result of a video with the same content, or triage the video,
+# run the pipeline and cache its result
+# max_duration is the longest accepted video in seconds (defaults to TRIAGE_MAX_DURATION, 0 accepts any length)
+def run_cached_video_pipeline(video_path, decoding_profile=None, transcription_profile=None, max_duration=None):
+    decoding_profile = decoding_profile or app.config["LIP_DECODING_PROFILE"]
+    transcription_profile = transcription_profile or app.config["WHISPER_PROFILE"]
+    key = cache_key("video", video_cache_version(decoding_profile, transcription_profile), hash_file(video_path))
+    result = result_cache.get(key)
+    if result is None:
+        triage_video(video_path, app.config["TRIAGE_MAX_DURATION"] if max_duration is None else max_duration)
+        result = run_video_pipeline(video_path, decoding_profile, transcription_profile)
+        result_cache.put(key, result)
+    return result
+
+# function to cut one window out of the video and run the pipeline on it, errors (and windows without speech) are reported in the segment
+def run_segment(video_path, start, end, workdir, decoding_profile=None, transcription_profile=None):
+    segment = {"start": round(start, 2), "end": round(end, 2)}
+    segment_path = os.path.join(workdir, f"segment_{start:.2f}.mp4")
+    try:
+        timed_stage("cut_segment", cut_segment, video_path, start, end, segment_path)
+        segment.update(run_video_pipeline(segment_path, decoding_profile, transcription_profile))
+        # an empty text is a pause of the speaker, not a mismatch: the window is not analysed
+        if is_silent(segment):
+            del segment["label"], segment["score"]
+            segment["error"] = "No speech to compare in this window"
+    except Exception as e:
+        segment["error"] = str(e)
+    finally:
+        if os.path.exists(segment_path):
+            os.remove(segment_path)
+    return segment
+
+"""
+function to analyse the overlapping windows of a video in parallel (SEGMENT_WORKERS at a time)
+it yields every segment as soon as it is done, so the results can be streamed back
+the windows not started yet are cancelled when the generator is closed early
+"""
+def iter_segments(video_path, workdir, decoding_profile=None, transcription_profile=None):
+    windows = plan_windows(video_duration(video_path), app.config["SEGMENT_SECONDS"], app.config["SEGMENT_OVERLAP"])
+    futures = [segment_executor.submit(run_segment, video_path, start, end, workdir,
+                                       decoding_profile, transcription_profile) for start, end in windows]
+    try:
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+# function to return the verdict of the whole video from its windows (see aggregate_segments in backend/segments.py)
+def segments_verdict(segments):
+    return aggregate_segments(segments, threshold=SIMILARITY_THRESHOLD,
+                              min_run=app.config["SEGMENT_FAKE_RUN"],
+                              min_share=app.config["SEGMENT_FAKE_SHARE"],
+                              margin=app.config["SEGMENT_FAKE_MARGIN"])
+
+# function to read a profile name from the request form field
+# returns None (the server default) when missing, and raises ValueError for an unknown profile
+def requested_profile(field, available):
+    profile = request.form.get(field)
+    if profile and profile not in available:
+        raise ValueError(f"Unknown {field} '{profile}', available: {', '.join(available)}")
+    return profile or None
+
+# function to read the decoding profile (lip reading) and the transcription profile (speech-to-text) of a request
+def requested_profiles():
+    return (requested_profile("decoding_profile", decoding_profiles()),
+            requested_profile("transcription_profile", list(TRANSCRIPTION_PROFILES)))
 
 # define the route for using video deepfake detection model
 @app.route('/predict_video', methods=['POST'])
@@ -29,39 +283,144 @@ def predict_video():
 
     # get the video file from the request 
     video_file = request.files["video"]
+    try:
+        profiles = requested_profiles()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # save the video in a scratch directory of this request, it is removed with the directory
+    with scratch_dir(app.config["SCRATCH_ROOT"]) as workdir:
+        video_path = os.path.join(workdir, "video.mp4")
+        try:
+            video_file.save(video_path)
+            # run the lip reading and speech-to-text models and compare their texts
+            # format the result as a JSON object
+            result = jsonify(run_cached_video_pipeline(video_path, *profiles))
+            # add header to the response
+            result.headers.add("Access-Control-Allow-Origin", "*")
+            # return the result 
+            return result
+        # the video can not give a useful result (no face, no speech...)
+        except TriageError as e:
+            return jsonify({"error": str(e), "status": e.status}), 422
+        # handle exceptions
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
 
-    # save temporary video file
-    video_path = "uploads/temp_video.mp4"
-    video_file.save(video_path)
+# define the route for the segmented analysis of long videos: a timeline of per-window results and the verdict
+# with the "stream" form field the segments are sent as NDJSON lines as soon as they are done
+@app.route('/predict_video_segments', methods=['POST'])
+def predict_video_segments():
+    # check for unsupported file types and return an error
+    if request.mimetype != 'multipart/form-data':
+        return jsonify({"error": "Unsupported Media Type"}), 415
+    # check if no video was uploaded and return an error
+    if "video" not in request.files:
+        return jsonify({"error": "No video file uploaded"}), 400
     try:
-        # preprocess the video and get text from lip reading model
-        preprocess_video(video_path, mouth_roi_path, face_predictor_path, mean_face_path)
-        lip_text = get_text_from_lip_reading(mouth_roi_path)
+        profiles = requested_profiles()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        # get text from speech-to-text model
-        audio_text = get_text_from_stt(video_path)
+    # the scratch directory lives until the last segment is done (also when streaming)
+    workdir = make_scratch_dir(app.config["SCRATCH_ROOT"])
+    video_path = os.path.join(workdir, "video.mp4")
+    try:
+        request.files["video"].save(video_path)
+        # long videos are expected here, only their content is checked
+        triage_video(video_path)
+    except TriageError as e:
+        remove_scratch_dir(workdir)
+        return jsonify({"error": str(e), "status": e.status}), 422
+    except Exception as e:
+        remove_scratch_dir(workdir)
+        return jsonify({"error": str(e)}), 500
 
-        # compare similarity
-        similarity, label = classify_input(lip_text, audio_text)
+    if request.form.get("stream", "").lower() in ("1", "true", "yes", "on"):
+        def generate():
+            try:
+                segments = []
+                for segment in iter_segments(video_path, workdir, *profiles):
+                    segments.append(segment)
+                    yield json.dumps(dict(segment, type="segment")) + "\n"
+                yield json.dumps(dict(segments_verdict(segments), type="verdict")) + "\n"
+            except Exception as e:
+                yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+            finally:
+                remove_scratch_dir(workdir)
+        return Response(generate(), mimetype="application/x-ndjson",
+                        headers={"Access-Control-Allow-Origin": "*"})
 
-        # format the result as a JSON object
-        result = jsonify({
-            "label": label,
-            "score": f"{similarity:.2f}",
-            "lip_reading_text": lip_text,
-            "speech_text": audio_text,
-        })
-        # add header to the response
+    try:
+        segments = sorted(iter_segments(video_path, workdir, *profiles), key=lambda segment: segment["start"])
+        result = jsonify(dict(segments_verdict(segments), segments=segments))
         result.headers.add("Access-Control-Allow-Origin", "*")
-        # return the result 
         return result
-    # handle exceptions
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    # remove the temporary video file
     finally:
-        if os.path.exists(video_path):
-            os.remove(video_path)
+        remove_scratch_dir(workdir)
+
+# define the route to submit a video to the background workers, it returns the job id right away
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    # check for unsupported file types and return an error
+    if request.mimetype != 'multipart/form-data':
+        return jsonify({"error": "Unsupported Media Type"}), 415
+    # check if no video was uploaded and return an error
+    if "video" not in request.files:
+        return jsonify({"error": "No video file uploaded"}), 400
+
+    try:
+        profiles = requested_profiles()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # save the video in a scratch directory of the job, it is removed when the job has finished
+    workdir = make_scratch_dir(app.config["SCRATCH_ROOT"], prefix="job_")
+    video_path = os.path.join(workdir, "video.mp4")
+    try:
+        request.files["video"].save(video_path)
+        # the jobs are meant for long videos, they have their own maximum duration
+        job_id = job_backend.submit(run_cached_video_pipeline, video_path, *profiles,
+                                    app.config["TRIAGE_JOB_MAX_DURATION"], cleanup=lambda: remove_scratch_dir(workdir))
+    except QueueFullError as e:
+        remove_scratch_dir(workdir)
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        remove_scratch_dir(workdir)
+        return jsonify({"error": str(e)}), 500
+
+    result = jsonify({"job_id": job_id, "status": "queued"})
+    result.headers.add("Location", f"/jobs/{job_id}")
+    result.headers.add("Access-Control-Allow-Origin", "*")
+    return result, 202
+
+# define the route to get the status and the result of a job
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_backend.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    response = {"job_id": job_id, "status": job["status"]}
+    if job["status"] == DONE:
+        response["result"] = job["result"]
+    elif job["status"] == FAILED:
+        response["error"] = job["error"]
+        # the reason of a rejected video (same status as the 422 of /predict_video)
+        if "error_status" in job:
+            response["error_status"] = job["error_status"]
+    result = jsonify(response)
+    result.headers.add("Access-Control-Allow-Origin", "*")
+    return result
+
+# function to format the label and the score of the image model
+def image_result(label, score):
+    return {
+        "label": label,
+        "score": f"{score*100:.2f}"
+    }
 
 @app.route('/predict_image', methods=['POST'])
 def predict_image_output():
@@ -74,24 +433,21 @@ def predict_image_output():
     if "image" not in request.files:
         return jsonify({"error": "No image file uploaded"}), 400
 
-    # Initialize path to None for safe cleanup in case of early error
-    image_path = None
     try:
-        # get the image file from the request 
-        image_file = request.files["image"]
-
-        # save temporary image file
-        image_path = "uploads/temp_image.jpg"
-        image_file.save(image_path)
+        # read the image from the request, it is decoded in memory without saving it to disk
+        image_bytes = request.files["image"].read()
 
-        # get the results from the image deepfake detection model
-        label, score = predict_image(image_path)
+        # look up the result of an image with the same content first
+        key = cache_key("image", image_cache_version(), hash_bytes(image_bytes))
+        response = result_cache.get(key)
+        if response is None:
+            # get the results from the image deepfake detection model
+            label, score = timed_stage("predict_image", predict_image, image_bytes)
+            response = image_result(label, score)
+            result_cache.put(key, response)
 
         # format the result as a JSON object
-        result = jsonify({
-                    "label": label,
-                    "score": f"{score*100:.2f}"
-                })
+        result = jsonify(response)
         # add header to the response
         result.headers.add("Access-Control-Allow-Origin", "*")
 
@@ -99,23 +455,101 @@ def predict_image_output():
         return result
 
     except Exception as e:
-        # Handle internal errors (e.g., model crash, file save error)
+        # Handle internal errors (e.g., model crash, corrupted image)
         print(f"Internal error during image prediction: {e}")
         return jsonify({"error": str(e)}), 500
-    finally:
-        # remove temporary image file even if an error occurred (Cleanup guarantee)
-        if image_path and os.path.exists(image_path):
-            os.remove(image_path)
-                
+
+# define the route for using image deepfake detection model on many images at once
+@app.route('/predict_images', methods=['POST'])
+def predict_images_output():
+    # check for unsupported file types and return an error
+    if request.mimetype != 'multipart/form-data':
+        return jsonify({"error": "Unsupported Media Type"}), 415
+    # get the image files from the request, and return an error if there are none
+    image_files = request.files.getlist("images")
+    if not image_files:
+        return jsonify({"error": "No image files uploaded"}), 400
+    # every image of the request is held in memory, so their number is limited
+    if len(image_files) > app.config["IMAGE_MAX_FILES"]:
+        return jsonify({"error": f"Too many images, at most {app.config['IMAGE_MAX_FILES']} per request"}), 413
+
+    try:
+        # read the images and look up the cached results
+        keys, responses, pending = [], [], []
+        for i, image_file in enumerate(image_files):
+            image_bytes = image_file.read()
+            keys.append(cache_key("image", image_cache_version(), hash_bytes(image_bytes)))
+            responses.append(result_cache.get(keys[i]))
+            if responses[i] is None:
+                # decode every image on its own, a corrupt file only fails its own result
+                try:
+                    pending.append((i, load_image(image_bytes)))
+                except Exception as e:
+                    responses[i] = {"error": f"The image could not be decoded: {e}"}
+
+        # run the decoded images that are not cached through the model in batches
+        predictions = timed_stage("predict_images", predict_images, [image for _, image in pending],
+                                  batch_size=app.config["IMAGE_BATCH_SIZE"])
+        for (i, _), (label, score) in zip(pending, predictions):
+            responses[i] = image_result(label, score)
+            result_cache.put(keys[i], responses[i])
+
+        # format the results as a JSON object, in the order of the uploaded images
+        result = jsonify({"results": [dict(response, filename=image_file.filename)
+                                      for image_file, response in zip(image_files, responses)]})
+        # add header to the response
+        result.headers.add("Access-Control-Allow-Origin", "*")
+        return result
+
+    except Exception as e:
+        print(f"Internal error during image prediction: {e}")
+        return jsonify({"error": str(e)}), 500
+
+# define the route to get the hit/miss counters of the result cache
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(result_cache.stats())
+
+# define the route exporting the metrics in the Prometheus text format
+@app.route('/metrics', methods=['GET'])
+def metrics_output():
+    return Response(metrics.render(), content_type=MetricsRegistry.CONTENT_TYPE)
+
+# define the liveness route: the process is up and answers requests
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify({"status": "ok"})
+
+# define the readiness route: 200 once the preloaded models are warm, 503 while they load or when one failed
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    ready = model_registry.ready()
+    return jsonify({"ready": ready, "models": model_registry.status()}), 200 if ready else 503
 
 # define the main route to the website
 @app.route("/", methods=["GET"])
 def root():
     return render_template('index.html')
 
+# function to return the names of the models to warm up at startup (settings.PRELOAD_MODELS)
+def preload_models():
+    return [name.strip() for name in app.config["PRELOAD_MODELS"].split(",") if name.strip()]
+
+"""
+function to return the app, with preload the models of PRELOAD_MODELS are loaded and warmed up
+in the background (defaults to true when PRELOAD_MODELS is not empty), /readyz returns 200 once they are done
+"""
+def create_app(preload=None):
+    models = preload_models()
+    if preload is None:
+        preload = bool(models)
+    if preload and models:
+        model_registry.start_warmup(models)
+    return app
+
 # run the app
 if __name__ == "__main__":
-    app.run(debug=True)
-
-def create_app():
-    return app
\ No newline at end of file
+    # the debug reloader runs the app in a child process (WERKZEUG_RUN_MAIN is set there),
+    # the models are only warmed up in that process and not in the watching one
+    create_app(preload=None if os.environ.get("WERKZEUG_RUN_MAIN") == "true" else False)
+    app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,55 @@
+# light audio helpers (no model imports): decode the audio track of a video and find its voiced parts
+import subprocess
+import numpy as np
+
+# sample rate of the decoded audio (the rate expected by Whisper)
+SAMPLE_RATE = 16000
+
+# function to decode the audio track of a media file to mono float32 samples in [-1, 1] with ffmpeg
+def load_audio(path, sample_rate=SAMPLE_RATE):
+    cmd = ["ffmpeg", "-nostdin", "-threads", "0", "-i", path,
+           "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "-"]
+    try:
+        out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to load audio: {e.stderr.decode(errors='ignore')}") from e
+    return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+
+# function to return the energy in dB of consecutive frames of frame_ms milliseconds
+def frame_energy_db(audio, sample_rate=SAMPLE_RATE, frame_ms=30):
+    frame_length = max(1, int(sample_rate * frame_ms / 1000))
+    num_frames = len(audio) // frame_length
+    if num_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = audio[:num_frames * frame_length].reshape(num_frames, frame_length)
+    return 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+
+"""
+function to find the voiced frames of an audio signal with a simple energy voice activity detection
+a frame is voiced when it is at most threshold_db below the loudest frame and above min_db (absolute silence),
+returns a boolean mask with one value per frame of frame_ms milliseconds
+"""
+def voiced_frames(audio, sample_rate=SAMPLE_RATE, frame_ms=30, threshold_db=35, min_db=-60):
+    energy = frame_energy_db(audio, sample_rate, frame_ms)
+    if len(energy) == 0:
+        return np.zeros(0, dtype=bool)
+    return (energy > energy.max() - threshold_db) & (energy > min_db)
+
+"""
+function to remove the silent spans of an audio signal before transcription
+the voiced frames are padded by pad_ms on both sides so the words are not clipped,
+returns the concatenated voiced samples (empty if nothing is voiced)
+"""
+def trim_silence(audio, sample_rate=SAMPLE_RATE, frame_ms=30, threshold_db=35, min_db=-60, pad_ms=200):
+    voiced = voiced_frames(audio, sample_rate, frame_ms, threshold_db, min_db)
+    if not voiced.any():
+        return audio[:0]
+    # widen the voiced frames by the padding
+    pad = int(np.ceil(pad_ms / frame_ms))
+    if pad:
+        voiced = np.convolve(voiced.astype(np.int32), np.ones(2 * pad + 1, dtype=np.int32), mode="same") > 0
+    frame_length = max(1, int(sample_rate * frame_ms / 1000))
+    mask = np.repeat(voiced, frame_length)
+    # the last partial frame follows the last full frame
+    mask = np.concatenate([mask, np.full(len(audio) - len(mask), voiced[-1])])
+    return audio[mask]
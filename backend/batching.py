@@ -0,0 +1,62 @@
+# micro-batching of concurrent calls into one batched call
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+"""
+micro-batching scheduler in front of a batched function
+submit() is called concurrently by many threads with one item each, a background thread
+collects the items for up to max_wait seconds (or until max_batch items are waiting),
+calls function(items) once with the whole batch and hands every caller its own result
+function must return one result per item, in the same order
+"""
+class MicroBatcher:
+    def __init__(self, function, max_batch=16, max_wait=0.005):
+        self.function = function
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+        self.worker = None
+        self.lock = threading.Lock()
+
+    # function to run item in the next batch and wait for its result (the exception of the batch is raised again)
+    def submit(self, item):
+        future = Future()
+        self._start()
+        self.queue.put((item, future))
+        return future.result()
+
+    # function to start the batching thread on the first call (so importing the module starts no thread)
+    def _start(self):
+        with self.lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self._loop, name="micro-batcher", daemon=True)
+                self.worker.start()
+
+    # function to collect the next batch: block for the first item, then wait at most max_wait for more
+    def _next_batch(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                results = list(self.function([item for item, _ in batch]))
+                if len(results) != len(batch):
+                    raise RuntimeError(f"Expected {len(batch)} results from the batched call, got {len(results)}")
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
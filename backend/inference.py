@@ -1,74 +1,292 @@
 # import the required libraries for lip reading model
 import cv2, os, sys
-import tempfile
+import threading
 from argparse import Namespace
+from collections import namedtuple
+import numpy as np
 # add the avhubert repository path to the system path --required for the following imports--
 repo_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "av_hubert/avhubert")
 sys.path.append(repo_path)
-import fairseq
-from fairseq import checkpoint_utils, options, tasks, utils
-from fairseq.dataclass.configs import GenerationConfig
-import whisper # import speech-to-text model
 from difflib import SequenceMatcher # import the function to calculate sentence similarity
+from audio import load_audio, trim_silence
+from lazy_import import LazyModule
+from metrics import model_load_seconds
+import settings
 
-if len(sys.argv) == 1:
-    # Append a dummy argument to avoid model duplication error
-    sys.argv.append("dummy_arg_to_prevent_error")
-
-# function to run the inference code on the lip reading model
-def predict(video_path, ckpt_path, user_dir):
-  num_frames = int(cv2.VideoCapture(video_path).get(cv2.CAP_PROP_FRAME_COUNT))
-  data_dir = tempfile.mkdtemp()
-  tsv_cont = ["\n", f"test-0\t{video_path}\t{None}\t{num_frames}\t{int(16_000*num_frames/25)}\n"]
-  label_cont = ["DUMMY\n"]
-  with open(f"{data_dir}/test.tsv", "w") as fo:
-    fo.write("".join(tsv_cont))
-  with open(f"{data_dir}/test.wrd", "w") as fo:
-    fo.write("".join(label_cont))
-  utils.import_user_module(Namespace(user_dir=user_dir))
-  modalities = ["video"]
-  gen_subset = "test"
-  gen_cfg = GenerationConfig(beam=20)
-  models, saved_cfg, task = checkpoint_utils.load_model_ensemble_and_task([ckpt_path])
-  models = [model.eval().cpu() for model in models]
-  saved_cfg.task.modalities = modalities
-  saved_cfg.task.data = data_dir
-  saved_cfg.task.label_dir = data_dir
-  task = tasks.setup_task(saved_cfg.task)
-  task.load_dataset(gen_subset, task_cfg=saved_cfg.task)
-  generator = task.build_generator(models, gen_cfg)
-
-  def decode_fn(x):
-      dictionary = task.target_dictionary
-      symbols_ignore = generator.symbols_to_strip_from_output
-      symbols_ignore.add(dictionary.pad())
-      return task.datasets[gen_subset].label_processors[0].decode(x, symbols_ignore)
-
-  itr = task.get_batch_iterator(dataset=task.dataset(gen_subset)).next_epoch_itr(shuffle=False)
-  sample = next(itr)
-  #sample = utils.move_to_cuda(sample)
-  hypos = task.inference_step(generator, models, sample)
-  ref = decode_fn(sample['target'][0].int().cpu())
-  hypo = hypos[0][0]['tokens'].int().cpu()
-  hypo = decode_fn(hypo)
-  return hypo
-
-# function to return the text output of the lip reading model
-def get_text_from_lip_reading(roi_path):
-    mouth_roi_path, ckpt_path = roi_path, "models/finetune-model.pt" # checkpoint of the finetune model
+# function called right before fairseq is imported by the lip reading loader
+def prepare_fairseq():
+    if len(sys.argv) == 1:
+        # Append a dummy argument to avoid model duplication error
+        sys.argv.append("dummy_arg_to_prevent_error")
+
+# the heavy libraries are imported on the first use (see backend/lazy_import.py)
+torch = LazyModule("torch")
+checkpoint_utils = LazyModule("fairseq.checkpoint_utils", setup=prepare_fairseq)
+tasks = LazyModule("fairseq.tasks", setup=prepare_fairseq)
+utils = LazyModule("fairseq.utils", setup=prepare_fairseq)
+fairseq_configs = LazyModule("fairseq.dataclass.configs", setup=prepare_fairseq)
+whisper = LazyModule("whisper") # speech-to-text model
+
+# handle to a loaded lip reading model: the ensemble, its config, the task and its beam search generators (one per beam size)
+LipReadingModel = namedtuple("LipReadingModel", ["models", "cfg", "task", "generators"])
+
+# decoding profiles of the lip reading model: beam size of the search
+# "adaptive" decodes with the fast profile and decodes again with the accurate one when the hypothesis score is low
+DECODING_PROFILES = {
+    "fast": 1,
+    "balanced": 5,
+    "accurate": 20,
+}
+ADAPTIVE_PROFILE = "adaptive"
+
+# process-wide registry of the loaded lip reading models, one entry per (checkpoint, user_dir, quantize)
+_lip_reading_models = {}
+_lip_reading_lock = threading.Lock()
+
+# function to apply dynamic int8 quantization to the Linear layers of the lip reading models (CPU only)
+def quantize_lip_reading_models(models):
+    return [torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8) for model in models]
+
+# function to return the path of the cached quantized copy of a checkpoint
+def quantized_cache_path(ckpt_path):
+    return os.path.splitext(ckpt_path)[0] + ".int8.pt"
+
+"""
+function to load the models, the config and the task state of a lip reading checkpoint
+with quantize the models are quantized to int8, and with settings.LIP_READING_QUANTIZED_CACHE the
+quantized models are saved next to the checkpoint so the next starts skip the fp32 load and the quantization
+(the cache is rebuilt when the checkpoint is newer)
+"""
+def load_lip_reading_checkpoint(ckpt_path, quantize=False):
+    cache_path = quantized_cache_path(ckpt_path) if quantize and settings.LIP_READING_QUANTIZED_CACHE else None
+    if cache_path and os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(ckpt_path):
+        cached = torch.load(cache_path, weights_only=False)
+        return cached["models"], cached["cfg"], cached["task_state"]
+
+    models, saved_cfg, loaded_task = checkpoint_utils.load_model_ensemble_and_task([ckpt_path])
+    models = [model.eval().cpu() for model in models]
+    task_state = loaded_task.state_dict()
+    if quantize:
+        models = quantize_lip_reading_models(models)
+        if cache_path:
+            torch.save({"models": models, "cfg": saved_cfg, "task_state": task_state}, cache_path)
+    return models, saved_cfg, task_state
+
+"""
+function to set the torch threads of the process once, before the first model is loaded
+torch.set_num_threads is process-wide, so the lip reading and speech-to-text branches share one setting:
+settings.TORCH_THREADS, or half of the cores when the two branches run concurrently (each running operation uses
+that many threads, so both branches together use about all the cores), 0 keeps the torch default
+"""
+_torch_threads_configured = False
+_torch_threads_lock = threading.Lock()
+
+def configure_torch_threads():
+    global _torch_threads_configured
+    with _torch_threads_lock:
+        if _torch_threads_configured:
+            return
+        num_threads = settings.TORCH_THREADS
+        if not num_threads and settings.CONCURRENT_BRANCHES:
+            num_threads = max(1, (os.cpu_count() or 2) // 2)
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        _torch_threads_configured = True
+
+# function to load the lip reading model once and keep it warm for the next requests
+# quantize selects the int8 models (defaults to settings.LIP_READING_QUANTIZE)
+def load_lip_reading_model(ckpt_path, user_dir, quantize=None):
+    quantize = settings.LIP_READING_QUANTIZE if quantize is None else quantize
+    key = (os.path.abspath(ckpt_path), os.path.abspath(user_dir), quantize)
+    with _lip_reading_lock:
+        if key not in _lip_reading_models:
+            configure_torch_threads()
+            with model_load_seconds.time(model="lip_reading"):
+                utils.import_user_module(Namespace(user_dir=user_dir))
+                models, saved_cfg, task_state = load_lip_reading_checkpoint(ckpt_path, quantize)
+                saved_cfg.task.modalities = ["video"]
+                task = tasks.setup_task(saved_cfg.task)
+                # keep the dictionary and tokenizer stored in the checkpoint, no label directory is needed
+                task.load_state_dict(task_state)
+            _lip_reading_models[key] = LipReadingModel(models, saved_cfg, task, {})
+        return _lip_reading_models[key]
+
+# function to get the beam search generator of a loaded model for a beam size (built once per beam size)
+def get_generator(model, beam):
+    with _lip_reading_lock:
+        if beam not in model.generators:
+            model.generators[beam] = model.task.build_generator(model.models, fairseq_configs.GenerationConfig(beam=beam))
+        return model.generators[beam]
+
+# function to read a mouth roi video into an array of grayscale frames (T, H, W)
+def load_roi_frames(video_path):
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    cap.release()
+    if not frames:
+        raise ValueError(f"No frames could be read from '{video_path}'")
+    return np.stack(frames)
+
+"""
+function to build the input sample of the lip reading model from in-memory roi frames,
+it applies the same transform as the avhubert dataset (scale to [0, 1], center crop, normalize)
+and the same layout as its collater: video of shape (B, C, T, H, W) plus the padding mask
+"""
+def build_lip_reading_sample(frames, task_cfg):
+    frames = np.asarray(frames, dtype=np.float32) / 255.0
+    _, height, width = frames.shape
+    crop = task_cfg.image_crop_size
+    top, left = int(round(height - crop) / 2.), int(round(width - crop) / 2.)
+    frames = frames[:, top:top + crop, left:left + crop]
+    frames = (frames - task_cfg.image_mean) / task_cfg.image_std
+    video = torch.from_numpy(frames.astype(np.float32))[None, None]
+    padding_mask = torch.zeros((1, video.shape[2]), dtype=torch.bool)
+    return {
+        "id": torch.LongTensor([0]),
+        "net_input": {"source": {"audio": None, "video": video}, "padding_mask": padding_mask},
+    }
+
+# function to return the names of the decoding profiles accepted by predict_frames
+def decoding_profiles():
+    return list(DECODING_PROFILES) + [ADAPTIVE_PROFILE]
+
+"""
+function to run the lip reading model on an in-memory array of grayscale roi frames (T, H, W)
+quantize selects the int8 models (defaults to settings.LIP_READING_QUANTIZE)
+profile is the name of the decoding profile (defaults to settings.LIP_DECODING_PROFILE)
+"""
+def predict_frames(frames, ckpt_path, user_dir, quantize=None, profile=None):
+    profile = profile or settings.LIP_DECODING_PROFILE
+    if profile not in decoding_profiles():
+        raise ValueError(f"Unknown decoding profile '{profile}', available: {', '.join(decoding_profiles())}")
+    if len(frames) == 0:
+        raise ValueError("The mouth roi has no frames")
+    # get the warm model from the registry (loaded on the first call only)
+    model = load_lip_reading_model(ckpt_path, user_dir, quantize)
+    sample = build_lip_reading_sample(frames, model.cfg.task)
+
+    def decode(beam):
+        generator = get_generator(model, beam)
+        hypos = model.task.inference_step(generator, model.models, sample)
+        return hypos[0][0], generator
+
+    def decode_fn(x, generator):
+        dictionary = model.task.target_dictionary
+        symbols_ignore = generator.symbols_to_strip_from_output
+        symbols_ignore.add(dictionary.pad())
+        # same decoding as the label processor of the avhubert dataset
+        text = dictionary.string(x, extra_symbols_to_ignore=symbols_ignore)
+        if model.task.s2s_tokenizer:
+            text = model.task.s2s_tokenizer.decode(text)
+        return text
+
+    if profile == ADAPTIVE_PROFILE:
+        # widen the beam only when the greedy hypothesis is unsure (low mean log-probability per token)
+        hypo, generator = decode(DECODING_PROFILES["fast"])
+        if float(hypo["score"]) < settings.LIP_ADAPTIVE_MIN_SCORE:
+            hypo, generator = decode(DECODING_PROFILES["accurate"])
+    else:
+        hypo, generator = decode(DECODING_PROFILES[profile])
+    return decode_fn(hypo['tokens'].int().cpu(), generator)
+
+# function to run the inference code on the lip reading model (path based wrapper of predict_frames)
+def predict(video_path, ckpt_path, user_dir, quantize=None, profile=None):
+    frames = load_roi_frames(video_path)
+    return predict_frames(frames, ckpt_path, user_dir, quantize, profile)
+
+"""
+function to return the text output of the lip reading model
+roi is either the path to the mouth roi video or the in-memory array of grayscale roi frames (T, H, W)
+profile is the name of the decoding profile (defaults to settings.LIP_DECODING_PROFILE)
+"""
+def get_text_from_lip_reading(roi, profile=None):
+    ckpt_path = "models/finetune-model.pt" # checkpoint of the finetune model
     user_dir = "av_hubert/avhubert" # the directory to the model
-    hypo = predict(mouth_roi_path, ckpt_path, user_dir)
+    if isinstance(roi, str):
+        hypo = predict(roi, ckpt_path, user_dir, profile=profile)
+    else:
+        hypo = predict_frames(roi, ckpt_path, user_dir, profile=profile)
     return hypo
 
-# function to get text output of the speech-to-text model
-def get_text_from_stt(video_path):
-   # load the model
-   model = whisper.load_model("medium") 
+# function to load the lip reading model ahead of the first request and run it once on a blank mouth roi
+def warmup_lip_reading(num_frames=25):
+    get_text_from_lip_reading(np.zeros((num_frames, 96, 96), dtype=np.uint8))
+
+# process-wide cache of the loaded Whisper models, one entry per model size
+_whisper_models = {}
+_whisper_lock = threading.Lock()
+
+# function to load the Whisper model once per process (the size defaults to settings.WHISPER_MODEL)
+def load_whisper_model(model_name=None):
+    model_name = model_name or settings.WHISPER_MODEL
+    with _whisper_lock:
+        if model_name not in _whisper_models:
+            configure_torch_threads()
+            with model_load_seconds.time(model="whisper"):
+                _whisper_models[model_name] = whisper.load_model(model_name)
+        return _whisper_models[model_name]
+
+# function to load the Whisper model ahead of the first request and run it once on a second of silence
+def warmup_whisper(model_name=None):
+    model = load_whisper_model(model_name)
+    model.transcribe(np.zeros(whisper.audio.SAMPLE_RATE, dtype=np.float32), fp16=False)
+    return model
+
+# transcription profiles of the Whisper model (keyword arguments of model.transcribe)
+# "default" keeps the Whisper defaults: language detection, beam settings and temperature fallback retries
+# "fast" decodes greedily in fp32 without fallback retries, in the fixed language settings.WHISPER_LANGUAGE
+TRANSCRIPTION_PROFILES = {
+   "default": {},
+   "fast": {
+      "temperature": 0.0,
+      "beam_size": None,
+      "best_of": None,
+      "compression_ratio_threshold": None,
+      "logprob_threshold": None,
+      "condition_on_previous_text": False,
+      "fp16": False,
+   },
+}
+
+# function to return the transcribe options of a transcription profile
+def transcription_options(profile):
+   if profile not in TRANSCRIPTION_PROFILES:
+      raise ValueError(f"Unknown transcription profile '{profile}', available: {', '.join(TRANSCRIPTION_PROFILES)}")
+   options = dict(TRANSCRIPTION_PROFILES[profile])
+   # the non default profiles skip the language detection
+   if options and settings.WHISPER_LANGUAGE:
+      options["language"] = settings.WHISPER_LANGUAGE
+   return options
+
+"""
+function to get text output of the speech-to-text model
+profile is the name of the transcription profile (defaults to settings.WHISPER_PROFILE)
+with vad (defaults to settings.WHISPER_VAD) the silent spans are removed before the transcription
+"""
+def get_text_from_stt(video_path, profile=None, vad=None):
+   options = transcription_options(profile or settings.WHISPER_PROFILE)
+   vad = settings.WHISPER_VAD if vad is None else vad
+   audio = video_path
+   if vad:
+      audio = trim_silence(load_audio(video_path))
+      # nothing to transcribe in a silent video
+      if len(audio) == 0:
+         return ""
+   # get the cached model (loaded on the first call only)
+   model = load_whisper_model()
    # transcribe the audio
-   result = model.transcribe(video_path)
+   result = model.transcribe(audio, **options)
    # return the text result
    return result["text"]
 
+# similarity (in percent) above which the lip reading and speech texts are considered a match
+SIMILARITY_THRESHOLD = 50
+
 """
 function to calculate the similarity between text from lip reading model
 and text from speech-to-text model
@@ -76,7 +294,7 @@ and text from speech-to-text model
 def classify_input(lip_reading_text, stt_text):
     similarity = SequenceMatcher(None, lip_reading_text, stt_text).ratio() * 100
     # classify the result as Real/Fake
-    if similarity > 50: label = "Real"  
+    if similarity > SIMILARITY_THRESHOLD: label = "Real"  
     else: 
       label = "Fake" 
       similarity = 100 - similarity
@@ -1,20 +1,101 @@
-from transformers.utils import logging
-logging.set_verbosity_error() # to ignore unnecessary warnings
+import io
+import threading
+from PIL import Image
+from batching import MicroBatcher
+from metrics import model_load_seconds
+import settings
 
-from transformers import pipeline
+# deepfake image detection model
+IMAGE_MODEL = "dima806/deepfake_vs_real_image_detection"
 
-# load deepfake image detection model
-detector = pipeline("image-classification", model="dima806/deepfake_vs_real_image_detection")
+# function to build a transformers pipeline, transformers is imported on the first call
+def pipeline(*args, **kwargs):
+    from transformers import pipeline as transformers_pipeline
+    from transformers.utils import logging
+    logging.set_verbosity_error() # to ignore unnecessary warnings
+    return transformers_pipeline(*args, **kwargs)
 
+if settings.IMAGE_BACKEND not in ("pytorch", "onnx", "onnx-int8"):
+    raise ValueError(f"Unknown image backend '{settings.IMAGE_BACKEND}', use pytorch, onnx or onnx-int8")
+
+# deepfake image detection model, loaded by the first prediction (or by load_detector at startup)
+detector = None
+_detector_lock = threading.Lock()
+
+"""
+function to load the deepfake image detection model once and return it,
+with IMAGE_BACKEND onnx or onnx-int8 the model runs with ONNX Runtime instead of PyTorch (see backend/onnx_image.py)
+"""
+def load_detector():
+    global detector
+    if detector is not None:
+        return detector
+    with _detector_lock:
+        if detector is None:
+            with model_load_seconds.time(model="image"):
+                if settings.IMAGE_BACKEND == "pytorch":
+                    detector = pipeline("image-classification", model=IMAGE_MODEL)
+                else:
+                    # the PyTorch model is only loaded when the ONNX export does not exist yet
+                    from onnx_image import load_onnx_detector
+                    detector = load_onnx_detector(IMAGE_MODEL, settings.ONNX_MODEL_DIR,
+                                                  quantize=settings.IMAGE_BACKEND == "onnx-int8",
+                                                  num_threads=settings.IMAGE_THREADS)
+    return detector
+
+# function to load the image model ahead of the first request and run it once on a blank image
+def warmup_image():
+    load_detector()([Image.new("RGB", (224, 224))], batch_size=1)
+
+"""
+function to decode an image given as a path, raw bytes or a PIL image
+large JPEGs are decoded at a reduced size (draft mode) close to decode_size,
+the model resizes its input to 224x224 anyway
 """
-function to use deepfake image detection model on input image
+def load_image(image, decode_size=None):
+    if isinstance(image, Image.Image):
+        return image
+    decode_size = settings.IMAGE_DECODE_SIZE if decode_size is None else decode_size
+    if isinstance(image, (bytes, bytearray)):
+        image = io.BytesIO(image)
+    image = Image.open(image)
+    # only JPEG supports draft mode, it is ignored by the other formats
+    if decode_size:
+        image.draft("RGB", (decode_size, decode_size))
+    return image.convert("RGB")
+
+"""
+function to use deepfake image detection model on input image (a path, raw bytes or a PIL image)
 returns the label(Real/Fake), and the confidence score
+with IMAGE_MICRO_BATCH the concurrent calls are grouped into one batched forward pass
 """
-def predict_image(image_path):
+def predict_image(image):
+    # decode the image in the calling thread
+    image = load_image(image)
+    if settings.IMAGE_MICRO_BATCH:
+        return image_batcher.submit(image)
     # store the result of the model
-    results = detector(image_path)
+    results = load_detector()(image)
     # divide into label and score
     label = results[0]['label']
     score = results[0]['score']
     # return the results
     return label, score
+
+
+"""
+function to use deepfake image detection model on a list of input images (paths, raw bytes or PIL images)
+the images go through the model batch_size at a time, which is much faster than one call per image
+returns a list of (label, score) in the order of the input images
+"""
+def predict_images(images, batch_size=8):
+    if not images:
+        return []
+    results = load_detector()([load_image(image) for image in images], batch_size=batch_size)
+    # keep the top prediction of every image
+    return [(result[0]['label'], result[0]['score']) for result in results]
+
+# scheduler grouping the concurrent predict_image calls into batches of predict_images
+image_batcher = MicroBatcher(lambda images: predict_images(images, batch_size=len(images)),
+                             max_batch=settings.IMAGE_MICRO_BATCH_SIZE,
+                             max_wait=settings.IMAGE_MICRO_BATCH_WAIT_MS / 1000)
@@ -0,0 +1,101 @@
+# in-process job queue running the long video pipeline in the background
+import abc
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# states of a job
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# exception raised when no more jobs can be accepted
+class QueueFullError(Exception):
+    pass
+
+"""
+base class of the job backends
+a backend runs the submitted jobs and keeps their status and result,
+a new backend (for example one backed by a shared queue) only needs submit() and get(),
+a backend missing one of them can not be created
+"""
+class JobBackend(abc.ABC):
+    # function to queue function(*args) and return the id of the new job,
+    # cleanup is called once the job has finished (successfully or not)
+    @abc.abstractmethod
+    def submit(self, function, *args, cleanup=None):
+        pass
+
+    # function to return the job as a dict (id, status, result or error, timestamps), None if unknown
+    @abc.abstractmethod
+    def get(self, job_id):
+        pass
+
+"""
+local backend: a bounded pool of worker threads inside the API process
+at most max_pending jobs can be queued or running at the same time,
+finished jobs are kept for ttl seconds so their result can be fetched
+"""
+class LocalJobBackend(JobBackend):
+    def __init__(self, workers=1, max_pending=16, ttl=3600):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job-worker")
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, function, *args, cleanup=None):
+        with self.lock:
+            self._expire()
+            active = sum(1 for job in self.jobs.values() if job["status"] in (QUEUED, RUNNING))
+            if active >= self.max_pending:
+                raise QueueFullError("The job queue is full, try again later")
+            job_id = uuid.uuid4().hex
+            self.jobs[job_id] = {"id": job_id, "status": QUEUED, "submitted_at": time.time()}
+        self.executor.submit(self._run, job_id, function, args, cleanup)
+        return job_id
+
+    def get(self, job_id):
+        with self.lock:
+            self._expire()
+            job = self.jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    # function to run a job on a worker thread and record its result,
+    # the cleanup runs before the job is marked as finished
+    def _run(self, job_id, function, args, cleanup):
+        self._update(job_id, status=RUNNING, started_at=time.time())
+        try:
+            fields = {"status": DONE, "result": function(*args)}
+        except Exception as e:
+            fields = {"status": FAILED, "error": str(e)}
+            # keep the reason of the errors that carry one (e.g. the status of a TriageError)
+            if getattr(e, "status", None) is not None:
+                fields["error_status"] = e.status
+        finally:
+            if cleanup is not None:
+                cleanup()
+        self._update(job_id, finished_at=time.time(), **fields)
+
+    # function to update the fields of a job
+    def _update(self, job_id, **fields):
+        with self.lock:
+            self.jobs[job_id].update(fields)
+
+    # function to forget the jobs that finished more than ttl seconds ago (the lock must be held)
+    def _expire(self):
+        now = time.time()
+        expired = [job_id for job_id, job in self.jobs.items()
+                   if "finished_at" in job and now - job["finished_at"] > self.ttl]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+# available job backends, selected with settings.JOB_BACKEND
+JOB_BACKENDS = {
+    "local": LocalJobBackend,
+}
+
+# function to create the job backend with the given name
+def create_job_backend(name, **kwargs):
+    if name not in JOB_BACKENDS:
+        raise ValueError(f"Unknown job backend '{name}', available: {', '.join(JOB_BACKENDS)}")
+    return JOB_BACKENDS[name](**kwargs)
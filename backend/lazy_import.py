@@ -0,0 +1,57 @@
+# lazy imports of the heavy libraries (torch, fairseq, whisper, dlib, ...), so importing the API stays fast
+# and the libraries are only loaded by the first request (or the preload step) that needs them
+import importlib
+import threading
+import types
+
+"""
+proxy of a module imported on the first attribute access,
+submodules are imported together with the module (e.g. LazyModule("skvideo", "skvideo.io") gives skvideo.io.vread),
+setup is called once right before the import
+getting, setting and deleting attributes go to the real module, so unittest.mock.patch works through the proxy
+"""
+class LazyModule(types.ModuleType):
+    def __init__(self, name, *submodules, setup=None):
+        super().__init__(name)
+        object.__setattr__(self, "_lazy_submodules", submodules)
+        object.__setattr__(self, "_lazy_setup", setup)
+        object.__setattr__(self, "_lazy_module", None)
+        object.__setattr__(self, "_lazy_lock", threading.Lock())
+
+    # function to import the module on the first use and return it
+    def _load(self):
+        module = object.__getattribute__(self, "_lazy_module")
+        if module is not None:
+            return module
+        with object.__getattribute__(self, "_lazy_lock"):
+            module = object.__getattribute__(self, "_lazy_module")
+            if module is None:
+                setup = object.__getattribute__(self, "_lazy_setup")
+                if setup is not None:
+                    setup()
+                module = importlib.import_module(self.__name__)
+                for submodule in object.__getattribute__(self, "_lazy_submodules"):
+                    importlib.import_module(submodule)
+                object.__setattr__(self, "_lazy_module", module)
+        return module
+
+    # true once the module was imported
+    @property
+    def loaded(self):
+        return object.__getattribute__(self, "_lazy_module") is not None
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+    def __delattr__(self, name):
+        delattr(self._load(), name)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<lazy module '{self.__name__}' ({state})>"
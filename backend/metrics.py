@@ -0,0 +1,190 @@
+# in-process metrics (counters, gauges, histograms) exported in the Prometheus text format, no external service needed
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# default buckets of the latency histograms in seconds, from a cached answer to a long video
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# default buckets of the size histograms in bytes, from 1KB to 1GB
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(11))
+
+# function to escape a label value (backslash, double quote and new line)
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+# function to format a sample value, integers are written without the decimal part
+def _format_value(value):
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+# function to format a sample line: name{label="value",...} value
+def _sample(name, labels, value):
+    if labels:
+        name += "{" + ",".join(f'{key}="{_escape(label)}"' for key, label in labels) + "}"
+    return f"{name} {_format_value(value)}"
+
+"""
+base class of the metrics, every metric holds one value per combination of its label values,
+the label values are given as keyword arguments (e.g. counter.inc(endpoint="predict_image"))
+"""
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    # function to return the label values as a key, the labels must be exactly the label names of the metric
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects the labels {', '.join(self.labelnames) or 'none'}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    # function to return the value of a label combination (0 before the first update)
+    def get(self, **labels):
+        with self.lock:
+            return self.values.get(self._key(labels), 0)
+
+    # function to return the sample lines of the metric
+    def samples(self):
+        with self.lock:
+            return [_sample(self.name, list(zip(self.labelnames, key)), value) for key, value in sorted(self.values.items())]
+
+    # function to return the metric in the Prometheus text format
+    def render(self):
+        return "\n".join([f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"] + self.samples())
+
+# counter: a value that only goes up (requests, errors...)
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("A counter can only be increased")
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    # function to copy a total counted elsewhere (e.g. the result cache stats), read by a collector before an export
+    def set_total(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+# gauge: a value that goes up and down (requests in flight, cache entries...)
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    # context manager to count the code running in the block
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+# histogram: the distribution of observed values (latencies, sizes...) in cumulative buckets
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            counts, total = self.values.get(key, ([0] * len(self.buckets), 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self.values[key] = (counts, total + value)
+
+    # function to return the number of observations of a label combination
+    def count(self, **labels):
+        with self.lock:
+            counts, _ = self.values.get(self._key(labels), ([0], 0))
+            return counts[-1]
+
+    # context manager to observe the seconds spent in the block, also when it raises
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        lines = []
+        with self.lock:
+            for key, (counts, total) in sorted(self.values.items()):
+                labels = list(zip(self.labelnames, key))
+                for bound, count in zip(self.buckets, counts):
+                    lines.append(_sample(self.name + "_bucket", labels + [("le", _format_value(bound))], count))
+                lines.append(_sample(self.name + "_sum", labels, total))
+                lines.append(_sample(self.name + "_count", labels, counts[-1]))
+        return lines
+
+"""
+registry of the metrics of the process,
+collectors are functions called on every export to update the metrics read from elsewhere (e.g. the cache stats)
+"""
+class MetricsRegistry:
+    # content type of the Prometheus text format
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []
+
+    # function to add a metric to the registry, the names are unique
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    # function to return every metric in the Prometheus text format
+    def render(self):
+        for collector in self.collectors:
+            collector()
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+# seconds spent loading each model, by the startup warmup or by its first use,
+# recorded by the backend modules and registered by the API in its own registry
+model_load_seconds = Histogram("fake_reveal_model_load_seconds", "Seconds spent loading the model", ["model"],
+                               buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600))
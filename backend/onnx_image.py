@@ -0,0 +1,92 @@
+# ONNX Runtime backend of the image deepfake detection model (CPU inference, optionally int8 quantized)
+import os
+import numpy as np
+
+# function to export the model of an image-classification pipeline to ONNX, the export is skipped if onnx_path exists
+def export_onnx_model(model, image_processor, onnx_path):
+    if os.path.exists(onnx_path):
+        return onnx_path
+    import torch
+
+    # export only the logits, with a dynamic batch dimension
+    class LogitsOnly(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, pixel_values):
+            return self.model(pixel_values=pixel_values).logits
+
+    size = image_processor.size
+    dummy = torch.zeros(1, 3, size["height"], size["width"])
+    os.makedirs(os.path.dirname(onnx_path) or ".", exist_ok=True)
+    with torch.no_grad():
+        torch.onnx.export(LogitsOnly(model.eval()), (dummy,), onnx_path,
+                          input_names=["pixel_values"], output_names=["logits"],
+                          dynamic_axes={"pixel_values": {0: "batch"}, "logits": {0: "batch"}},
+                          opset_version=17)
+    return onnx_path
+
+# function to write the int8 dynamic-quantized copy of an ONNX model, the quantization is skipped if int8_path exists
+def quantize_onnx_model(onnx_path, int8_path):
+    if os.path.exists(int8_path):
+        return int8_path
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QInt8)
+    return int8_path
+
+"""
+image classifier running an exported model with ONNX Runtime
+it is called like the transformers pipeline: one image returns the list of {"label", "score"}
+sorted by score, a list of images returns one such list per image
+the images are preprocessed by the image processor of the original pipeline
+"""
+class OnnxImageClassifier:
+    def __init__(self, model_path, image_processor, id2label, num_threads=0):
+        import onnxruntime
+        options = onnxruntime.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.image_processor = image_processor
+        self.id2label = id2label
+
+    def __call__(self, images, batch_size=8):
+        if not isinstance(images, list):
+            return self([images], batch_size=1)[0]
+        results = []
+        for start in range(0, len(images), batch_size):
+            batch = images[start:start + batch_size]
+            pixel_values = self.image_processor(images=batch, return_tensors="np")["pixel_values"]
+            logits = self.session.run(["logits"], {"pixel_values": pixel_values.astype(np.float32)})[0]
+            # softmax over the labels, like the pipeline
+            scores = np.exp(logits - logits.max(axis=1, keepdims=True))
+            scores /= scores.sum(axis=1, keepdims=True)
+            for image_scores in scores:
+                order = np.argsort(-image_scores)
+                results.append([{"label": self.id2label[int(i)], "score": float(image_scores[i])} for i in order])
+        return results
+
+"""
+function to build the ONNX Runtime classifier of the image-classification model model_name
+when the exported file is already in model_dir only the image processor and the labels are loaded,
+otherwise the PyTorch pipeline is built (or pipe is used when given) to export the model
+to model_dir (and to quantize it to int8 with quantize=True)
+"""
+def load_onnx_detector(model_name, model_dir, quantize=False, num_threads=0, pipe=None):
+    onnx_path = os.path.join(model_dir, "image_model.onnx")
+    int8_path = os.path.join(model_dir, "image_model.int8.onnx")
+    model_path = int8_path if quantize else onnx_path
+    if os.path.exists(model_path) and pipe is None:
+        # no PyTorch weights are loaded, only the preprocessing and the labels of the model
+        from transformers import AutoConfig, AutoImageProcessor
+        image_processor = AutoImageProcessor.from_pretrained(model_name)
+        id2label = AutoConfig.from_pretrained(model_name).id2label
+        return OnnxImageClassifier(model_path, image_processor, id2label, num_threads)
+    if pipe is None:
+        from transformers import pipeline
+        pipe = pipeline("image-classification", model=model_name)
+    model_path = export_onnx_model(pipe.model, pipe.image_processor, onnx_path)
+    if quantize:
+        model_path = quantize_onnx_model(model_path, int8_path)
+    return OnnxImageClassifier(model_path, pipe.image_processor, pipe.model.config.id2label, num_threads)
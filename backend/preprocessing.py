@@ -1,41 +1,334 @@
 # import the required libraries 
-import dlib, cv2, os, sys
+import cv2, os, sys
+import itertools
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-import skvideo
-import skvideo.io
 from tqdm import tqdm
-# add the avhubert repository path to the system path --required for the following import--
+from lazy_import import LazyModule
+# add the avhubert repository path to the system path --required for the align_mouth import--
 repo_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../av_hubert/avhubert")
 sys.path.append(repo_path)
-from preparation.align_mouth import landmarks_interpolate, crop_patch, write_video_ffmpeg
 
-# function to detect the facial landmarks
-def detect_landmark(image, detector, predictor):
-    gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
-    rects = detector(gray, 1)
+# the heavy libraries are imported on the first use (see backend/lazy_import.py)
+dlib = LazyModule("dlib")
+skvideo = LazyModule("skvideo", "skvideo.io")
+tf = LazyModule("skimage.transform")
+align_mouth = LazyModule("preparation.align_mouth")
+
+# function to crop the mouth patch of an aligned frame (align_mouth of the avhubert repository)
+def cut_patch(img, landmarks, height, width, threshold=5):
+    return align_mouth.cut_patch(img, landmarks, height, width, threshold)
+
+# function to write the mouth ROI frames to a video file (align_mouth of the avhubert repository)
+def write_video_ffmpeg(rois, target_path, ffmpeg):
+    return align_mouth.write_video_ffmpeg(rois, target_path, ffmpeg)
+
+# function to convert the 68 points of a dlib shape into a numpy array
+def shape_to_coords(shape):
+    coords = np.zeros((68, 2), dtype=np.int32)
+    for i in range(0, 68):
+        coords[i] = (shape.part(i).x, shape.part(i).y)
+    return coords
+
+# function to return the grayscale copy of an RGB frame (grayscale frames are returned as they are)
+def to_gray(image):
+    if image.ndim == 2:
+        return image
+    return cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+
+# function to convert a rectangle found on a scaled image back to full resolution coordinates
+def scale_rect(rect, scale):
+    return dlib.rectangle(int(round(rect.left() / scale)), int(round(rect.top() / scale)),
+                          int(round(rect.right() / scale)), int(round(rect.bottom() / scale)))
+
+"""
+function to detect the face rectangles in a grayscale frame,
+frames wider than max_detect_width are downscaled for the detector and the rectangles
+are mapped back to the full resolution frame (upsample is the number of detector upsampling passes)
+"""
+def detect_faces(gray, detector, max_detect_width=None, upsample=1):
+    height, width = gray.shape[:2]
+    if not max_detect_width or width <= max_detect_width:
+        return detector(gray, upsample)
+    scale = max_detect_width / width
+    small = cv2.resize(gray, (max_detect_width, max(1, int(round(height * scale)))), interpolation=cv2.INTER_AREA)
+    return [scale_rect(rect, scale) for rect in detector(small, upsample)]
+
+"""
+function to detect the facial landmarks
+the shape predictor always runs on the full resolution frame inside the face rectangle,
+so the landmarks are in original frame coordinates even when the face is detected on a downscaled copy
+"""
+def detect_landmark(image, detector, predictor, max_detect_width=None, upsample=1):
+    gray = to_gray(image)
+    rects = detect_faces(gray, detector, max_detect_width, upsample)
     coords = None
     for (_, rect) in enumerate(rects):
         shape = predictor(gray, rect)
-        coords = np.zeros((68, 2), dtype=np.int32)
-        for i in range(0, 68):
-            coords[i] = (shape.part(i).x, shape.part(i).y)
+        coords = shape_to_coords(shape)
     return coords
 
-# function to preprocess the video and extract the mouth roi
-def preprocess_video(input_video_path, output_video_path, face_predictor_path, mean_face_path):
-  detector = dlib.get_frontal_face_detector()
-  predictor = dlib.shape_predictor(face_predictor_path)
+"""
+class to get the facial landmarks frame by frame with detect-then-track:
+the full face detector runs every detect_every frames (or when the tracking confidence drops
+below min_confidence), in between the face box is followed with a dlib correlation tracker
+and only the shape predictor runs on the tracked box
+"""
+class FaceLandmarkTracker:
+    def __init__(self, detector, predictor, detect_every=5, min_confidence=7.0, max_detect_width=None, upsample=1):
+        self.detector = detector
+        self.predictor = predictor
+        self.detect_every = detect_every
+        self.min_confidence = min_confidence
+        self.max_detect_width = max_detect_width
+        self.upsample = upsample
+        self.tracker = None
+        self.tracked_frames = 0
+
+    # function to return the landmarks of the face in an RGB or grayscale frame (None if no face is found)
+    def __call__(self, image):
+        gray = to_gray(image)
+        rect = None
+        # follow the face box from the previous frames
+        if self.tracker is not None and self.tracked_frames < self.detect_every:
+            confidence = self.tracker.update(gray)
+            if confidence >= self.min_confidence:
+                position = self.tracker.get_position()
+                rect = dlib.rectangle(int(round(position.left())), int(round(position.top())),
+                                      int(round(position.right())), int(round(position.bottom())))
+                self.tracked_frames += 1
+        # run the full detector and restart tracking from the detected face
+        if rect is None:
+            rects = list(detect_faces(gray, self.detector, self.max_detect_width, self.upsample))
+            if not rects:
+                self.tracker = None
+                return None
+            # keep the last face, like detect_landmark()
+            rect = rects[-1]
+            self.tracker = dlib.correlation_tracker()
+            self.tracker.start_track(gray, rect)
+            self.tracked_frames = 1
+        return shape_to_coords(self.predictor(gray, rect))
+
+# function to yield every frame with its landmarks in order (detect-then-track when detect_every > 1)
+def iter_landmarks(frames, detector, predictor, detect_every=1, track_min_confidence=7.0,
+                   max_detect_width=None, upsample=1, progress=True):
+  if detect_every > 1:
+      tracker = FaceLandmarkTracker(detector, predictor, detect_every, track_min_confidence, max_detect_width, upsample)
+  for frame in (tqdm(frames) if progress else frames):
+      if detect_every > 1:
+          landmark = tracker(frame)
+      else:
+          landmark = detect_landmark(frame, detector, predictor, max_detect_width, upsample)
+      yield frame, landmark
+
+# function to detect the landmarks of every frame in order
+def extract_landmarks(frames, detector, predictor, **options):
+  return [landmark for _, landmark in iter_landmarks(frames, detector, predictor, **options)]
+
+# dlib models and options of the current worker process, built once by _init_landmark_worker()
+_worker_state = {}
+
+# function to build the dlib detector and predictor once in every worker process
+def _init_landmark_worker(face_predictor_path, options):
+    _worker_state["detector"] = dlib.get_frontal_face_detector()
+    _worker_state["predictor"] = dlib.shape_predictor(face_predictor_path)
+    _worker_state["options"] = options
+
+# function to detect the landmarks of a chunk of consecutive frames inside a worker process
+def _detect_landmark_chunk(frames):
+    return extract_landmarks(frames, _worker_state["detector"], _worker_state["predictor"],
+                             progress=False, **_worker_state["options"])
+
+"""
+class to detect the landmarks on a pool of worker processes,
+the frames are split into chunks of consecutive frames (so face tracking still works inside a chunk),
+at most 2 chunks per worker are in flight so streamed videos stay bounded in memory,
+and the landmarks are returned in frame order
+the options are the detection keyword arguments of extract_landmarks()
+"""
+class ParallelLandmarkExtractor:
+    def __init__(self, face_predictor_path, workers, chunk_size=32, **options):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        # spawn the workers, forking a process that already runs torch threads can deadlock
+        self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=_init_landmark_worker,
+                                        initargs=(face_predictor_path, options))
+
+    # function to yield every chunk of frames (an array or any iterable of frames) with its landmarks, in order
+    # the frames are pickled to the workers: pass grayscale frames, a third of the size of the RGB ones
+    def iter_chunks(self, frames):
+        iterator = iter(frames)
+        pending = deque()
+        while True:
+            chunk = list(itertools.islice(iterator, self.chunk_size))
+            if chunk:
+                pending.append((chunk, self.pool.submit(_detect_landmark_chunk, chunk)))
+            # collect the oldest chunk when the pool is full or the input is finished
+            while pending and (not chunk or len(pending) >= 2 * self.workers):
+                chunk_frames, future = pending.popleft()
+                yield chunk_frames, future.result()
+            if not chunk:
+                return
+
+    # function to return the landmarks of all frames
+    def extract(self, frames):
+        landmarks = []
+        for _, chunk_landmarks in self.iter_chunks(frames):
+            landmarks.extend(chunk_landmarks)
+        return landmarks
+
+    # function to stop the worker processes
+    def close(self):
+        self.pool.shutdown()
+
+# process-wide pools of landmark workers, kept alive so every worker builds its models only once
+_landmark_extractors = {}
+_landmark_extractors_lock = threading.Lock()
+
+# function to get the (cached) parallel landmark extractor for the given options
+def get_landmark_extractor(face_predictor_path, workers, chunk_size=32, **options):
+    key = (os.path.abspath(face_predictor_path), workers, chunk_size, tuple(sorted(options.items())))
+    with _landmark_extractors_lock:
+        if key not in _landmark_extractors:
+            _landmark_extractors[key] = ParallelLandmarkExtractor(face_predictor_path, workers, chunk_size, **options)
+        return _landmark_extractors[key]
+
+"""
+class to crop the mouth roi from frames that were already decoded (or streamed) for landmark detection,
+so the video is decoded only once. it follows crop_patch() of av_hubert frame by frame:
+- the landmarks of frames without a detected face are interpolated between the surrounding detections
+  (frames before the first / after the last detection keep the nearest detection)
+- the landmarks are smoothed over the next window_margin frames
+- every frame is aligned to the mean face with a similarity transform estimated on the stable points
+- the mouth patch is cut around the landmarks start_idx:stop_idx of the aligned frame
+at most max_gap frames wait for the next detection (None keeps all of them, exactly like
+landmarks_interpolate()), longer gaps keep the last detected landmarks so streaming stays bounded in memory
+"""
+class MouthRoiCropper:
+    def __init__(self, mean_face_landmarks, stable_points=(33, 36, 39, 42, 45), std_size=(256, 256),
+                 window_margin=12, start_idx=48, stop_idx=68, crop_height=96, crop_width=96, max_gap=None):
+        self.mean_face_stable = np.asarray(mean_face_landmarks, dtype=np.float64)[list(stable_points)]
+        self.stable_points = list(stable_points)
+        self.std_size = std_size
+        self.window_margin = window_margin
+        self.start_idx = start_idx
+        self.stop_idx = stop_idx
+        self.crop_height = crop_height
+        self.crop_width = crop_width
+        self.max_gap = max_gap
+        # frames waiting for the next detected landmarks
+        self.pending = deque()
+        self.last_landmarks = None
+        # frames (with their landmarks) waiting for the smoothing window to fill up
+        self.window = deque()
+        self.transform = None
+        self.rois = []
+
+    # function to add the next frame and its detected landmarks (None when no face was found)
+    def push(self, frame, landmarks):
+        if landmarks is None:
+            self.pending.append(frame)
+            if self.max_gap is not None and len(self.pending) > self.max_gap:
+                oldest = self.pending.popleft()
+                # no face so far: the frame can not be aligned, like the frames of a video without face
+                if self.last_landmarks is not None:
+                    self._add(oldest, self.last_landmarks)
+            return
+        landmarks = np.asarray(landmarks, dtype=np.float64)
+        if self.last_landmarks is None:
+            for pending_frame in self.pending:
+                self._add(pending_frame, landmarks)
+        else:
+            # linear interpolation between the last and the current detection
+            gap = len(self.pending) + 1
+            delta = landmarks - self.last_landmarks
+            for idx, pending_frame in enumerate(self.pending, start=1):
+                self._add(pending_frame, self.last_landmarks + idx / float(gap) * delta)
+        self.pending.clear()
+        self._add(frame, landmarks)
+        self.last_landmarks = landmarks
+
+    # function to crop the remaining frames and return the mouth roi (T, crop_height, crop_width)
+    def finish(self):
+        if self.last_landmarks is None:
+            raise ValueError("No face was detected in the video")
+        while self.pending:
+            self._add(self.pending.popleft(), self.last_landmarks)
+        # short videos never fill the window: smooth over all of their frames
+        if self.transform is None and self.window:
+            self.transform = self._estimate(np.mean([lmk for _, lmk in self.window], axis=0))
+        while self.window:
+            self._crop(*self.window.popleft())
+        return np.array(self.rois)
+
+    # function to add a frame with resolved landmarks to the smoothing window
+    def _add(self, frame, landmarks):
+        self.window.append((frame, landmarks))
+        if len(self.window) == self.window_margin:
+            self.transform = self._estimate(np.mean([lmk for _, lmk in self.window], axis=0))
+            self._crop(*self.window.popleft())
+
+    # function to estimate the affine matrix aligning the stable points to the mean face
+    def _estimate(self, smoothed_landmarks):
+        return tf.estimate_transform("similarity", smoothed_landmarks[self.stable_points], self.mean_face_stable).params[:2]
+
+    # function to align a frame to the mean face and cut the mouth patch
+    def _crop(self, frame, landmarks):
+        height, width = self.std_size
+        aligned = cv2.warpAffine(frame, self.transform, (width, height), flags=cv2.INTER_LINEAR)
+        aligned_landmarks = landmarks @ self.transform[:, :2].T + self.transform[:, 2]
+        self.rois.append(cut_patch(aligned, aligned_landmarks[self.start_idx:self.stop_idx],
+                                   self.crop_height // 2, self.crop_width // 2))
+
+# function to decode the video one frame at a time (RGB), so the whole clip is never held in memory
+def read_video_frames(video_path):
+  return skvideo.io.vreader(video_path)
+
+"""
+function to preprocess the video and extract the mouth roi, the video is decoded only once
+and the same frames are used for landmark detection and mouth cropping
+with streaming=True the frames are decoded one at a time and only a bounded number of frames is kept
+(max_gap frames without a face at most), otherwise the whole clip is decoded into memory first
+with detect_every > 1 the face detector runs every detect_every frames and the face is tracked in between
+with workers > 1 the landmarks are detected on a pool of worker processes
+with max_detect_width set, faces are detected on a copy downscaled to that width
+returns the mouth roi as an array of 96x96 grayscale frames (T, 96, 96),
+the roi is also written to output_video_path when it is set (for debugging)
+"""
+def preprocess_video(input_video_path, output_video_path, face_predictor_path, mean_face_path, streaming=False,
+                     detect_every=1, track_min_confidence=7.0, workers=1, chunk_size=32,
+                     max_detect_width=None, detect_upsample=1, max_gap=250):
   STD_SIZE = (256, 256)
   mean_face_landmarks = np.load(mean_face_path)
   stablePntsIDs = [33, 36, 39, 42, 45]
-  videogen = skvideo.io.vread(input_video_path)
-  frames = np.array([frame for frame in videogen])
-  landmarks = []
-  for frame in tqdm(frames):
-      landmark = detect_landmark(frame, detector, predictor)
-      landmarks.append(landmark)
-  preprocessed_landmarks = landmarks_interpolate(landmarks)
-  rois = crop_patch(input_video_path, preprocessed_landmarks, mean_face_landmarks, stablePntsIDs, STD_SIZE,
-                        window_margin=12, start_idx=48, stop_idx=68, crop_height=96, crop_width=96)
-  write_video_ffmpeg(rois, output_video_path, "ffmpeg")
-  return
+  if streaming:
+      frames = read_video_frames(input_video_path)
+  else:
+      frames = skvideo.io.vread(input_video_path)
+  # landmark detection and cropping only use grayscale: convert every frame once, as soon as it is decoded,
+  # so only the grayscale frames are sent to the workers and kept until they are cropped
+  frames = (to_gray(frame) for frame in frames)
+  options = dict(detect_every=detect_every, track_min_confidence=track_min_confidence,
+                 max_detect_width=max_detect_width, upsample=detect_upsample)
+  if workers > 1:
+      extractor = get_landmark_extractor(face_predictor_path, workers, chunk_size, **options)
+      frame_landmarks = ((frame, landmark) for chunk, chunk_landmarks in extractor.iter_chunks(frames)
+                         for frame, landmark in zip(chunk, chunk_landmarks))
+  else:
+      detector = dlib.get_frontal_face_detector()
+      predictor = dlib.shape_predictor(face_predictor_path)
+      frame_landmarks = iter_landmarks(frames, detector, predictor, **options)
+  cropper = MouthRoiCropper(mean_face_landmarks, stablePntsIDs, STD_SIZE, window_margin=12, start_idx=48, stop_idx=68,
+                            crop_height=96, crop_width=96, max_gap=max_gap if streaming else None)
+  # the lip reading model works on grayscale frames, crop from the grayscale frame
+  for frame, landmark in frame_landmarks:
+      cropper.push(to_gray(frame), landmark)
+  rois = cropper.finish()
+  if output_video_path:
+      write_video_ffmpeg(rois, output_video_path, "ffmpeg")
+  return rois
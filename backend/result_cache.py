@@ -0,0 +1,98 @@
+# cache of the results of already analysed uploads, keyed by the hash of their content
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# function to compute the sha256 of a file without reading it into memory at once
+def hash_file(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+# function to compute the sha256 of an upload already read into memory
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+"""
+in-memory LRU cache of results, optionally backed by a SQLite file that survives restarts
+the keys combine the content hash with the version of the models and thresholds behind the result
+(see cache_key), so a model change never returns a stale result
+the results must be JSON serializable to be stored in the database
+"""
+class ResultCache:
+    def __init__(self, max_entries=1024, db_path=None):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+        if db_path:
+            self.db = sqlite3.connect(db_path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT)")
+            self.db.commit()
+
+    # function to return the cached result of key, None on a miss
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            if self.db is not None:
+                row = self.db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._remember(key, value)
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    # function to store the result of key
+    def put(self, key, value):
+        with self.lock:
+            self._remember(key, value)
+            if self.db is not None:
+                self.db.execute("INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+                self.db.commit()
+
+    # function to return the hit/miss counters and the size of the cache
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "persistent": self.db is not None,
+            }
+
+    # function to empty the cache (including the database) and reset the counters
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+            if self.db is not None:
+                self.db.execute("DELETE FROM results")
+                self.db.commit()
+
+    # function to add an entry to the memory cache and evict the least recently used ones (the lock must be held)
+    def _remember(self, key, value):
+        if self.max_entries <= 0:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+# function to build the cache key of a content hash for the given kind of result and model version
+def cache_key(kind, version, content_hash):
+    return f"{kind}:{version}:{content_hash}"
@@ -0,0 +1,23 @@
+# per-request scratch directories, so concurrent requests never share (or overwrite) files
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+# function to create a new uniquely named scratch directory under root
+def make_scratch_dir(root, prefix="request_"):
+    os.makedirs(root, exist_ok=True)
+    return tempfile.mkdtemp(prefix=prefix, dir=root)
+
+# function to remove a scratch directory and everything written in it
+def remove_scratch_dir(path):
+    shutil.rmtree(path, ignore_errors=True)
+
+# function to use a scratch directory for the duration of a with block, it is always removed afterwards
+@contextmanager
+def scratch_dir(root, prefix="request_"):
+    path = make_scratch_dir(root, prefix)
+    try:
+        yield path
+    finally:
+        remove_scratch_dir(path)
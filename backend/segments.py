@@ -0,0 +1,96 @@
+# segmented analysis of long videos: split the video into overlapping windows and combine their results
+import subprocess
+import cv2
+
+# function to read the duration of a video in seconds
+def video_duration(video_path):
+    cap = cv2.VideoCapture(video_path)
+    num_frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+    if not fps or num_frames <= 0:
+        raise ValueError(f"Could not read the duration of '{video_path}'")
+    return num_frames / fps
+
+"""
+function to split a video of duration seconds into windows of window seconds overlapping by overlap seconds
+returns the list of (start, end) times, the last window ends at the end of the video
+a video shorter than one window gives a single window
+"""
+def plan_windows(duration, window=10.0, overlap=2.0):
+    if window <= overlap:
+        raise ValueError("The window must be longer than the overlap")
+    if duration <= window:
+        return [(0.0, duration)]
+    step = window - overlap
+    windows = []
+    start = 0.0
+    while start + window < duration:
+        windows.append((start, start + window))
+        start += step
+    windows.append((max(0.0, duration - window), duration))
+    return windows
+
+# function to cut the [start, end] window of a video into output_path with ffmpeg (re-encoded for exact cuts)
+def cut_segment(video_path, start, end, output_path):
+    cmd = ["ffmpeg", "-nostdin", "-y", "-loglevel", "error",
+           "-ss", f"{start:.3f}", "-i", video_path, "-t", f"{end - start:.3f}",
+           "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", output_path]
+    try:
+        subprocess.run(cmd, capture_output=True, check=True)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to cut the segment {start:.2f}-{end:.2f}s: {e.stderr.decode(errors='ignore')}") from e
+    return output_path
+
+# function to return the similarity of a window's lip reading and speech texts,
+# classify_input scores a Fake window with 100 - similarity (its confidence in Fake)
+def segment_similarity(segment):
+    score = float(segment["score"])
+    return 100 - score if segment["label"] == "Fake" else score
+
+# function to check if a window has no speech to compare (the speaker pauses): its lip reading or speech text is empty
+def is_silent(segment):
+    return any(field in segment and not (segment[field] or "").strip() for field in ("lip_reading_text", "speech_text"))
+
+"""
+function to combine the results of the windows into the verdict of the whole video
+a single window is judged on a few seconds of noisy lip reading, so one Fake window is not enough:
+a window is a Fake vote when its similarity is at least margin points under the threshold (borderline
+windows do not vote), and the video is Fake when min_run consecutive windows are Fake votes (they overlap, so
+the same section was seen twice) or when at least min_share of the analysed windows are Fake votes
+the score follows classify_input: the mean similarity of the windows behind the verdict (the windows that
+did not vote Fake for a Real video), or 100 minus the mean similarity of the Fake votes for a Fake video
+the windows that could not be analysed (with an "error") or without speech are skipped and break the runs
+"""
+def aggregate_segments(segments, threshold=50, min_run=2, min_share=0.5, margin=5.0):
+    segments = sorted(segments, key=lambda segment: segment.get("start", 0))
+    analysed, votes, others = [], [], []
+    run, longest_run = 0, 0
+    for segment in segments:
+        if "label" not in segment or is_silent(segment):
+            run = 0
+            continue
+        analysed.append(segment)
+        if segment_similarity(segment) <= threshold - margin:
+            votes.append(segment)
+            run += 1
+            longest_run = max(longest_run, run)
+        else:
+            others.append(segment)
+            run = 0
+    if not analysed:
+        raise ValueError("No segment of the video could be analysed")
+    fake = [segment for segment in analysed if segment["label"] == "Fake"]
+
+    is_fake = bool(votes) and (longest_run >= min_run or len(votes) / len(analysed) >= min_share)
+    decisive = votes if is_fake else others or analysed
+    similarity = sum(segment_similarity(segment) for segment in decisive) / len(decisive)
+    return {
+        "label": "Fake" if is_fake else "Real",
+        "score": f"{100 - similarity if is_fake else similarity:.2f}",
+        "fake_segments": len(fake),
+        "fake_votes": len(votes),
+        "longest_fake_run": longest_run,
+        "analysed_segments": len(analysed),
+        "total_segments": len(segments),
+    }
@@ -0,0 +1,139 @@
+# configuration of the backend models and the API
+# every value can be overridden with an environment variable named FAKE_REVEAL_<NAME>
+import os
+
+# function to read a configuration value from the environment
+def _env(name, default, cast=str):
+    value = os.environ.get(f"FAKE_REVEAL_{name}")
+    if value is None or value.strip() == "":
+        return default
+    if cast is bool:
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return cast(value)
+
+# --- speech-to-text model (Whisper) ---
+# model size to load: tiny, base, small or medium
+WHISPER_MODEL = _env("WHISPER_MODEL", "medium")
+
+# default transcription profile: default (Whisper defaults) or fast (fixed language, greedy, no fallback, fp32)
+WHISPER_PROFILE = _env("WHISPER_PROFILE", "default")
+# language of the speech for the fast profile (empty: detect the language)
+WHISPER_LANGUAGE = _env("WHISPER_LANGUAGE", "en")
+# remove the silent spans of the audio (energy voice activity detection) before the transcription
+WHISPER_VAD = _env("WHISPER_VAD", False, bool)
+
+# --- lip reading model (AV-HuBERT) ---
+# default decoding profile of the lip reading model: fast (beam 1), balanced (beam 5), accurate (beam 20)
+# or adaptive (fast, then accurate when the hypothesis score is below LIP_ADAPTIVE_MIN_SCORE)
+LIP_DECODING_PROFILE = _env("LIP_DECODING_PROFILE", "accurate")
+# mean log-probability per token under which the adaptive profile decodes again with the accurate beam
+LIP_ADAPTIVE_MIN_SCORE = _env("LIP_ADAPTIVE_MIN_SCORE", -1.0, float)
+# run the lip reading model with int8 dynamic quantization of its Linear layers (faster on CPU)
+LIP_READING_QUANTIZE = _env("LIP_READING_QUANTIZE", False, bool)
+# save the quantized model next to the checkpoint (<checkpoint>.int8.pt) to skip the quantization on the next starts
+LIP_READING_QUANTIZED_CACHE = _env("LIP_READING_QUANTIZED_CACHE", True, bool)
+
+# --- video pipeline ---
+# run the speech-to-text branch concurrently with face preprocessing and lip reading
+CONCURRENT_BRANCHES = _env("CONCURRENT_BRANCHES", True, bool)
+# number of torch threads of the process, shared by the lip reading and speech-to-text models and set once before
+# the first model is loaded (0 keeps the torch default, or half of the cores when the two branches run concurrently)
+TORCH_THREADS = _env("TORCH_THREADS", 0, int)
+
+# --- triage (cheap checks before the models) ---
+# reject the videos that can not give a useful result before running the models
+TRIAGE_ENABLED = _env("TRIAGE_ENABLED", True, bool)
+# accepted duration in seconds (TRIAGE_MAX_DURATION=0 accepts any length, longer videos fit /predict_video_segments)
+TRIAGE_MIN_DURATION = _env("TRIAGE_MIN_DURATION", 1.0, float)
+TRIAGE_MAX_DURATION = _env("TRIAGE_MAX_DURATION", 600.0, float)
+# longest video accepted by the background jobs in seconds (0 accepts any length, /jobs is meant for long videos)
+TRIAGE_JOB_MAX_DURATION = _env("TRIAGE_JOB_MAX_DURATION", 0.0, float)
+# smallest accepted side of the frames in pixels
+TRIAGE_MIN_HEIGHT = _env("TRIAGE_MIN_HEIGHT", 120, int)
+# frames sampled for the face check, and the fraction of them that must show a face
+TRIAGE_FACE_SAMPLES = _env("TRIAGE_FACE_SAMPLES", 5, int)
+TRIAGE_MIN_FACE_RATIO = _env("TRIAGE_MIN_FACE_RATIO", 0.4, float)
+# seconds of audible audio needed for the speech check
+TRIAGE_MIN_SPEECH_SECONDS = _env("TRIAGE_MIN_SPEECH_SECONDS", 0.5, float)
+
+# --- segmented analysis (/predict_video_segments) ---
+# length of the analysed windows in seconds
+SEGMENT_SECONDS = _env("SEGMENT_SECONDS", 10.0, float)
+# overlap between consecutive windows in seconds
+SEGMENT_OVERLAP = _env("SEGMENT_OVERLAP", 2.0, float)
+# number of windows analysed at the same time
+SEGMENT_WORKERS = _env("SEGMENT_WORKERS", 2, int)
+# verdict of the whole video: a window votes Fake when its similarity is at least SEGMENT_FAKE_MARGIN points under the
+# similarity threshold, and the video is Fake with SEGMENT_FAKE_RUN consecutive Fake votes
+# or when the Fake votes are at least SEGMENT_FAKE_SHARE of the analysed windows
+SEGMENT_FAKE_MARGIN = _env("SEGMENT_FAKE_MARGIN", 5.0, float)
+SEGMENT_FAKE_RUN = _env("SEGMENT_FAKE_RUN", 2, int)
+SEGMENT_FAKE_SHARE = _env("SEGMENT_FAKE_SHARE", 0.5, float)
+
+# --- image model ---
+# inference backend of the image model: pytorch (transformers pipeline), onnx or onnx-int8 (ONNX Runtime)
+IMAGE_BACKEND = _env("IMAGE_BACKEND", "pytorch")
+# folder of the exported ONNX models (exported on the first start with an onnx backend)
+ONNX_MODEL_DIR = _env("ONNX_MODEL_DIR", "models/onnx")
+# ONNX Runtime threads of the image model (0 lets ONNX Runtime decide)
+IMAGE_THREADS = _env("IMAGE_THREADS", 0, int)
+# number of images of a /predict_images request classified in one forward pass
+IMAGE_BATCH_SIZE = _env("IMAGE_BATCH_SIZE", 8, int)
+# maximum number of images in one /predict_images request (all of them are held in memory at once)
+IMAGE_MAX_FILES = _env("IMAGE_MAX_FILES", 64, int)
+# large JPEGs are decoded at a reduced size close to this many pixels per side (0 decodes the full image)
+IMAGE_DECODE_SIZE = _env("IMAGE_DECODE_SIZE", 448, int)
+# group the concurrent /predict_image requests into batched forward passes
+IMAGE_MICRO_BATCH = _env("IMAGE_MICRO_BATCH", True, bool)
+# maximum number of images in one micro-batch
+IMAGE_MICRO_BATCH_SIZE = _env("IMAGE_MICRO_BATCH_SIZE", 16, int)
+# milliseconds a request waits for other requests to join its batch
+IMAGE_MICRO_BATCH_WAIT_MS = _env("IMAGE_MICRO_BATCH_WAIT_MS", 5, float)
+
+# --- uploads ---
+# folder holding the per-request scratch directories of the uploaded files (a tmpfs mount is a good fit)
+SCRATCH_ROOT = _env("SCRATCH_ROOT", "uploads")
+
+# --- result cache ---
+# number of results kept in memory, keyed by the hash of the uploaded file (0 disables the memory cache)
+RESULT_CACHE_SIZE = _env("RESULT_CACHE_SIZE", 1024, int)
+# optional SQLite file keeping the cached results across restarts (empty: memory only)
+RESULT_CACHE_DB = _env("RESULT_CACHE_DB", "")
+# bump to invalidate the cached results, e.g. after replacing a model checkpoint
+RESULT_CACHE_VERSION = _env("RESULT_CACHE_VERSION", "1")
+
+# --- background jobs (/jobs) ---
+# job backend running the video pipeline (see JOB_BACKENDS in backend/jobs.py)
+JOB_BACKEND = _env("JOB_BACKEND", "local")
+# number of videos processed at the same time by the background workers
+JOB_WORKERS = _env("JOB_WORKERS", 1, int)
+# maximum number of queued or running jobs, new jobs are rejected with 503 above it
+JOB_QUEUE_SIZE = _env("JOB_QUEUE_SIZE", 16, int)
+# seconds a finished job and its result are kept
+JOB_TTL = _env("JOB_TTL", 3600, int)
+
+# --- startup ---
+# models loaded and warmed up with a dummy inference when the app starts (comma separated: image, whisper, lip_reading),
+# empty loads every model on the first request that needs it
+PRELOAD_MODELS = _env("PRELOAD_MODELS", "image,whisper,lip_reading")
+
+# --- video preprocessing ---
+# decode the uploaded video one frame at a time instead of loading the whole clip into memory
+PREPROCESS_STREAMING = _env("PREPROCESS_STREAMING", True, bool)
+# run the full face detector every N frames and track the face box in between (1 detects on every frame)
+FACE_DETECT_EVERY = _env("FACE_DETECT_EVERY", 1, int)
+# correlation tracker confidence (peak-to-sidelobe ratio) below which the face is detected again
+FACE_TRACK_MIN_CONFIDENCE = _env("FACE_TRACK_MIN_CONFIDENCE", 7.0, float)
+# number of worker processes used to detect the landmarks (1 runs on the request thread)
+LANDMARK_WORKERS = _env("LANDMARK_WORKERS", 1, int)
+# number of consecutive frames sent to a landmark worker at once
+LANDMARK_CHUNK_SIZE = _env("LANDMARK_CHUNK_SIZE", 32, int)
+# width the frames are downscaled to before face detection (0 detects on the full resolution frame)
+FACE_DETECT_WIDTH = _env("FACE_DETECT_WIDTH", 0, int)
+# number of upsampling passes of the face detector (1 finds smaller faces, 0 is about 4x faster)
+FACE_DETECT_UPSAMPLE = _env("FACE_DETECT_UPSAMPLE", 1, int)
+# also write the mouth roi to mouth_roi/roi.mp4 (debugging only, the roi is handed to the lip reading model in memory)
+SAVE_MOUTH_ROI = _env("SAVE_MOUTH_ROI", False, bool)
+# in streaming mode, the number of frames without a detected face kept in memory while waiting for the
+# next detection (longer gaps keep the last detected landmarks instead of interpolating)
+ROI_MAX_GAP = _env("ROI_MAX_GAP", 250, int)
@@ -0,0 +1,106 @@
+# cheap checks run before the heavy models, so uploads that can not give a useful result are rejected in a second
+import threading
+import cv2
+import numpy as np
+from audio import load_audio, voiced_frames
+from lazy_import import LazyModule
+from preprocessing import detect_faces
+
+# dlib is imported on the first use of the face detector
+dlib = LazyModule("dlib")
+
+# statuses of the rejected uploads
+UNREADABLE_VIDEO = "unreadable_video"
+TOO_SHORT = "too_short"
+TOO_LONG = "too_long"
+LOW_RESOLUTION = "low_resolution"
+NO_FACE = "no_face"
+NO_SPEECH = "no_speech"
+
+# exception raised when an upload fails a triage check, status tells which one
+class TriageError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+# face detector of the triage, created on the first use
+_face_detector = None
+_face_detector_lock = threading.Lock()
+
+def get_face_detector():
+    global _face_detector
+    with _face_detector_lock:
+        if _face_detector is None:
+            _face_detector = dlib.get_frontal_face_detector()
+        return _face_detector
+
+# function to read the number of frames, frame rate and size of a video without decoding it
+def probe_video(video_path):
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            raise TriageError(UNREADABLE_VIDEO, "The video could not be opened")
+        num_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    finally:
+        cap.release()
+    if num_frames <= 0 or not fps:
+        raise TriageError(UNREADABLE_VIDEO, "The video has no frames")
+    return num_frames, fps, width, height
+
+# function to return the fraction of num_samples evenly spaced frames where a face is detected
+def face_ratio(video_path, num_frames, num_samples=5, max_detect_width=320):
+    detector = get_face_detector()
+    cap = cv2.VideoCapture(video_path)
+    found, read = 0, 0
+    try:
+        for index in np.linspace(0, num_frames - 1, num_samples).astype(int):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+            ret, frame = cap.read()
+            if not ret:
+                continue
+            read += 1
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            if len(detect_faces(gray, detector, max_detect_width, upsample=1)) > 0:
+                found += 1
+    finally:
+        cap.release()
+    return found / read if read else 0.0
+
+# function to return the seconds of the audio track louder than min_db (0 when the video has no audio)
+def speech_seconds(video_path, min_db=-45, frame_ms=30):
+    try:
+        audio = load_audio(video_path)
+    except RuntimeError:
+        return 0.0
+    return float(voiced_frames(audio, frame_ms=frame_ms, threshold_db=60, min_db=min_db).sum()) * frame_ms / 1000
+
+"""
+function to run the triage checks on a video, from the cheapest to the most expensive:
+duration and resolution (container metadata), face presence on a few sampled frames, and speech energy
+raises TriageError with the status of the first failed check, returns the measured values otherwise
+max_duration=None (or 0) disables the maximum duration
+"""
+def run_triage(video_path, min_duration=1.0, max_duration=None, min_height=120,
+               face_samples=5, min_face_ratio=0.4, min_speech_seconds=0.5):
+    num_frames, fps, width, height = probe_video(video_path)
+    duration = num_frames / fps
+    if duration < min_duration:
+        raise TriageError(TOO_SHORT, f"The video is too short ({duration:.1f}s, at least {min_duration:.1f}s is needed)")
+    if max_duration and duration > max_duration:
+        raise TriageError(TOO_LONG, f"The video is too long ({duration:.0f}s, at most {max_duration:.0f}s), "
+                                    "use /predict_video_segments for long videos")
+    if min(width, height) < min_height:
+        raise TriageError(LOW_RESOLUTION, f"The video resolution is too low ({width}x{height}) to read the lips")
+
+    faces = face_ratio(video_path, num_frames, face_samples)
+    if faces < min_face_ratio:
+        raise TriageError(NO_FACE, "No face was detected in the video")
+
+    speech = speech_seconds(video_path)
+    if speech < min_speech_seconds:
+        raise TriageError(NO_SPEECH, "No speech was detected in the video")
+
+    return {"duration": duration, "width": width, "height": height, "face_ratio": faces, "speech_seconds": speech}
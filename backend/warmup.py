@@ -0,0 +1,72 @@
+# startup preload of the models: each model is loaded and runs a tiny dummy inference before the first request,
+# the registry keeps the state of every model for the /readyz route
+import threading
+import time
+
+# states of a model
+NOT_LOADED = "not_loaded" # loaded by the first request that needs it
+PENDING = "pending" # waiting for its turn in the warmup
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+"""
+registry of the load state of the models,
+warmups maps the name of every model to the function loading it and running the dummy inference
+"""
+class ModelRegistry:
+    def __init__(self, warmups):
+        self.warmups = dict(warmups)
+        self.models = {name: {"state": NOT_LOADED, "warmup_seconds": None, "error": None} for name in self.warmups}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    # function to update the entry of a model
+    def _update(self, name, **fields):
+        with self.lock:
+            self.models[name].update(fields)
+
+    # function to load a model and run its dummy inference, the errors are recorded instead of raised
+    def warm_up(self, name):
+        self._update(name, state=LOADING, error=None)
+        start = time.perf_counter()
+        try:
+            self.warmups[name]()
+        except Exception as e:
+            self._update(name, state=FAILED, error=str(e), warmup_seconds=round(time.perf_counter() - start, 3))
+            return False
+        self._update(name, state=READY, warmup_seconds=round(time.perf_counter() - start, 3))
+        return True
+
+    """
+    function to warm the given models up one after the other (all the models by default),
+    in a daemon thread with background so the server answers /healthz while the models load,
+    only the first call starts a warmup, the next ones return the same thread
+    """
+    def start_warmup(self, names=None, background=True):
+        names = list(self.warmups) if names is None else list(names)
+        unknown = [name for name in names if name not in self.warmups]
+        if unknown:
+            raise ValueError(f"Unknown models {', '.join(unknown)}, available: {', '.join(self.warmups)}")
+        with self.lock:
+            if self.thread is not None:
+                return self.thread
+            for name in names:
+                self.models[name]["state"] = PENDING
+            self.thread = threading.Thread(target=lambda: [self.warm_up(name) for name in names],
+                                           name="model-warmup", daemon=True)
+        if background:
+            self.thread.start()
+        else:
+            self.thread.run()
+        return self.thread
+
+    # function to return a copy of the state of every model
+    def status(self):
+        with self.lock:
+            return {name: dict(model) for name, model in self.models.items()}
+
+    # true when no model is waiting for its warmup or failed it (the models left to the first request do not count)
+    def ready(self):
+        with self.lock:
+            return all(model["state"] in (NOT_LOADED, READY) for model in self.models.values())
@@ -2,23 +2,43 @@ import pytest
 import tempfile
 import os
 from io import BytesIO
-from app.api import create_app 
+from unittest.mock import patch
+from app.api import create_app, result_cache
 
 @pytest.fixture
 def app():
     """ Initialize a Flask app object for testing environment."""
-    #use the create_app function from app/api.py
-    flask_app = create_app()
+    #use the create_app function from app/api.py, the models are mocked so they are not warmed up
+    flask_app = create_app(preload=False)
     flask_app.config.update({
         "TESTING": True,
     })
     yield flask_app
 
+@pytest.fixture(autouse=True)
+def empty_result_cache():
+    #start every test with an empty result cache, so the mocked models are always called
+    result_cache.clear()
+    yield
+    result_cache.clear()
+
+@pytest.fixture(autouse=True)
+def no_triage(app):
+    #the dummy uploads are not real videos, the triage tests enable it again
+    with patch.dict(app.config, {"TRIAGE_ENABLED": False}):
+        yield
+
 @pytest.fixture
 def client(app):
     # create a test client for the Flask app
     return app.test_client()
 
+@pytest.fixture
+def scratch_root(app, tmp_path):
+    #keep the per-request scratch directories in an empty temporary folder
+    with patch.dict(app.config, {"SCRATCH_ROOT": str(tmp_path)}):
+        yield str(tmp_path)
+
 @pytest.fixture
 def dummy_image():
     #create a dummy image file in memory to simulate upload
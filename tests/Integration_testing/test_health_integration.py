@@ -0,0 +1,79 @@
+import pytest
+import json
+import threading
+from unittest.mock import patch
+from app.api import create_app
+from warmup import ModelRegistry
+
+
+#Test Case 1: the liveness route answers while the models are not loaded
+def test_healthz(client):
+    """test that /healthz returns 200 without loading any model."""
+
+    response = client.get('/healthz')
+
+    assert response.status_code == 200
+    assert json.loads(response.data) == {"status": "ok"}
+
+
+#Test Case 2: the readiness route reports every model and is ready once the warmup is done
+def test_readyz_after_warmup(client):
+    """test that /readyz returns 503 while the models warm up and 200 with their warmup time afterwards."""
+
+    release = threading.Event()
+    registry = ModelRegistry({"image": lambda: release.wait(5), "whisper": lambda: None})
+
+    with patch('app.api.model_registry', registry):
+        thread = registry.start_warmup(["image"])
+        response = client.get('/readyz')
+        assert response.status_code == 503
+        data = json.loads(response.data)
+        assert data['ready'] is False
+        assert data['models']['image']['state'] in ("pending", "loading")
+        #a model left to the first request does not block the readiness
+        assert data['models']['whisper']['state'] == "not_loaded"
+
+        release.set()
+        thread.join(5)
+        response = client.get('/readyz')
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['ready'] is True
+        assert data['models']['image']['state'] == "ready"
+        assert data['models']['image']['warmup_seconds'] is not None
+
+
+#Test Case 3: a model that failed its warmup keeps the worker out of the load balancer
+def test_readyz_failed_warmup(client):
+    """test that /readyz returns 503 with the error of the failed model."""
+
+    def fail():
+        raise RuntimeError("checkpoint not found")
+    registry = ModelRegistry({"lip_reading": fail})
+
+    with patch('app.api.model_registry', registry):
+        registry.start_warmup(background=False)
+        response = client.get('/readyz')
+
+    assert response.status_code == 503
+    data = json.loads(response.data)
+    assert data['models']['lip_reading']['state'] == "failed"
+    assert data['models']['lip_reading']['error'] == "checkpoint not found"
+
+
+#Test Case 4: create_app warms up the models of PRELOAD_MODELS only
+def test_create_app_preload(app):
+    """test that create_app starts the warmup of the configured models and that preload=False skips it."""
+
+    calls = []
+    registry = ModelRegistry({name: (lambda name=name: calls.append(name)) for name in ("image", "whisper", "lip_reading")})
+
+    with patch('app.api.model_registry', registry), patch.dict(app.config, {"PRELOAD_MODELS": "image, whisper"}):
+        create_app(preload=False)
+        assert registry.thread is None
+
+        create_app()
+        registry.thread.join(5)
+
+    assert calls == ["image", "whisper"]
+    assert registry.status()['lip_reading']['state'] == "not_loaded"
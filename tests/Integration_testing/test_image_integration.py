@@ -1,7 +1,9 @@
 import pytest
 import json
+import os
 from unittest.mock import patch, MagicMock
 from io import BytesIO
+from PIL import Image
 #dummy_image and client are imported from conftest.py automatically
 
 
@@ -10,8 +12,7 @@ from io import BytesIO
 # 1- Real image test 
 #import paths for patching should match those in app/api.py
 @patch('app.api.predict_image') 
-@patch('os.remove') #clean up temporary file
-def test_predict_image_success_Real(mock_remove, mock_predict_image, client, dummy_image):
+def test_predict_image_success_Real(mock_predict_image, client, scratch_root, dummy_image):
     """ Test the /predict_image route for successful response."""
 
     #mock the predict_image function to return a real label and score
@@ -33,12 +34,12 @@ def test_predict_image_success_Real(mock_remove, mock_predict_image, client, dum
     
     # ensure the mocked functions were called
     mock_predict_image.assert_called_once()
-    mock_remove.assert_called_once() # ensure temporary file is removed
+    #the scratch directory of the request was removed
+    assert os.listdir(scratch_root) == []
 
 # 2-Fake image test
 @patch('app.api.predict_image') 
-@patch('os.remove')
-def test_predict_image_success_fake(mock_remove, mock_predict_image, client, dummy_image):
+def test_predict_image_success_fake(mock_predict_image, client, scratch_root, dummy_image):
     """ Test the /predict_image route for successful Fake response """
 
     # Mock the predict_image function to return a fake label and score
@@ -60,13 +61,13 @@ def test_predict_image_success_fake(mock_remove, mock_predict_image, client, dum
     
     # Ensure the mocked functions were called
     mock_predict_image.assert_called_once()
-    mock_remove.assert_called_once()
+    #the scratch directory of the request was removed
+    assert os.listdir(scratch_root) == []
 
 #--- FAILURE CASES ---
 
 @patch('app.api.predict_image')
-@patch('os.remove')
-def test_predict_image_failure_internal(mock_remove, mock_predict_image, client, dummy_image):
+def test_predict_image_failure_internal(mock_predict_image, client, scratch_root, dummy_image):
     """
     Test the /predict_image route for internal failure (500).
     Simulates a crash during model execution or file handling after upload.
@@ -91,9 +92,150 @@ def test_predict_image_failure_internal(mock_remove, mock_predict_image, client,
     assert "Model initialization failed." in data['error'] 
     
     # Ensure cleanup was attempted even in case of failure
-    mock_remove.assert_called_once()
+    #the scratch directory of the request was removed
+    assert os.listdir(scratch_root) == []
 
 
+# 4- the image is decoded from memory
+@patch('app.api.predict_image')
+def test_predict_image_in_memory(mock_predict_image, client, scratch_root):
+    """Test that the uploaded image is passed to the model as bytes without being saved to disk."""
+
+    mock_predict_image.return_value = ("Real", 0.9)
+
+    for content in (b"first image", b"second image"):
+        response = client.post(
+            '/predict_image',
+            data={'image': (BytesIO(content), 'test_image.jpg')},
+            content_type='multipart/form-data'
+        )
+        assert response.status_code == 200
+
+    #each request passed its own content to the model
+    assert mock_predict_image.call_args_list[0][0][0] == b"first image"
+    assert mock_predict_image.call_args_list[1][0][0] == b"second image"
+    assert os.listdir(scratch_root) == []
+
+# 5- a repeated upload is answered from the result cache
+@patch('app.api.predict_image')
+def test_predict_image_cached(mock_predict_image, client):
+    """Test that the same image content is only analysed once."""
+
+    mock_predict_image.return_value = ("Fake", 0.75)
+
+    for _ in range(2):
+        response = client.post(
+            '/predict_image',
+            data={'image': (BytesIO(b"Dummy image content"), 'test_image.jpg')},
+            content_type='multipart/form-data'
+        )
+        assert response.status_code == 200
+        assert json.loads(response.data) == {"label": "Fake", "score": "75.00"}
+
+    #the model only ran for the first upload
+    mock_predict_image.assert_called_once()
+    stats = json.loads(client.get('/cache/stats').data)
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+
+    #the decode size read by the backend is part of the cache key
+    with patch('app.api.settings.IMAGE_DECODE_SIZE', 224):
+        client.post(
+            '/predict_image',
+            data={'image': (BytesIO(b"Dummy image content"), 'test_image.jpg')},
+            content_type='multipart/form-data'
+        )
+    assert mock_predict_image.call_count == 2
+
+#function to create the bytes of a small JPEG image of the given color
+def jpeg_bytes(color):
+    buffer = BytesIO()
+    Image.new("RGB", (32, 32), color).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+# 6- many images in one request
+@patch('app.api.predict_images')
+def test_predict_images_batch(mock_predict_images, client):
+    """Test the /predict_images route returns one result per image in the upload order."""
+
+    #the second image is already cached, so only the first and the third go through the model
+    with patch('app.api.predict_image', return_value=("Real", 0.6)):
+        client.post(
+            '/predict_image',
+            data={'image': (BytesIO(jpeg_bytes("green")), 'b.jpg')},
+            content_type='multipart/form-data'
+        )
+    mock_predict_images.return_value = [("Fake", 0.9), ("Real", 0.8)]
+
+    response = client.post(
+        '/predict_images',
+        data={'images': [(BytesIO(jpeg_bytes("red")), 'a.jpg'),
+                         (BytesIO(jpeg_bytes("green")), 'b.jpg'),
+                         (BytesIO(jpeg_bytes("blue")), 'c.jpg')]},
+        content_type='multipart/form-data'
+    )
+
+    assert response.status_code == 200
+    results = json.loads(response.data)['results']
+    assert [r['filename'] for r in results] == ['a.jpg', 'b.jpg', 'c.jpg']
+    assert [r['label'] for r in results] == ['Fake', 'Real', 'Real']
+    assert [r['score'] for r in results] == ['90.00', '60.00', '80.00']
+
+    #the model ran once on the two images that were not cached
+    mock_predict_images.assert_called_once()
+    assert len(mock_predict_images.call_args[0][0]) == 2
+
+
+
+# 7- a corrupt file only fails its own result
+@patch('app.api.predict_images')
+def test_predict_images_corrupt_file(mock_predict_images, client):
+    """Test that a file that can not be decoded gets an error while the other images are classified."""
+
+    mock_predict_images.return_value = [("Fake", 0.9), ("Real", 0.8)]
+
+    response = client.post(
+        '/predict_images',
+        data={'images': [(BytesIO(jpeg_bytes("red")), 'a.jpg'),
+                         (BytesIO(b"not an image"), 'broken.jpg'),
+                         (BytesIO(jpeg_bytes("blue")), 'c.jpg')]},
+        content_type='multipart/form-data'
+    )
+
+    assert response.status_code == 200
+    results = json.loads(response.data)['results']
+    assert [r['filename'] for r in results] == ['a.jpg', 'broken.jpg', 'c.jpg']
+    assert results[0]['label'] == 'Fake' and results[2]['label'] == 'Real'
+    assert 'label' not in results[1]
+    assert "could not be decoded" in results[1]['error']
+    #only the decoded images went through the model
+    images = mock_predict_images.call_args[0][0]
+    assert len(images) == 2
+    assert all(isinstance(image, Image.Image) for image in images)
+
+
+# 8- the number of images of one request is limited
+@patch('app.api.predict_images')
+def test_predict_images_too_many(mock_predict_images, app, client):
+    """Test that a request with more than IMAGE_MAX_FILES images is rejected with 413."""
+
+    with patch.dict(app.config, {"IMAGE_MAX_FILES": 2}):
+        response = client.post(
+            '/predict_images',
+            data={'images': [(BytesIO(jpeg_bytes("red")), f'{i}.jpg') for i in range(3)]},
+            content_type='multipart/form-data'
+        )
+
+    assert response.status_code == 413
+    mock_predict_images.assert_not_called()
+
+
+def test_predict_images_no_file(client):
+    """Test the /predict_images route for error when no file is uploaded."""
+
+    response = client.post('/predict_images', data={}, content_type='multipart/form-data')
+    assert response.status_code == 400
+
 
 def test_predict_image_no_file(client):
     """Test the /predict_image route for error when no file is uploaded."""
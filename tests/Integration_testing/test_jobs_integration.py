@@ -0,0 +1,116 @@
+import pytest
+import json
+import os
+import time
+from unittest.mock import patch
+from io import BytesIO
+
+#function to poll the /jobs/<id> route until the job has finished
+def wait_for_job(client, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        data = json.loads(client.get(f'/jobs/{job_id}').data)
+        if data['status'] in ("done", "failed"):
+            return data
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish in {timeout} seconds")
+
+
+#Test Case 1: a video job is accepted right away and its result can be fetched
+@patch('app.api.run_video_pipeline')
+def test_job_success(mock_pipeline, client, scratch_root, dummy_video):
+    """test that /jobs returns a job id and /jobs/<id> returns the pipeline result."""
+
+    mock_pipeline.return_value = {"label": "Real", "score": "100.00",
+                                  "lip_reading_text": "THE CAT IS BLUE", "speech_text": "THE CAT IS BLUE"}
+
+    response = client.post(
+        '/jobs',
+        data={'video': (dummy_video, 'test_video.mp4')},
+        content_type='multipart/form-data'
+    )
+
+    assert response.status_code == 202
+    job_id = json.loads(response.data)['job_id']
+    assert response.headers['Location'] == f"/jobs/{job_id}"
+
+    data = wait_for_job(client, job_id)
+    assert data['status'] == "done"
+    assert data['result']['label'] == "Real"
+    mock_pipeline.assert_called_once()
+    #the scratch directory of the job was removed once it finished
+    assert os.listdir(scratch_root) == []
+
+
+#Test Case 2: an error in the pipeline is reported by the job
+@patch('app.api.run_video_pipeline')
+def test_job_failure(mock_pipeline, client, scratch_root, dummy_video):
+    """test that a failing job reports its error."""
+
+    mock_pipeline.side_effect = Exception("Lip reading failed")
+
+    response = client.post(
+        '/jobs',
+        data={'video': (dummy_video, 'test_video.mp4')},
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 202
+
+    data = wait_for_job(client, json.loads(response.data)['job_id'])
+    assert data['status'] == "failed"
+    assert "Lip reading failed" in data['error']
+    assert os.listdir(scratch_root) == []
+
+
+#Test Case 3: the job is rejected when the queue is full
+@patch('app.api.job_backend.submit')
+def test_job_queue_full(mock_submit, client, scratch_root, dummy_video):
+    """test that /jobs returns 503 when no more jobs can be queued."""
+    from jobs import QueueFullError
+
+    mock_submit.side_effect = QueueFullError("The job queue is full, try again later")
+
+    response = client.post(
+        '/jobs',
+        data={'video': (dummy_video, 'test_video.mp4')},
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 503
+    assert os.listdir(scratch_root) == []
+
+
+#Test Case 4: unknown job ids and missing uploads
+def test_job_not_found_and_no_video(client):
+    """test that unknown jobs return 404 and a job without a video returns 400."""
+
+    assert client.get('/jobs/unknown').status_code == 404
+
+    response = client.post('/jobs', data={}, content_type='multipart/form-data')
+    assert response.status_code == 400
+
+
+#Test Case 5: the jobs have their own maximum duration and keep the reason of a rejected video
+@patch('app.api.run_video_pipeline')
+@patch('app.api.run_triage')
+def test_job_triage(mock_triage, mock_pipeline, app, client, scratch_root, dummy_video):
+    """test that a long video job is not limited by TRIAGE_MAX_DURATION and that a rejected job reports its status."""
+    from triage import TriageError, NO_FACE
+
+    mock_pipeline.return_value = {"label": "Real", "score": "100.00",
+                                  "lip_reading_text": "THE CAT IS BLUE", "speech_text": "THE CAT IS BLUE"}
+
+    with patch.dict(app.config, {"TRIAGE_ENABLED": True, "TRIAGE_MAX_DURATION": 600.0, "TRIAGE_JOB_MAX_DURATION": 0.0}):
+        response = client.post('/jobs', data={'video': (dummy_video, 'test_video.mp4')},
+                               content_type='multipart/form-data')
+        data = wait_for_job(client, json.loads(response.data)['job_id'])
+        assert data['status'] == "done"
+        assert mock_triage.call_args[1]['max_duration'] == 0.0
+
+        mock_triage.side_effect = TriageError(NO_FACE, "No face was found in the video")
+        response = client.post('/jobs', data={'video': (BytesIO(b"another video"), 'test_video.mp4')},
+                               content_type='multipart/form-data')
+        data = wait_for_job(client, json.loads(response.data)['job_id'])
+
+    assert data['status'] == "failed"
+    assert data['error_status'] == NO_FACE
+    assert "No face" in data['error']
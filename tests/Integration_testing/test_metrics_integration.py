@@ -0,0 +1,126 @@
+import pytest
+import json
+import importlib
+import os, sys
+import numpy as np
+from unittest.mock import patch
+from app.api import stage_seconds, request_count, requests_in_flight, upload_bytes, roi_frames, result_cache
+
+
+#Test Case 1: the metrics are exported in the Prometheus text format
+def test_metrics_format(client):
+    """test that /metrics returns the text format with the request, stage, model and cache metrics."""
+
+    client.get('/healthz')
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    text = response.data.decode()
+    assert "# TYPE fake_reveal_requests_total counter" in text
+    assert 'fake_reveal_requests_total{endpoint="/healthz",method="GET",status="200"}' in text
+    assert "# TYPE fake_reveal_stage_seconds histogram" in text
+    assert "# TYPE fake_reveal_requests_in_flight gauge" in text
+    assert 'fake_reveal_model_ready{model="lip_reading"} 0' in text
+    assert "fake_reveal_result_cache_entries 0" in text
+    assert "# TYPE fake_reveal_result_cache_hits_total counter" in text
+    assert "# TYPE fake_reveal_result_cache_misses_total counter" in text
+    assert "# TYPE fake_reveal_model_load_seconds histogram" in text
+
+
+#Test Case 2: every stage of the video pipeline records its latency
+@patch('app.api.get_text_from_stt')
+@patch('app.api.get_text_from_lip_reading')
+@patch('app.api.preprocess_video')
+def test_video_stage_metrics(mock_preprocess, mock_lip_reading, mock_stt, client, scratch_root, dummy_video):
+    """test that /predict_video observes the stages, the roi frames, the upload size and the request outcome."""
+
+    mock_preprocess.return_value = np.zeros((30, 96, 96), dtype=np.uint8)
+    mock_lip_reading.return_value = "THE CAT IS BLUE"
+    mock_stt.return_value = "THE CAT IS BLUE"
+    stages = ("preprocess_video", "lip_reading", "stt", "classify_input")
+    before = {stage: stage_seconds.count(stage=stage) for stage in stages}
+    requests_before = request_count.get(endpoint="/predict_video", method="POST", status=200)
+    uploads_before = upload_bytes.count(endpoint="/predict_video")
+    frames_before = roi_frames.count()
+
+    response = client.post(
+        '/predict_video',
+        data={'video': (dummy_video, 'test_video.mp4')},
+        content_type='multipart/form-data'
+    )
+
+    assert response.status_code == 200
+    assert {stage: stage_seconds.count(stage=stage) - before[stage] for stage in stages} == dict.fromkeys(stages, 1)
+    assert request_count.get(endpoint="/predict_video", method="POST", status=200) == requests_before + 1
+    assert upload_bytes.count(endpoint="/predict_video") == uploads_before + 1
+    assert roi_frames.count() == frames_before + 1
+    #the request is no longer in flight
+    assert requests_in_flight.get() == 0
+
+
+#Test Case 3: the failed requests are counted with their status code
+@patch('app.api.predict_image')
+def test_image_failure_metrics(mock_predict_image, client, dummy_image):
+    """test that a failing /predict_image is counted as a 500 and its stage is still observed."""
+
+    mock_predict_image.side_effect = Exception("Model crashed")
+    failures_before = request_count.get(endpoint="/predict_image", method="POST", status=500)
+    stage_before = stage_seconds.count(stage="predict_image")
+
+    response = client.post(
+        '/predict_image',
+        data={'image': (dummy_image, 'test_image.jpg')},
+        content_type='multipart/form-data'
+    )
+
+    assert response.status_code == 500
+    assert request_count.get(endpoint="/predict_image", method="POST", status=500) == failures_before + 1
+    assert stage_seconds.count(stage="predict_image") == stage_before + 1
+    text = client.get('/metrics').data.decode()
+    assert 'fake_reveal_requests_total{endpoint="/predict_image",method="POST",status="500"}' in text
+
+
+#Test Case 4: the result cache lookups are exported as counters
+def test_cache_counters(client):
+    """test that /metrics exports the hits and misses of the result cache as _total counters."""
+
+    result_cache.get("missing")
+    result_cache.put("present", {"label": "Real"})
+    result_cache.get("present")
+    stats = result_cache.stats()
+
+    text = client.get('/metrics').data.decode()
+
+    assert f"fake_reveal_result_cache_hits_total {stats['hits']}" in text
+    assert f"fake_reveal_result_cache_misses_total {stats['misses']}" in text
+
+
+#Test Case 5: a model loaded on its first use records its load time
+@patch('inference_image.pipeline')
+def test_lazy_model_load_metrics(mock_pipeline, client):
+    """test that a model left out of the warmup records its load time when the first request loads it."""
+
+    with patch('inference_image.detector', None):
+        import inference_image
+        inference_image.load_detector()
+
+    text = client.get('/metrics').data.decode()
+    assert 'fake_reveal_model_load_seconds_count{model="image"}' in text
+
+
+#Test Case 6: the API module can be imported under both of its names in the same process
+def test_api_imported_twice():
+    """test that importing app/api.py as app.api and as api (like the unit tests) does not register a metric twice."""
+
+    import app.api
+    app_dir = os.path.abspath(os.getcwd() + "/app")
+    if app_dir not in sys.path:
+        sys.path.append(app_dir)
+    api = importlib.import_module("api")
+
+    assert api is not app.api
+    assert api.metrics is not app.api.metrics
+    #the backend load times are exported by both
+    assert api.metrics.metrics["fake_reveal_model_load_seconds"] is app.api.metrics.metrics["fake_reveal_model_load_seconds"]
+    assert "fake_reveal_requests_total" in api.metrics.render()
@@ -0,0 +1,150 @@
+import pytest
+import json
+import os
+from unittest.mock import patch
+
+#function returning the pipeline result of a window: the spliced section is seen by the overlapping windows at 8s and 15s
+def fake_pipeline(segment_path, decoding_profile=None, transcription_profile=None):
+    if segment_path.endswith(("segment_8.00.mp4", "segment_15.00.mp4")):
+        return {"label": "Fake", "score": "80.00", "lip_reading_text": "I LOVE", "speech_text": "THE DOG"}
+    return {"label": "Real", "score": "95.00", "lip_reading_text": "THE CAT", "speech_text": "THE CAT"}
+
+
+#Test Case 1: the segmented analysis returns a timeline and a Fake verdict for a spliced section
+@patch('app.api.run_video_pipeline', side_effect=fake_pipeline)
+@patch('app.api.cut_segment')
+@patch('app.api.video_duration', return_value=25.0)
+def test_segments_timeline(mock_duration, mock_cut, mock_pipeline, client, scratch_root, dummy_video):
+    """test the /predict_video_segments route returns the per-window results in time order and the verdict."""
+
+    response = client.post(
+        '/predict_video_segments',
+        data={'video': (dummy_video, 'test_video.mp4')},
+        content_type='multipart/form-data'
+    )
+
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert [segment['start'] for segment in data['segments']] == [0.0, 8.0, 15.0]
+    assert [segment['label'] for segment in data['segments']] == ["Real", "Fake", "Fake"]
+    assert data['label'] == "Fake"
+    assert data['score'] == "80.00"
+    assert data['longest_fake_run'] == 2
+    assert mock_pipeline.call_count == 3
+    #the scratch directory of the request was removed
+    assert os.listdir(scratch_root) == []
+
+
+#Test Case 2: the segments are streamed as NDJSON lines, the verdict comes last
+@patch('app.api.run_video_pipeline', side_effect=fake_pipeline)
+@patch('app.api.cut_segment')
+@patch('app.api.video_duration', return_value=25.0)
+def test_segments_stream(mock_duration, mock_cut, mock_pipeline, client, scratch_root, dummy_video):
+    """test the streamed /predict_video_segments response."""
+
+    response = client.post(
+        '/predict_video_segments',
+        data={'video': (dummy_video, 'test_video.mp4'), 'stream': '1'},
+        content_type='multipart/form-data'
+    )
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert [line['type'] for line in lines] == ["segment", "segment", "segment", "verdict"]
+    assert sorted(line['start'] for line in lines[:3]) == [0.0, 8.0, 15.0]
+    assert lines[-1]['label'] == "Fake"
+    assert os.listdir(scratch_root) == []
+
+
+#Test Case 3: a failing window is reported and skipped by the verdict
+@patch('app.api.run_video_pipeline')
+@patch('app.api.cut_segment')
+@patch('app.api.video_duration', return_value=25.0)
+def test_segments_with_failed_window(mock_duration, mock_cut, mock_pipeline, client, dummy_video):
+    """test that a window without a face does not fail the whole video."""
+
+    def pipeline(segment_path, decoding_profile=None, transcription_profile=None):
+        if segment_path.endswith("segment_15.00.mp4"):
+            raise Exception("No face detected")
+        return {"label": "Real", "score": "95.00", "lip_reading_text": "THE CAT", "speech_text": "THE CAT"}
+    mock_pipeline.side_effect = pipeline
+
+    response = client.post(
+        '/predict_video_segments',
+        data={'video': (dummy_video, 'test_video.mp4')},
+        content_type='multipart/form-data'
+    )
+
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['label'] == "Real"
+    assert data['analysed_segments'] == 2
+    assert data['segments'][2]['error'] == "No face detected"
+
+
+#Test Case 3.1: one borderline Fake window in a long Real video does not make the video Fake
+@patch('app.api.run_video_pipeline')
+@patch('app.api.cut_segment')
+@patch('app.api.video_duration', return_value=60.0)
+def test_segments_borderline_window(mock_duration, mock_cut, mock_pipeline, client, dummy_video):
+    """test that a single noisy window just under the similarity threshold is not enough for a Fake verdict."""
+
+    def pipeline(segment_path, decoding_profile=None, transcription_profile=None):
+        if segment_path.endswith("segment_24.00.mp4"):
+            return {"label": "Fake", "score": "53.00", "lip_reading_text": "THE CAP", "speech_text": "THE CAT"}
+        return {"label": "Real", "score": "90.00", "lip_reading_text": "THE CAT", "speech_text": "THE CAT"}
+    mock_pipeline.side_effect = pipeline
+
+    response = client.post(
+        '/predict_video_segments',
+        data={'video': (dummy_video, 'test_video.mp4')},
+        content_type='multipart/form-data'
+    )
+
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert [segment['label'] for segment in data['segments']].count("Fake") == 1
+    assert data['label'] == "Real"
+    assert (data['fake_segments'], data['fake_votes']) == (1, 0)
+
+
+#Test Case 3.2: the windows where the speaker pauses are not counted as Fake
+@patch('app.api.run_video_pipeline')
+@patch('app.api.cut_segment')
+@patch('app.api.video_duration', return_value=25.0)
+def test_segments_silent_windows(mock_duration, mock_cut, mock_pipeline, client, dummy_video):
+    """test that two consecutive windows with an empty transcript are reported as not analysed and keep the video Real."""
+
+    def pipeline(segment_path, decoding_profile=None, transcription_profile=None):
+        if segment_path.endswith(("segment_8.00.mp4", "segment_15.00.mp4")):
+            return {"label": "Fake", "score": "100.00", "lip_reading_text": "THE CAT", "speech_text": ""}
+        return {"label": "Real", "score": "95.00", "lip_reading_text": "THE CAT", "speech_text": "THE CAT"}
+    mock_pipeline.side_effect = pipeline
+
+    response = client.post(
+        '/predict_video_segments',
+        data={'video': (dummy_video, 'test_video.mp4')},
+        content_type='multipart/form-data'
+    )
+
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['label'] == "Real"
+    assert (data['fake_votes'], data['analysed_segments']) == (0, 1)
+    assert data['segments'][1]['error'] == "No speech to compare in this window"
+    assert 'label' not in data['segments'][1]
+
+
+#Test Case 4: a video that can not be read returns an error
+@patch('app.api.video_duration', side_effect=ValueError("Could not read the duration"))
+def test_segments_unreadable_video(mock_duration, client, scratch_root, dummy_video):
+    """test that an unreadable video returns 500 and no scratch files are left."""
+
+    response = client.post(
+        '/predict_video_segments',
+        data={'video': (dummy_video, 'test_video.mp4')},
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 500
+    assert os.listdir(scratch_root) == []
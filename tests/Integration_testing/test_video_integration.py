@@ -1,14 +1,15 @@
 import pytest
 import json
+import os
 from unittest.mock import patch, MagicMock
+from io import BytesIO
 
 #Test Case 1: a successful real video case 
 #to ensure the patch paths match those in app/api.py
 @patch('app.api.get_text_from_stt')
 @patch('app.api.get_text_from_lip_reading')
 @patch('app.api.preprocess_video')
-@patch('os.remove') 
-def test_predict_video_real_case(mock_remove,mock_preprocess, mock_lip_reading, mock_stt, client,  dummy_video):
+def test_predict_video_real_case(mock_preprocess, mock_lip_reading, mock_stt, client, scratch_root, dummy_video):
     """ test the /predict_video route for 'Real' case (matching texts)."""
 
     #mocking the functions to return matching texts
@@ -37,15 +38,15 @@ def test_predict_video_real_case(mock_remove,mock_preprocess, mock_lip_reading,
     mock_preprocess.assert_called_once()
     mock_lip_reading.assert_called_once()
     mock_stt.assert_called_once()
-    mock_remove.assert_called_once()
+    #the scratch directory of the request was removed
+    assert os.listdir(scratch_root) == []
 
 
 #Test Case 2: a successful fake video case 
 @patch('app.api.get_text_from_stt')
 @patch('app.api.get_text_from_lip_reading')
 @patch('app.api.preprocess_video')
-@patch('os.remove')
-def test_predict_video_fake_case(mock_remove,mock_preprocess, mock_lip_reading, mock_stt, client, dummy_video):
+def test_predict_video_fake_case(mock_preprocess, mock_lip_reading, mock_stt, client, scratch_root, dummy_video):
     """test the /predict_video route for 'Fake' case (non-matching texts).""" 
 
     #mocking the functions to return different texts
@@ -77,11 +78,12 @@ def test_predict_video_fake_case(mock_remove,mock_preprocess, mock_lip_reading,
 
 
 # Test Case 3: Preprocessing Failure
+# run the branches one after another so the order of the calls is fixed
+@patch.dict('app.api.app.config', {'CONCURRENT_BRANCHES': False})
 @patch('app.api.get_text_from_stt')
 @patch('app.api.get_text_from_lip_reading')
 @patch('app.api.preprocess_video')
-@patch('os.remove')
-def test_predict_video_failure_preprocess(mock_remove, mock_preprocess, mock_lip_reading, mock_stt, client, dummy_video):
+def test_predict_video_failure_preprocess(mock_preprocess, mock_lip_reading, mock_stt, client, scratch_root, dummy_video):
     """Test the /predict_video route fails (500) when preprocessing raises an exception."""
     
     # Setup the mock to raise an exception during preprocessing
@@ -101,17 +103,19 @@ def test_predict_video_failure_preprocess(mock_remove, mock_preprocess, mock_lip
     assert 'error' in data
     assert "Video processing failed: Face not detected." in data['error']
     
-    mock_remove.assert_called_once()
+    #the scratch directory of the request was removed
+    assert os.listdir(scratch_root) == []
     mock_lip_reading.assert_not_called()
     mock_stt.assert_not_called()
 
 
 # Test Case 4: Lip Reading Model Failure
+# run the branches one after another so the order of the calls is fixed
+@patch.dict('app.api.app.config', {'CONCURRENT_BRANCHES': False})
 @patch('app.api.get_text_from_stt')
 @patch('app.api.get_text_from_lip_reading')
 @patch('app.api.preprocess_video')
-@patch('os.remove')
-def test_predict_video_failure_lip_reading(mock_remove, mock_preprocess, mock_lip_reading, mock_stt, client, dummy_video):
+def test_predict_video_failure_lip_reading(mock_preprocess, mock_lip_reading, mock_stt, client, scratch_root, dummy_video):
     """Test the /predict_video route fails (500) when the lip reading model crashes."""
     
     # Setup the mocks
@@ -136,14 +140,14 @@ def test_predict_video_failure_lip_reading(mock_remove, mock_preprocess, mock_li
     mock_preprocess.assert_called_once()
     mock_lip_reading.assert_called_once()
     mock_stt.assert_not_called() 
-    mock_remove.assert_called_once()
+    #the scratch directory of the request was removed
+    assert os.listdir(scratch_root) == []
 
 # Test Case 5: STT Model Failure
 @patch('app.api.get_text_from_stt')
 @patch('app.api.get_text_from_lip_reading')
 @patch('app.api.preprocess_video')
-@patch('os.remove')
-def test_predict_video_failure_stt(mock_remove, mock_preprocess, mock_lip_reading, mock_stt, client, dummy_video):
+def test_predict_video_failure_stt(mock_preprocess, mock_lip_reading, mock_stt, client, scratch_root, dummy_video):
     """Test the /predict_video route fails (500) when the STT model crashes."""
     
     # 1. Setup the mocks
@@ -169,10 +173,227 @@ def test_predict_video_failure_stt(mock_remove, mock_preprocess, mock_lip_readin
     mock_preprocess.assert_called_once()
     mock_lip_reading.assert_called_once()
     mock_stt.assert_called_once()
-    mock_remove.assert_called_once()
+    #the scratch directory of the request was removed
+    assert os.listdir(scratch_root) == []
 
 
-# Test Case 6: No Video Uploaded
+# Test Case 6: concurrent branches
+@patch.dict('app.api.app.config', {'CONCURRENT_BRANCHES': True})
+@patch('app.api.get_text_from_stt')
+@patch('app.api.get_text_from_lip_reading')
+@patch('app.api.preprocess_video')
+def test_predict_video_concurrent_branches(mock_preprocess, mock_lip_reading, mock_stt, client, scratch_root, dummy_video):
+    """Test the /predict_video route runs both branches and joins the results."""
+
+    mock_lip_reading.return_value = "THE CAT IS BLUE"
+    mock_stt.return_value = "THE CAT IS BLUE"
+
+    response = client.post(
+        '/predict_video',
+        data={'video': (dummy_video, 'test_video.mp4')},
+        content_type='multipart/form-data'
+    )
+
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['label'] == "Real"
+    assert data['speech_text'] == "THE CAT IS BLUE"
+
+    # the branches do not change the process-wide torch threads per call
+    assert 'num_threads' not in mock_lip_reading.call_args[1]
+    assert 'num_threads' not in mock_stt.call_args[1]
+    #the scratch directory of the request was removed
+    assert os.listdir(scratch_root) == []
+
+
+# Test Case 7: concurrent branches with a lip reading failure
+@patch.dict('app.api.app.config', {'CONCURRENT_BRANCHES': True})
+@patch('app.api.get_text_from_stt')
+@patch('app.api.get_text_from_lip_reading')
+@patch('app.api.preprocess_video')
+def test_predict_video_concurrent_lip_reading_failure(mock_preprocess, mock_lip_reading, mock_stt, client, scratch_root, dummy_video):
+    """Test the /predict_video route fails (500) when lip reading crashes while speech-to-text runs concurrently."""
+
+    mock_lip_reading.side_effect = Exception("Lip model out of memory.")
+    mock_stt.return_value = "THE CAT IS BLUE"
+
+    response = client.post(
+        '/predict_video',
+        data={'video': (dummy_video, 'test_video.mp4')},
+        content_type='multipart/form-data'
+    )
+
+    assert response.status_code == 500
+    data = json.loads(response.data)
+    assert "Lip model out of memory." in data['error']
+    # the video is removed once, after the speech-to-text branch stopped using it
+    #the scratch directory of the request was removed
+    assert os.listdir(scratch_root) == []
+
+
+# Test Case 8: a repeated upload is answered from the result cache
+@patch.dict('app.api.app.config', {'CONCURRENT_BRANCHES': False})
+@patch('app.api.get_text_from_stt')
+@patch('app.api.get_text_from_lip_reading')
+@patch('app.api.preprocess_video')
+def test_predict_video_cached(mock_preprocess, mock_lip_reading, mock_stt, client):
+    """test that the same video content only runs the pipeline once, and a failed run is not cached."""
+
+    mock_lip_reading.side_effect = [Exception("Lip reading failed"), "THE CAT IS BLUE"]
+    mock_stt.return_value = "THE CAT IS BLUE"
+
+    def post_video():
+        return client.post(
+            '/predict_video',
+            data={'video': (BytesIO(b"Dummy video content"), 'test_video.mp4')},
+            content_type='multipart/form-data'
+        )
+
+    #the failed run is not cached
+    assert post_video().status_code == 500
+    first = post_video()
+    second = post_video()
+    assert first.status_code == 200
+    assert json.loads(first.data) == json.loads(second.data)
+
+    #the models only ran until the first successful result
+    assert mock_lip_reading.call_count == 2
+    mock_stt.assert_called_once()
+    stats = json.loads(client.get('/cache/stats').data)
+    assert stats['hits'] == 1
+
+
+# Test Case 8.1: a change of a setting behind the result is a cache miss
+@patch.dict('app.api.app.config', {'CONCURRENT_BRANCHES': False})
+@patch('app.api.get_text_from_stt')
+@patch('app.api.get_text_from_lip_reading')
+@patch('app.api.preprocess_video')
+def test_predict_video_cache_settings(mock_preprocess, mock_lip_reading, mock_stt, app, client):
+    """test that the preprocessing settings, the adaptive decoding threshold and the backend settings are part of the cache key."""
+
+    mock_lip_reading.return_value = "THE CAT IS BLUE"
+    mock_stt.return_value = "THE CAT IS BLUE"
+
+    def post_video(profile="adaptive"):
+        return client.post(
+            '/predict_video',
+            data={'video': (BytesIO(b"Dummy video content"), 'test_video.mp4'), 'decoding_profile': profile},
+            content_type='multipart/form-data'
+        )
+
+    assert post_video().status_code == 200
+    assert post_video().status_code == 200
+    assert mock_lip_reading.call_count == 1
+
+    #the roi settings passed to preprocess_video from app.config
+    with patch.dict(app.config, {'FACE_DETECT_EVERY': app.config['FACE_DETECT_EVERY'] + 4}):
+        post_video()
+    assert mock_lip_reading.call_count == 2
+    #the settings read by the backend itself
+    with patch('app.api.settings.LIP_ADAPTIVE_MIN_SCORE', -0.5):
+        post_video()
+    assert mock_lip_reading.call_count == 3
+    with patch('app.api.settings.WHISPER_VAD', not app.config['WHISPER_VAD']):
+        post_video()
+    assert mock_lip_reading.call_count == 4
+    #the adaptive threshold does not change the results of the other profiles
+    post_video("fast")
+    with patch('app.api.settings.LIP_ADAPTIVE_MIN_SCORE', -0.5):
+        post_video("fast")
+    assert mock_lip_reading.call_count == 5
+
+
+# Test Case 9: the decoding profile of the lip reading model is chosen per request
+@patch('app.api.get_text_from_stt')
+@patch('app.api.get_text_from_lip_reading')
+@patch('app.api.preprocess_video')
+def test_predict_video_decoding_profile(mock_preprocess, mock_lip_reading, mock_stt, client):
+    """test that the decoding_profile form field reaches the lip reading model, and unknown profiles are rejected."""
+
+    mock_lip_reading.return_value = "THE CAT IS BLUE"
+    mock_stt.return_value = "THE CAT IS BLUE"
+
+    response = client.post(
+        '/predict_video',
+        data={'video': (BytesIO(b"Dummy video content"), 'test_video.mp4'), 'decoding_profile': 'fast'},
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 200
+    assert mock_lip_reading.call_args[1]['profile'] == "fast"
+
+    #without the field the server default is used
+    client.post(
+        '/predict_video',
+        data={'video': (BytesIO(b"Another video content"), 'test_video.mp4')},
+        content_type='multipart/form-data'
+    )
+    assert mock_lip_reading.call_args[1]['profile'] == client.application.config['LIP_DECODING_PROFILE']
+
+    response = client.post(
+        '/predict_video',
+        data={'video': (BytesIO(b"Dummy video content"), 'test_video.mp4'), 'decoding_profile': 'fastest'},
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 400
+    assert mock_lip_reading.call_count == 2
+
+
+# Test Case 10: the transcription profile of the speech-to-text model is chosen per request
+@patch('app.api.get_text_from_stt')
+@patch('app.api.get_text_from_lip_reading')
+@patch('app.api.preprocess_video')
+def test_predict_video_transcription_profile(mock_preprocess, mock_lip_reading, mock_stt, client):
+    """test that the transcription_profile form field reaches the speech-to-text model, and unknown profiles are rejected."""
+
+    mock_lip_reading.return_value = "THE CAT IS BLUE"
+    mock_stt.return_value = "THE CAT IS BLUE"
+
+    response = client.post(
+        '/predict_video',
+        data={'video': (BytesIO(b"Dummy video content"), 'test_video.mp4'), 'transcription_profile': 'fast'},
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 200
+    assert mock_stt.call_args[1]['profile'] == "fast"
+
+    response = client.post(
+        '/predict_video',
+        data={'video': (BytesIO(b"Dummy video content"), 'test_video.mp4'), 'transcription_profile': 'slow'},
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 400
+    mock_stt.assert_called_once()
+
+
+# Test Case 11: a video failing the triage is rejected before the models run
+@patch('app.api.get_text_from_stt')
+@patch('app.api.get_text_from_lip_reading')
+@patch('app.api.preprocess_video')
+@patch('app.api.run_triage')
+def test_predict_video_triage_rejected(mock_triage, mock_preprocess, mock_lip_reading, mock_stt, client, scratch_root):
+    """test that /predict_video returns 422 with the triage status, without running the models."""
+    from triage import TriageError, NO_FACE
+
+    mock_triage.side_effect = TriageError(NO_FACE, "No face was detected in the video")
+
+    with patch.dict(client.application.config, {'TRIAGE_ENABLED': True}):
+        response = client.post(
+            '/predict_video',
+            data={'video': (BytesIO(b"Dummy video content"), 'test_video.mp4')},
+            content_type='multipart/form-data'
+        )
+
+    assert response.status_code == 422
+    data = json.loads(response.data)
+    assert data['status'] == "no_face"
+    assert data['error'] == "No face was detected in the video"
+    mock_preprocess.assert_not_called()
+    mock_lip_reading.assert_not_called()
+    mock_stt.assert_not_called()
+    assert os.listdir(scratch_root) == []
+
+
+# Test Case 12: No Video Uploaded
 def test_predict_video_no_file(client):
     """test the /predict_video route when no video file is uploaded."""
 
@@ -0,0 +1,58 @@
+import os, sys
+import time
+import argparse
+import skvideo.io
+
+# add the path of the backend folder
+backend_dir = os.path.abspath(os.getcwd() + "/backend")
+sys.path.append(backend_dir)
+import dlib
+from preprocessing import extract_landmarks, ParallelLandmarkExtractor, to_gray
+
+# --- Settings ---
+FACE_PREDICTOR_PATH = "models/shape_predictor_68_face_landmarks.dat"
+
+
+def time_sequential(frames):
+    """
+    Runs the landmark detection on the current process and returns the elapsed seconds.
+    """
+    detector = dlib.get_frontal_face_detector()
+    predictor = dlib.shape_predictor(FACE_PREDICTOR_PATH)
+    start = time.perf_counter()
+    extract_landmarks(frames, detector, predictor, progress=False)
+    return time.perf_counter() - start
+
+
+def time_parallel(frames, workers, chunk_size):
+    """
+    Runs the landmark detection on a pool of worker processes and returns the elapsed seconds.
+    The pool is warmed up first, so worker start-up and model loading are not measured.
+    """
+    extractor = ParallelLandmarkExtractor(FACE_PREDICTOR_PATH, workers, chunk_size)
+    try:
+        extractor.extract(frames[:workers * chunk_size])
+        start = time.perf_counter()
+        extractor.extract(frames)
+        return time.perf_counter() - start
+    finally:
+        extractor.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Landmark detection scaling benchmark")
+    parser.add_argument("video", help="path to the video used for the benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count()])
+    parser.add_argument("--chunk-size", type=int, default=32)
+    args = parser.parse_args()
+
+    # the pipeline detects the landmarks on grayscale frames
+    frames = [to_gray(frame) for frame in skvideo.io.vread(args.video)]
+    print(f"--- Landmark detection on {len(frames)} frames of {args.video} ---")
+
+    baseline = time_sequential(frames)
+    print(f"{'workers':>8} {'seconds':>10} {'frames/s':>10} {'speedup':>8}")
+    print(f"{'seq':>8} {baseline:>10.2f} {len(frames) / baseline:>10.1f} {1.0:>8.2f}")
+    for workers in sorted(set(args.workers)):
+        elapsed = time_parallel(frames, workers, args.chunk_size)
+        print(f"{workers:>8} {elapsed:>10.2f} {len(frames) / elapsed:>10.1f} {baseline / elapsed:>8.2f}")
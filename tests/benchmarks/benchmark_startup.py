@@ -0,0 +1,48 @@
+import os, sys
+import json
+import argparse
+import subprocess
+import statistics
+
+# --- Settings ---
+HEAVY_MODULES = ["torch", "fairseq", "whisper", "dlib", "transformers", "skvideo", "skimage"]
+
+# code run in a fresh interpreter: time the import of the API and the first request, and list the heavy modules loaded
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.api
+imported = time.perf_counter()
+response = app.api.app.test_client().get("/")
+first_request = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "first_request": first_request - imported,
+    "status": response.status_code,
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+""" % HEAVY_MODULES
+
+
+def time_startup():
+    """
+    Starts a fresh Python process, imports app.api and serves the first request.
+    Returns the timings and the heavy modules that were imported along the way.
+    """
+    result = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API startup time benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [time_startup() for _ in range(args.runs)]
+    print(f"--- API startup over {args.runs} fresh processes (run from {os.getcwd()}) ---")
+    print(f"{'run':>4} {'import s':>10} {'first / s':>10} {'status':>7}")
+    for i, run in enumerate(runs, 1):
+        print(f"{i:>4} {run['import']:>10.3f} {run['first_request']:>10.3f} {run['status']:>7}")
+    print(f"{'med':>4} {statistics.median(r['import'] for r in runs):>10.3f} "
+          f"{statistics.median(r['first_request'] for r in runs):>10.3f}")
+    print("heavy modules loaded at startup:", ", ".join(runs[-1]["loaded"]) or "none")
@@ -0,0 +1,83 @@
+import os, sys
+import time
+import argparse
+from difflib import SequenceMatcher
+
+# add the path of the backend folder
+backend_dir = os.path.abspath(os.getcwd() + "/backend")
+sys.path.append(backend_dir)
+from inference import predict_frames, get_text_from_stt, classify_input
+from preprocessing import preprocess_video
+
+# --- Settings ---
+# Folder containing the sample videos (searched recursively)
+DATA_DIR = os.getcwd() + '/tests/test_data'
+CKPT_PATH = "models/finetune-model.pt"
+USER_DIR = "av_hubert/avhubert"
+FACE_PREDICTOR_PATH = "models/shape_predictor_68_face_landmarks.dat"
+MEAN_FACE_PATH = "models/20words_mean_face.npy"
+
+
+def find_videos(directory, limit):
+    """
+    Returns the paths of the sample videos under a directory.
+    """
+    paths = []
+    for root, _, files in os.walk(directory):
+        paths += [os.path.join(root, f) for f in sorted(files) if f.lower().endswith('.mp4')]
+    return paths[:limit] if limit else paths
+
+
+def timed_lip_reading(rois, quantize):
+    """
+    Runs the lip reading model in one mode and returns its transcript and the elapsed seconds.
+    """
+    start = time.perf_counter()
+    text = predict_frames(rois, CKPT_PATH, USER_DIR, quantize=quantize)
+    return text, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the int8 quantized lip reading model with the fp32 model")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="folder of the sample videos")
+    parser.add_argument("--limit", type=int, default=0, help="maximum number of videos (0: all)")
+    args = parser.parse_args()
+
+    videos = find_videos(args.data_dir, args.limit)
+    if not videos:
+        sys.exit(f"No videos found in {args.data_dir}")
+    print(f"--- Quantized lip reading on {len(videos)} videos of {args.data_dir} ---")
+
+    # load both models before timing anything
+    warmup_rois = preprocess_video(videos[0], None, FACE_PREDICTOR_PATH, MEAN_FACE_PATH)
+    for quantize in (False, True):
+        predict_frames(warmup_rois, CKPT_PATH, USER_DIR, quantize=quantize)
+
+    same_text, same_label, similarities = 0, 0, []
+    fp32_seconds, int8_seconds = 0.0, 0.0
+    for video in videos:
+        rois = preprocess_video(video, None, FACE_PREDICTOR_PATH, MEAN_FACE_PATH)
+        speech_text = get_text_from_stt(video)
+        fp32_text, fp32_time = timed_lip_reading(rois, quantize=False)
+        int8_text, int8_time = timed_lip_reading(rois, quantize=True)
+        fp32_seconds += fp32_time
+        int8_seconds += int8_time
+
+        fp32_label = classify_input(fp32_text, speech_text)[1]
+        int8_label = classify_input(int8_text, speech_text)[1]
+        similarity = SequenceMatcher(None, fp32_text, int8_text).ratio() * 100
+        same_text += fp32_text == int8_text
+        same_label += fp32_label == int8_label
+        similarities.append(similarity)
+
+        print(f"\n{os.path.relpath(video, args.data_dir)}: fp32 {fp32_label} / int8 {int8_label} "
+              f"({similarity:.1f}% similar transcripts, {fp32_time:.2f}s -> {int8_time:.2f}s)")
+        if fp32_text != int8_text:
+            print(f"  fp32: {fp32_text}\n  int8: {int8_text}")
+
+    print("\n--- Summary ---")
+    print(f"Identical transcripts:   {same_text}/{len(videos)}")
+    print(f"Same Real/Fake label:    {same_label}/{len(videos)}")
+    print(f"Mean text similarity:    {sum(similarities) / len(similarities):.1f}%")
+    print(f"Lip reading time:        fp32 {fp32_seconds:.1f}s, int8 {int8_seconds:.1f}s "
+          f"(speedup {fp32_seconds / int8_seconds:.2f}x)")
@@ -0,0 +1,67 @@
+import os, sys
+import time
+import argparse
+
+# add the path of the backend folder
+backend_dir = os.path.abspath(os.getcwd() + "/backend")
+sys.path.append(backend_dir)
+from transformers import pipeline
+from inference_image import IMAGE_MODEL, load_image
+from onnx_image import load_onnx_detector
+
+# --- Settings ---
+# Folder containing the test images (searched recursively)
+DATA_DIR = os.getcwd() + '/tests/test_data'
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+
+def find_images(directory):
+    """
+    Returns the paths of all the images under a directory.
+    """
+    paths = []
+    for root, _, files in os.walk(directory):
+        paths += [os.path.join(root, f) for f in sorted(files) if f.lower().endswith(IMAGE_EXTENSIONS)]
+    return paths
+
+
+def run_backend(detector, images, batch_size):
+    """
+    Runs a backend on the decoded images and returns the top (label, score) of every image and the elapsed seconds.
+    """
+    detector(images[:batch_size], batch_size=batch_size)  # warm-up
+    start = time.perf_counter()
+    results = detector(images, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    return [(result[0]['label'], result[0]['score']) for result in results], elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Accuracy parity and speed of the ONNX image backends against PyTorch")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="folder of the test images")
+    parser.add_argument("--model-dir", default="models/onnx", help="folder of the exported ONNX models")
+    parser.add_argument("--batch-size", type=int, default=8)
+    args = parser.parse_args()
+
+    paths = find_images(args.data_dir)
+    if not paths:
+        sys.exit(f"No images found in {args.data_dir}")
+    images = [load_image(path) for path in paths]
+    print(f"--- Image backend parity on {len(images)} images of {args.data_dir} ---")
+
+    reference_pipeline = pipeline("image-classification", model=IMAGE_MODEL)
+    backends = {
+        "pytorch": reference_pipeline,
+        "onnx": load_onnx_detector(IMAGE_MODEL, args.model_dir, pipe=reference_pipeline),
+        "onnx-int8": load_onnx_detector(IMAGE_MODEL, args.model_dir, quantize=True, pipe=reference_pipeline),
+    }
+
+    reference, baseline = run_backend(backends["pytorch"], images, args.batch_size)
+    print(f"{'backend':>10} {'images/s':>10} {'speedup':>8} {'same label':>11} {'max score diff':>15}")
+    for name, detector in backends.items():
+        predictions, elapsed = run_backend(detector, images, args.batch_size)
+        same = sum(p[0] == r[0] for p, r in zip(predictions, reference))
+        # compare the score of the reference label
+        diff = max(abs((p[1] if p[0] == r[0] else 1 - p[1]) - r[1]) for p, r in zip(predictions, reference))
+        print(f"{name:>10} {len(images) / elapsed:>10.1f} {baseline / elapsed:>8.2f} "
+              f"{same:>5}/{len(images):<5} {diff:>15.4f}")
@@ -0,0 +1,63 @@
+# import the required libraries for unit testing
+import unittest
+from unittest.mock import patch, MagicMock
+import sys, os
+import subprocess
+import numpy as np
+# add the path of the backend folder
+backend_dir = os.path.abspath(os.getcwd()+"/backend")
+sys.path.append(backend_dir)
+from audio import load_audio, voiced_frames, trim_silence, SAMPLE_RATE
+
+# create a test class that inherits from unittest.TestCase
+class TestAudio(unittest.TestCase):
+
+    # setup function to print a start message and build a test signal
+    def setUp(self):
+        print("\n---Running audio tests---")
+        # 1 second of silence, 1 second of a 440 Hz tone, 1 second of silence
+        t = np.arange(SAMPLE_RATE) / SAMPLE_RATE
+        tone = 0.5 * np.sin(2 * np.pi * 440 * t).astype(np.float32)
+        silence = np.zeros(SAMPLE_RATE, dtype=np.float32)
+        self.audio = np.concatenate([silence, tone, silence])
+
+    def test_voiced_frames(self):
+        """
+        test case 1: only the frames of the tone are voiced
+        """
+        voiced = voiced_frames(self.audio, frame_ms=100)
+        self.assertEqual(len(voiced), 30)
+        self.assertFalse(voiced[:10].any())
+        self.assertTrue(voiced[10:20].all())
+        self.assertFalse(voiced[20:].any())
+
+    def test_trim_silence(self):
+        """
+        test case 2: the silent spans are removed, except the padding around the voiced part
+        """
+        trimmed = trim_silence(self.audio, frame_ms=100, pad_ms=100)
+        # the tone plus one padding frame on each side
+        self.assertEqual(len(trimmed), int(1.2 * SAMPLE_RATE))
+
+        # a silent signal has nothing to keep
+        self.assertEqual(len(trim_silence(np.zeros(SAMPLE_RATE, dtype=np.float32))), 0)
+        self.assertEqual(len(trim_silence(np.zeros(0, dtype=np.float32))), 0)
+
+    @patch("audio.subprocess.run")
+    def test_load_audio(self, mock_run):
+        """
+        test case 3: the 16 bit samples decoded by ffmpeg are scaled to [-1, 1]
+        :param mock_run: mock object of the ffmpeg call
+        """
+        mock_run.return_value = MagicMock(stdout=np.array([0, 16384, -32768], dtype=np.int16).tobytes())
+        audio = load_audio("video.mp4")
+        np.testing.assert_allclose(audio, [0.0, 0.5, -1.0])
+        self.assertIn("video.mp4", mock_run.call_args[0][0])
+
+        # ffmpeg errors are raised as RuntimeError
+        mock_run.side_effect = subprocess.CalledProcessError(1, "ffmpeg", stderr=b"no audio stream")
+        with self.assertRaises(RuntimeError):
+            load_audio("video.mp4")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+# import the required libraries for unit testing
+import unittest
+import sys, os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+# add the path of the backend folder
+backend_dir = os.path.abspath(os.getcwd()+"/backend")
+sys.path.append(backend_dir)
+from batching import MicroBatcher
+
+# create a test class that inherits from unittest.TestCase
+class TestMicroBatcher(unittest.TestCase):
+
+    # setup function to print a start message for the test
+    def setUp(self):
+        print("\n---Running batching tests---")
+        self.batches = []
+
+    # batched function recording the batches it receives
+    def double(self, items):
+        self.batches.append(list(items))
+        return [item * 2 for item in items]
+
+    def test_concurrent_calls_share_a_batch(self):
+        """
+        test case 1: concurrent calls are grouped into batches and every caller gets its own result
+        """
+        batcher = MicroBatcher(self.double, max_batch=16, max_wait=0.2)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(batcher.submit, range(8)))
+
+        self.assertEqual(results, [item * 2 for item in range(8)])
+        # fewer calls than items, and no item is lost
+        self.assertLess(len(self.batches), 8)
+        self.assertEqual(sorted(sum(self.batches, [])), list(range(8)))
+
+    def test_max_batch(self):
+        """
+        test case 2: a batch never holds more than max_batch items
+        """
+        batcher = MicroBatcher(self.double, max_batch=3, max_wait=0.2)
+        with ThreadPoolExecutor(max_workers=7) as executor:
+            list(executor.map(batcher.submit, range(7)))
+
+        self.assertTrue(all(len(batch) <= 3 for batch in self.batches))
+        self.assertGreaterEqual(len(self.batches), 3)
+
+    def test_single_call(self):
+        """
+        test case 3: a lone call is run after max_wait without waiting for a full batch
+        """
+        batcher = MicroBatcher(self.double, max_batch=16, max_wait=0.001)
+        self.assertEqual(batcher.submit(21), 42)
+        self.assertEqual(self.batches, [[21]])
+
+    def test_exception(self):
+        """
+        test case 4: an error of the batched function is raised in every waiting caller
+        and the batcher keeps working afterwards
+        """
+        fail = threading.Event()
+        fail.set()
+
+        def function(items):
+            if fail.is_set():
+                raise RuntimeError("model crashed")
+            return items
+
+        batcher = MicroBatcher(function, max_wait=0.001)
+        with self.assertRaises(RuntimeError):
+            batcher.submit(1)
+
+        fail.clear()
+        self.assertEqual(batcher.submit(2), 2)
+
+    def test_missing_results(self):
+        """
+        test case 5: a batched function returning the wrong number of results fails the callers instead of blocking them
+        """
+        batcher = MicroBatcher(lambda items: [], max_wait=0.001)
+        with self.assertRaises(RuntimeError):
+            batcher.submit(1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -10,7 +10,9 @@ import cv2
 # add the path of backend model
 backend_dir = os.path.abspath(os.path.join(os.getcwd(), "backend"))
 sys.path.append(backend_dir)
-from inference_image import predict_image 
+import inference_image
+from inference_image import predict_image, predict_images, load_image
+from PIL import Image
 
 class TestInferenceImage(unittest.TestCase):
 
@@ -36,6 +38,8 @@ class TestInferenceImage(unittest.TestCase):
             os.remove(self.img_path)
 
     
+    @patch("inference_image.settings.IMAGE_MICRO_BATCH", False)
+    @patch("inference_image.detector", None)
     @patch("inference_image.pipeline")
     def test_predict_image(self, mock_pipeline):
         """
@@ -62,6 +66,118 @@ class TestInferenceImage(unittest.TestCase):
         # check the label and score 
         self.assertEqual(label, "Real")
         self.assertAlmostEqual(score, 0.6, places=2)
+
+
+    @patch("inference_image.detector", None)
+    @patch("inference_image.pipeline")
+    def test_load_detector(self, mock_pipeline):
+        """
+        test case: test the load_detector() builds the pipeline on the first call only
+
+        :param self: instance of the class
+        :param mock_pipeline: mock object of pipeline function
+        """
+        loads_before = inference_image.model_load_seconds.count(model="image")
+        first = inference_image.load_detector()
+        second = inference_image.load_detector()
+
+        self.assertIs(first, mock_pipeline.return_value)
+        self.assertIs(second, first)
+        mock_pipeline.assert_called_once_with("image-classification", model=inference_image.IMAGE_MODEL)
+        #the lazy load is timed once, the next calls reuse the model
+        self.assertEqual(inference_image.model_load_seconds.count(model="image"), loads_before + 1)
+
+
+    @patch("inference_image.detector")
+    def test_warmup_image(self, mock_detector):
+        """
+        test case: test the warmup_image() runs the model once on a blank image
+
+        :param self: instance of the class
+        :param mock_detector: mock object of the loaded pipeline
+        """
+        inference_image.warmup_image()
+
+        mock_detector.assert_called_once()
+        images = mock_detector.call_args[0][0]
+        self.assertEqual(len(images), 1)
+        self.assertEqual(images[0].size, (224, 224))
+        self.assertEqual(mock_detector.call_args[1], {"batch_size": 1})
+
+
+    @patch("inference_image.detector")
+    def test_predict_images(self, mock_detector):
+        """
+        test case: test the predict_images() runs the images in batches and keeps their order
+
+        :param self: instance of the class
+        :param mock_detector: mock object of the loaded pipeline
+        """
+        mock_detector.return_value = [
+            [{"label": "Real", "score": 0.9}, {"label": "Fake", "score": 0.1}],
+            [{"label": "Fake", "score": 0.7}, {"label": "Real", "score": 0.3}],
+        ]
+
+        results = predict_images([self.img_path, self.img_path], batch_size=4)
+
+        # one call for all the decoded images with the batch size
+        images = mock_detector.call_args[0][0]
+        self.assertEqual(len(images), 2)
+        self.assertTrue(all(isinstance(image, Image.Image) for image in images))
+        self.assertEqual(mock_detector.call_args[1], {"batch_size": 4})
+        self.assertEqual(results, [("Real", 0.9), ("Fake", 0.7)])
+        # no images do not run the model
+        self.assertEqual(predict_images([]), [])
+        mock_detector.assert_called_once()
+
+
+    @patch("inference_image.settings.IMAGE_MICRO_BATCH", True)
+    @patch("inference_image.detector")
+    def test_predict_image_micro_batch(self, mock_detector):
+        """
+        test case: test the predict_image() goes through the micro-batcher and returns the label and score
+
+        :param self: instance of the class
+        :param mock_detector: mock object of the loaded pipeline
+        """
+        mock_detector.return_value = [[{"label": "Fake", "score": 0.8}]]
+
+        with open(self.img_path, "rb") as f:
+            label, score = predict_image(f.read())
+
+        self.assertEqual((label, score), ("Fake", 0.8))
+        mock_detector.assert_called_once()
+        self.assertEqual(len(mock_detector.call_args[0][0]), 1)
+        self.assertEqual(mock_detector.call_args[1], {"batch_size": 1})
+
+
+    def test_load_image(self):
+        """
+        test case: test the load_image() decodes paths, bytes and PIL images, and reduces large JPEGs
+
+        :param self: instance of the class
+        """
+        with open(self.img_path, "rb") as f:
+            image_bytes = f.read()
+
+        # the small image is decoded at full size whatever its source
+        for source in (self.img_path, image_bytes, Image.open(self.img_path)):
+            image = load_image(source, decode_size=448)
+            self.assertEqual(image.size, (100, 100))
+
+        # a large JPEG is decoded at a reduced size that still covers decode_size
+        large = tempfile.NamedTemporaryFile(delete=False, suffix=".jpg")
+        large.close()
+        cv2.imwrite(large.name, np.full((2000, 3000, 3), 128, dtype=np.uint8))
+        try:
+            reduced = load_image(large.name, decode_size=448)
+            self.assertLess(reduced.size[0], 3000)
+            self.assertGreaterEqual(min(reduced.size), 448)
+            self.assertEqual(reduced.mode, "RGB")
+            # 0 decodes the full image
+            self.assertEqual(load_image(large.name, decode_size=0).size, (3000, 2000))
+        finally:
+            os.remove(large.name)
         
 
 if __name__ == "__main__":
@@ -2,11 +2,15 @@
 import unittest
 from unittest.mock import patch, MagicMock
 import sys, os
+import tempfile
+import numpy as np
 import torch
 # add the path of the backend folder
 backend_dir = os.path.abspath(os.getcwd()+"/backend")
 sys.path.append(backend_dir)
-from inference import predict, get_text_from_lip_reading, get_text_from_stt, classify_input
+import inference
+from inference import predict, get_text_from_lip_reading, get_text_from_stt, classify_input, load_lip_reading_model
+from inference import load_whisper_model, build_lip_reading_sample
 
 # create a test class that inherits from unittest.TestCase
 class TestInferenceVideo(unittest.TestCase):
@@ -14,11 +18,14 @@ class TestInferenceVideo(unittest.TestCase):
     # setup function to print a start message for the test
     def setUp(self):
         print("\n---Running inference_video tests---")
-
-    @patch("backend.inference.cv2.VideoCapture")
-    @patch("backend.inference.utils")  
-    @patch("backend.inference.checkpoint_utils.load_model_ensemble_and_task")
-    @patch("backend.inference.tasks.setup_task")
+        # start every test with an empty model registry
+        inference._lip_reading_models.clear()
+        inference._whisper_models.clear()
+
+    @patch("inference.cv2.VideoCapture")
+    @patch("inference.utils")  
+    @patch("inference.checkpoint_utils.load_model_ensemble_and_task")
+    @patch("inference.tasks.setup_task")
     def test_predict_success(
         self,
         mock_setup_task,
@@ -40,37 +47,59 @@ class TestInferenceVideo(unittest.TestCase):
 
         # mock the return values of the functions to prevent errors
         mock_utils.import_user_module.return_value = True
-        mock_utils.split_paths.return_value = []
 
-        # create mock video frames to be returned by cv2.VideoCapture
+        # create mock video frames (10 frames of 96x96) to be returned by cv2.VideoCapture
         mock_cap = MagicMock()
-        mock_cap.get.return_value = 10
+        mock_cap.read.side_effect = [(True, np.zeros((96, 96, 3), dtype=np.uint8))] * 10 + [(False, None)]
         mock_videocap.return_value = mock_cap
 
-        # create a mock model to be returned in load_model_ensemble_and_task
+        # create a mock model and config to be returned in load_model_ensemble_and_task
         fake_model = MagicMock()
-        mock_load_ensemble.return_value = ([fake_model], MagicMock(), MagicMock())
-        # create a mock task to be returned in load_model_ensemble_and_task
+        fake_cfg = MagicMock()
+        fake_cfg.task.image_crop_size = 88
+        fake_cfg.task.image_mean = 0.421
+        fake_cfg.task.image_std = 0.165
+        mock_load_ensemble.return_value = ([fake_model], fake_cfg, MagicMock())
+        # create a mock task to be returned in setup_task
         fake_task = MagicMock()
         mock_setup_task.return_value = fake_task
 
-        # mock the patch iterator
-        fake_iterator = MagicMock()
-        fake_iterator.__next__.return_value = {"target": torch.tensor([[1, 2, 3]])}
-        fake_task.get_batch_iterator.return_value.next_epoch_itr.return_value = fake_iterator
-
         # task returns a sample inference result
         fake_task.inference_step.return_value = [[{"tokens": torch.tensor([3, 4, 5])}]]
 
         # mock the decoder behaviour 
-        fake_task.target_dictionary = MagicMock()
-        fake_task.datasets = {"test": MagicMock()}
-        fake_task.datasets["test"].label_processors = [MagicMock(decode=lambda x, y: "decoded")]
+        fake_task.target_dictionary.string.return_value = "encoded"
+        fake_task.s2s_tokenizer.decode.return_value = "decoded"
         # test the function
         result = predict("video.mp4", "model-checkpoint.pt", "av_hubert/avhubert")
         # assert
         self.assertEqual(result, "decoded")
 
+        # check the sample is built in memory with the shape (B, C, T, H, W)
+        sample = fake_task.inference_step.call_args[0][2]
+        self.assertEqual(tuple(sample["net_input"]["source"]["video"].shape), (1, 1, 10, 88, 88))
+        self.assertIsNone(sample["net_input"]["source"]["audio"])
+        # no dataset is loaded from disk
+        fake_task.load_dataset.assert_not_called()
+
+
+    def test_build_lip_reading_sample(self):
+        """
+        test case: test that build_lip_reading_sample() normalizes and center crops the frames
+
+        Docstring for test_build_lip_reading_sample
+
+        :param self: instance of the class
+        """
+        task_cfg = MagicMock(image_crop_size=88, image_mean=0.5, image_std=0.25)
+        # white frames become (1 - 0.5) / 0.25 = 2 after normalization
+        frames = np.full((5, 96, 96), 255, dtype=np.uint8)
+        sample = build_lip_reading_sample(frames, task_cfg)
+        video = sample["net_input"]["source"]["video"]
+        self.assertEqual(tuple(video.shape), (1, 1, 5, 88, 88))
+        self.assertTrue(torch.allclose(video, torch.full_like(video, 2.0)))
+        self.assertFalse(sample["net_input"]["padding_mask"].any())
+
 
     def test_predict_no_frames(self):
         """
@@ -83,7 +112,7 @@ class TestInferenceVideo(unittest.TestCase):
 
         with patch("inference.cv2.VideoCapture") as mock_cap:
             # mock the case where no frames are detected
-            mock_cap.return_value.get.return_value = 0
+            mock_cap.return_value.read.return_value = (False, None)
             # test it returns an exception
             with self.assertRaises(Exception):
                 predict("empty.mp4", "model-checkpoint.pt", "av_hubert/avhubert")
@@ -99,14 +128,193 @@ class TestInferenceVideo(unittest.TestCase):
 
         with patch("inference.cv2.VideoCapture") as mock_cap, \
              patch("inference.checkpoint_utils.load_model_ensemble_and_task") as mock_load:
-            # return the number of frames but raise an error on model load fail
-            mock_cap.return_value.get.return_value = 25
+            # return the frames but raise an error on model load fail
+            mock_cap.return_value.read.side_effect = [(True, np.zeros((96, 96, 3), dtype=np.uint8))] * 25 + [(False, None)]
             mock_load.side_effect = RuntimeError("Checkpoint load failed")
 
             with self.assertRaises(RuntimeError):
                 predict("video.mp4", "checkpoint-failed-load.pt", "av_hubert/avhubert")
             
 
+    @patch("inference.settings.CONCURRENT_BRANCHES", True)
+    @patch("inference.settings.TORCH_THREADS", 0)
+    @patch("inference._torch_threads_configured", False)
+    @patch("inference.os.cpu_count", return_value=8)
+    @patch("inference.torch.set_num_threads")
+    @patch("inference.whisper")
+    def test_configure_torch_threads(self, mock_whisper, mock_set_num_threads, mock_cpu_count):
+        """
+        test case: test that the torch threads of the process are set once, before the first model load
+
+        Docstring for test_configure_torch_threads
+
+        :param self: instance of the class
+        :param mock_whisper: mock object of Whisper
+        :param mock_set_num_threads: mock object of torch.set_num_threads
+        :param mock_cpu_count: mock object of os.cpu_count
+        """
+        load_whisper_model("tiny")
+        load_whisper_model("base")
+        inference.configure_torch_threads()
+        # half of the cores with concurrent branches, set once and never restored
+        mock_set_num_threads.assert_called_once_with(4)
+
+        # an explicit setting wins, 0 without concurrent branches keeps the torch default
+        for torch_threads, concurrent, expected in ((6, True, [6]), (0, False, [])):
+            mock_set_num_threads.reset_mock()
+            with patch("inference._torch_threads_configured", False), \
+                 patch("inference.settings.TORCH_THREADS", torch_threads), \
+                 patch("inference.settings.CONCURRENT_BRANCHES", concurrent):
+                inference.configure_torch_threads()
+            self.assertEqual([c.args[0] for c in mock_set_num_threads.call_args_list], expected)
+
+
+    @patch("inference.utils")
+    @patch("inference.tasks.setup_task")
+    @patch("inference.checkpoint_utils.load_model_ensemble_and_task")
+    def test_load_lip_reading_model_cached(self, mock_load_ensemble, mock_setup_task, mock_utils):
+        """
+        test case: test that the lip reading model is loaded once and reused
+
+        Docstring for test_load_lip_reading_model_cached
+
+        :param self: instance of the class
+        :param mock_load_ensemble: mock object of load_model_ensemble_and_task function
+        :param mock_setup_task: mock object of the setup_task function
+        :param mock_utils: mock object of utils functions
+        """
+        mock_load_ensemble.return_value = ([MagicMock()], MagicMock(), MagicMock())
+        loads_before = inference.model_load_seconds.count(model="lip_reading")
+        # load the same checkpoint twice
+        first = load_lip_reading_model("model-checkpoint.pt", "av_hubert/avhubert")
+        second = load_lip_reading_model("model-checkpoint.pt", "av_hubert/avhubert")
+        # the second call should return the warm handle without reloading
+        self.assertIs(first, second)
+        mock_load_ensemble.assert_called_once()
+        mock_setup_task.assert_called_once()
+        # only the real load records its load time
+        self.assertEqual(inference.model_load_seconds.count(model="lip_reading"), loads_before + 1)
+
+
+    @patch("inference.settings.LIP_READING_QUANTIZED_CACHE", True)
+    @patch("inference.torch.save")
+    @patch("inference.quantize_lip_reading_models")
+    @patch("inference.utils")
+    @patch("inference.tasks.setup_task")
+    @patch("inference.checkpoint_utils.load_model_ensemble_and_task")
+    def test_load_lip_reading_model_quantized(self, mock_load_ensemble, mock_setup_task, mock_utils,
+                                              mock_quantize, mock_save):
+        """
+        test case: test that the quantized mode quantizes the models, saves them next to the checkpoint
+        and is kept apart from the fp32 model in the registry
+
+        :param self: instance of the class
+        :param mock_load_ensemble: mock object of load_model_ensemble_and_task function
+        :param mock_setup_task: mock object of the setup_task function
+        :param mock_utils: mock object of utils functions
+        :param mock_quantize: mock object of the int8 quantization
+        :param mock_save: mock object of torch.save
+        """
+        mock_load_ensemble.return_value = ([MagicMock()], MagicMock(), MagicMock())
+        quantized_models = [MagicMock()]
+        mock_quantize.return_value = quantized_models
+
+        quantized = load_lip_reading_model("model-checkpoint.pt", "av_hubert/avhubert", quantize=True)
+        full_precision = load_lip_reading_model("model-checkpoint.pt", "av_hubert/avhubert", quantize=False)
+
+        self.assertIs(quantized.models, quantized_models)
+        self.assertIsNot(full_precision, quantized)
+        mock_quantize.assert_called_once()
+        # the quantized models are cached on disk next to the checkpoint
+        self.assertEqual(mock_save.call_args[0][1], "model-checkpoint.int8.pt")
+        self.assertIs(mock_save.call_args[0][0]["models"], quantized_models)
+
+
+    @patch("inference.settings.LIP_READING_QUANTIZED_CACHE", True)
+    @patch("inference.torch.load")
+    @patch("inference.checkpoint_utils.load_model_ensemble_and_task")
+    def test_load_quantized_checkpoint_from_cache(self, mock_load_ensemble, mock_load):
+        """
+        test case: test that a quantized copy newer than the checkpoint is loaded instead of the checkpoint
+
+        :param self: instance of the class
+        :param mock_load_ensemble: mock object of load_model_ensemble_and_task function
+        :param mock_load: mock object of torch.load
+        """
+        cached_models, cfg, task_state = [MagicMock()], MagicMock(), {"dictionary": None}
+        mock_load.return_value = {"models": cached_models, "cfg": cfg, "task_state": task_state}
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            ckpt_path = os.path.join(tmp_dir, "model.pt")
+            open(ckpt_path, "wb").close()
+            open(os.path.join(tmp_dir, "model.int8.pt"), "wb").close()
+
+            models, loaded_cfg, loaded_state = inference.load_lip_reading_checkpoint(ckpt_path, quantize=True)
+
+        self.assertIs(models, cached_models)
+        self.assertIs(loaded_cfg, cfg)
+        mock_load_ensemble.assert_not_called()
+
+
+    # function to register a mocked lip reading model returning the given hypothesis scores, one per decoding
+    def mock_lip_reading_model(self, scores):
+        task = MagicMock()
+        task.inference_step.side_effect = [[[{"tokens": torch.tensor([3, 4]), "score": score}]] for score in scores]
+        task.target_dictionary.string.return_value = "encoded"
+        task.s2s_tokenizer.decode.return_value = "decoded"
+        task.build_generator.side_effect = lambda models, cfg: MagicMock(beam=cfg.beam)
+        cfg = MagicMock()
+        cfg.task.image_crop_size = 88
+        cfg.task.image_mean = 0.421
+        cfg.task.image_std = 0.165
+        model = inference.LipReadingModel([MagicMock()], cfg, task, {})
+        return patch("inference.load_lip_reading_model", return_value=model), task
+
+    def test_decoding_profiles(self):
+        """
+        test case: test that every decoding profile uses its beam size and the generators are built once per beam
+
+        Docstring for test_decoding_profiles
+
+        :param self: instance of the class
+        """
+        frames = np.zeros((10, 96, 96), dtype=np.uint8)
+        patcher, task = self.mock_lip_reading_model([-0.1] * 4)
+        with patcher:
+            for profile in ("fast", "balanced", "accurate", "fast"):
+                self.assertEqual(inference.predict_frames(frames, "ckpt.pt", "user_dir", profile=profile), "decoded")
+
+        beams = [call[0][0].beam for call in task.inference_step.call_args_list]
+        self.assertEqual(beams, [1, 5, 20, 1])
+        # the fast generator is reused by the second fast request
+        self.assertEqual(task.build_generator.call_count, 3)
+
+    def test_adaptive_decoding_profile(self):
+        """
+        test case: test that the adaptive profile widens the beam only for a low hypothesis score
+
+        Docstring for test_adaptive_decoding_profile
+
+        :param self: instance of the class
+        """
+        frames = np.zeros((10, 96, 96), dtype=np.uint8)
+        # a confident greedy hypothesis is kept
+        patcher, task = self.mock_lip_reading_model([-0.2])
+        with patcher:
+            inference.predict_frames(frames, "ckpt.pt", "user_dir", profile="adaptive")
+        self.assertEqual([call[0][0].beam for call in task.inference_step.call_args_list], [1])
+
+        # an unsure greedy hypothesis is decoded again with the accurate beam
+        patcher, task = self.mock_lip_reading_model([-3.0, -0.5])
+        with patcher:
+            inference.predict_frames(frames, "ckpt.pt", "user_dir", profile="adaptive")
+        self.assertEqual([call[0][0].beam for call in task.inference_step.call_args_list], [1, 20])
+
+        # unknown profiles are rejected
+        with self.assertRaises(ValueError):
+            inference.predict_frames(frames, "ckpt.pt", "user_dir", profile="fastest")
+
+
     @patch("inference.predict")
     def test_get_text_from_lip_reading(self, mock_predict):
         """
@@ -126,6 +334,27 @@ class TestInferenceVideo(unittest.TestCase):
         self.assertEqual(result, "hello")
 
 
+    @patch("inference.predict_frames")
+    @patch("inference.predict")
+    def test_get_text_from_lip_reading_in_memory(self, mock_predict, mock_predict_frames):
+        """
+        test case: test that get_text_from_lip_reading() runs the model on an in-memory roi array
+
+        Docstring for test_get_text_from_lip_reading_in_memory
+
+        :param self: instance of the class
+        :param mock_predict: mock object of the predict function
+        :param mock_predict_frames: mock object of the predict_frames function
+        """
+        mock_predict_frames.return_value = "hello"
+        rois = np.zeros((10, 96, 96), dtype=np.uint8)
+        result = get_text_from_lip_reading(rois)
+        self.assertEqual(result, "hello")
+        # the roi is not read back from a file
+        mock_predict.assert_not_called()
+        self.assertIs(mock_predict_frames.call_args[0][0], rois)
+
+
     @patch("inference.predict")
     def test_get_text_from_lip_reading_with_predict_error(self, mock_predict):
         """
@@ -161,6 +390,7 @@ class TestInferenceVideo(unittest.TestCase):
         mock_model.transcribe.return_value = {"text": "this is a test"}
         # whisper.load_model should return our model
         mock_whisper.load_model.return_value = mock_model
+        loads_before = inference.model_load_seconds.count(model="whisper")
         # get the result 
         result = get_text_from_stt("test.mp4")
         # check it is equal to a test string
@@ -168,11 +398,109 @@ class TestInferenceVideo(unittest.TestCase):
 
         # ensure whisper.load_model was called once with correct model size
         mock_whisper.load_model.assert_called_once_with("medium")
+        # the first transcription loaded the model and recorded its load time
+        self.assertEqual(inference.model_load_seconds.count(model="whisper"), loads_before + 1)
 
         # ensure model.transcribe was called with the given file
         mock_model.transcribe.assert_called_once_with("test.mp4")
 
     
+    @patch("inference.settings.WHISPER_LANGUAGE", "en")
+    @patch("inference.whisper")
+    def test_get_text_from_stt_fast_profile(self, mock_whisper):
+        """
+        test case: test that the fast transcription profile fixes the language and disables the fallback
+
+        Docstring for test_get_text_from_stt_fast_profile
+
+        :param self: instance of the class
+        :param mock_whisper: mock object of Whisper
+        """
+        mock_model = MagicMock()
+        mock_model.transcribe.return_value = {"text": "this is a test"}
+        mock_whisper.load_model.return_value = mock_model
+
+        self.assertEqual(get_text_from_stt("test.mp4", profile="fast"), "this is a test")
+
+        options = mock_model.transcribe.call_args[1]
+        self.assertEqual(options["language"], "en")
+        self.assertEqual(options["temperature"], 0.0)
+        self.assertIsNone(options["compression_ratio_threshold"])
+        self.assertIsNone(options["logprob_threshold"])
+        self.assertFalse(options["fp16"])
+
+        # unknown profiles are rejected
+        with self.assertRaises(ValueError):
+            get_text_from_stt("test.mp4", profile="fastest")
+
+
+    @patch("inference.trim_silence")
+    @patch("inference.load_audio")
+    @patch("inference.whisper")
+    def test_get_text_from_stt_vad(self, mock_whisper, mock_load_audio, mock_trim_silence):
+        """
+        test case: test that the voice activity trimming transcribes the voiced samples only,
+        and skips the model for a silent video
+
+        Docstring for test_get_text_from_stt_vad
+
+        :param self: instance of the class
+        :param mock_whisper: mock object of Whisper
+        :param mock_load_audio: mock object of the audio decoding
+        :param mock_trim_silence: mock object of the silence trimming
+        """
+        mock_model = MagicMock()
+        mock_model.transcribe.return_value = {"text": "this is a test"}
+        mock_whisper.load_model.return_value = mock_model
+        voiced = np.ones(16000, dtype=np.float32)
+        mock_trim_silence.return_value = voiced
+
+        self.assertEqual(get_text_from_stt("test.mp4", vad=True), "this is a test")
+        mock_load_audio.assert_called_once_with("test.mp4")
+        self.assertIs(mock_model.transcribe.call_args[0][0], voiced)
+
+        # a silent video is not transcribed
+        mock_trim_silence.return_value = np.zeros(0, dtype=np.float32)
+        self.assertEqual(get_text_from_stt("test.mp4", vad=True), "")
+        mock_model.transcribe.assert_called_once()
+
+
+    @patch("inference.whisper")
+    def test_whisper_model_cached(self, mock_whisper):
+        """
+        test case: test that the Whisper model is loaded once and reused across calls
+
+        Docstring for test_whisper_model_cached
+
+        :param self: instance of the class
+        :param mock_whisper: mock object of Whisper
+        """
+        mock_model = MagicMock()
+        mock_model.transcribe.return_value = {"text": "this is a test"}
+        mock_whisper.load_model.return_value = mock_model
+        # transcribe two files
+        get_text_from_stt("first.mp4")
+        get_text_from_stt("second.mp4")
+        # the model should be loaded only once
+        mock_whisper.load_model.assert_called_once_with("medium")
+        self.assertEqual(mock_model.transcribe.call_count, 2)
+
+
+    @patch("inference.whisper")
+    def test_whisper_model_size_config(self, mock_whisper):
+        """
+        test case: test that the Whisper model size can be chosen
+
+        Docstring for test_whisper_model_size_config
+
+        :param self: instance of the class
+        :param mock_whisper: mock object of Whisper
+        """
+        with patch("inference.settings.WHISPER_MODEL", "tiny"):
+            load_whisper_model()
+        mock_whisper.load_model.assert_called_once_with("tiny")
+
+
     @patch("inference.whisper")
     def test_model_load_failure(self, mock_whisper):
         """
@@ -0,0 +1,136 @@
+# import the required libraries for unit testing
+import unittest
+from unittest.mock import MagicMock
+import sys, os
+import threading
+import time
+# add the path of the backend folder
+backend_dir = os.path.abspath(os.getcwd()+"/backend")
+sys.path.append(backend_dir)
+from jobs import JobBackend, LocalJobBackend, QueueFullError, create_job_backend, QUEUED, DONE, FAILED
+
+# function to wait until a job has finished and return it
+def wait_for_job(backend, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = backend.get(job_id)
+        if job["status"] in (DONE, FAILED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish in {timeout} seconds")
+
+# create a test class that inherits from unittest.TestCase
+class TestJobs(unittest.TestCase):
+
+    # setup function to print a start message for the test
+    def setUp(self):
+        print("\n---Running jobs tests---")
+        self.backend = LocalJobBackend(workers=1, max_pending=2, ttl=60)
+
+    def tearDown(self):
+        self.backend.executor.shutdown(wait=True)
+
+    def test_job_success(self):
+        """
+        test case 1: a submitted job runs in the background and its result is kept
+        """
+        cleanup = MagicMock()
+        job_id = self.backend.submit(lambda a, b: a + b, 1, 2, cleanup=cleanup)
+
+        job = wait_for_job(self.backend, job_id)
+        self.assertEqual(job["status"], DONE)
+        self.assertEqual(job["result"], 3)
+        cleanup.assert_called_once()
+
+    def test_job_failure(self):
+        """
+        test case 2: an exception raised by the job is recorded as its error
+        """
+        def fail():
+            raise RuntimeError("no face detected")
+
+        cleanup = MagicMock()
+        job_id = self.backend.submit(fail, cleanup=cleanup)
+
+        job = wait_for_job(self.backend, job_id)
+        self.assertEqual(job["status"], FAILED)
+        self.assertEqual(job["error"], "no face detected")
+        # the cleanup also runs when the job fails
+        cleanup.assert_called_once()
+        self.assertNotIn("error_status", job)
+
+    def test_job_failure_status(self):
+        """
+        test case 6: the status carried by an exception (e.g. a TriageError) is kept with the error
+        """
+        class RejectedError(Exception):
+            def __init__(self, status, message):
+                super().__init__(message)
+                self.status = status
+
+        def reject():
+            raise RejectedError("too_short", "The video is too short")
+
+        job = wait_for_job(self.backend, self.backend.submit(reject))
+        self.assertEqual(job["status"], FAILED)
+        self.assertEqual(job["error"], "The video is too short")
+        self.assertEqual(job["error_status"], "too_short")
+
+    def test_queue_full(self):
+        """
+        test case 3: jobs above the queue size are rejected until a job has finished
+        :param release: event blocking the running jobs
+        """
+        release = threading.Event()
+        first = self.backend.submit(release.wait)
+        second = self.backend.submit(release.wait)
+        self.assertEqual(self.backend.get(second)["status"], QUEUED)
+
+        with self.assertRaises(QueueFullError):
+            self.backend.submit(release.wait)
+
+        # once the jobs are done new jobs are accepted again
+        release.set()
+        wait_for_job(self.backend, first)
+        wait_for_job(self.backend, second)
+        self.backend.submit(lambda: None)
+
+    def test_finished_jobs_expire(self):
+        """
+        test case 4: finished jobs are forgotten after the ttl
+        """
+        job_id = self.backend.submit(lambda: "done")
+        wait_for_job(self.backend, job_id)
+        self.backend.ttl = 0
+        time.sleep(0.01)
+
+        self.assertIsNone(self.backend.get(job_id))
+        self.assertIsNone(self.backend.get("unknown"))
+
+    def test_create_job_backend(self):
+        """
+        test case 5: backends are created by name and unknown names raise an error
+        """
+        backend = create_job_backend("local", workers=2, max_pending=4, ttl=10)
+        self.assertIsInstance(backend, LocalJobBackend)
+        self.assertEqual(backend.max_pending, 4)
+        backend.executor.shutdown()
+
+        with self.assertRaises(ValueError):
+            create_job_backend("redis")
+
+    def test_incomplete_backend(self):
+        """
+        test case 7: a backend missing submit() or get() fails when it is created, not on its first job
+        """
+        class SubmitOnlyBackend(JobBackend):
+            def submit(self, function, *args, cleanup=None):
+                return "job"
+
+        with self.assertRaises(TypeError):
+            JobBackend()
+        with self.assertRaises(TypeError):
+            SubmitOnlyBackend()
+
+if __name__ == "__main__":
+    unittest.main()
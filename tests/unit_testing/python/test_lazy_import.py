@@ -0,0 +1,90 @@
+# import the required libraries for unit testing
+import unittest
+from unittest.mock import patch, MagicMock
+import sys, os
+import shutil
+import tempfile
+# add the path of the backend folder
+backend_dir = os.path.abspath(os.getcwd()+"/backend")
+sys.path.append(backend_dir)
+from lazy_import import LazyModule
+
+# create a test class that inherits from unittest.TestCase
+class TestLazyModule(unittest.TestCase):
+
+    # setup function to write a small package that is only importable from a temporary folder
+    def setUp(self):
+        print("\n---Running lazy_import tests---")
+        self.temp_dir = tempfile.mkdtemp()
+        package_dir = os.path.join(self.temp_dir, "lazy_probe")
+        os.makedirs(package_dir)
+        with open(os.path.join(package_dir, "__init__.py"), "w") as f:
+            f.write("VALUE = 1\ndef double(x):\n    return 2 * x\n")
+        with open(os.path.join(package_dir, "extra.py"), "w") as f:
+            f.write("NAME = 'extra'\n")
+        sys.path.insert(0, self.temp_dir)
+
+    # tearDown function to forget the package and remove the folder
+    def tearDown(self):
+        sys.path.remove(self.temp_dir)
+        for name in ("lazy_probe", "lazy_probe.extra"):
+            sys.modules.pop(name, None)
+        shutil.rmtree(self.temp_dir)
+
+    def test_import_on_first_use(self):
+        """
+        test case 1: the module is imported on the first attribute access and the setup runs once before it
+
+        :param self: instance of the class
+        """
+        setup = MagicMock(side_effect=lambda: self.assertNotIn("lazy_probe", sys.modules))
+        module = LazyModule("lazy_probe", setup=setup)
+
+        self.assertFalse(module.loaded)
+        self.assertNotIn("lazy_probe", sys.modules)
+
+        self.assertEqual(module.VALUE, 1)
+        self.assertEqual(module.double(3), 6)
+        self.assertTrue(module.loaded)
+        setup.assert_called_once()
+
+    def test_submodules(self):
+        """
+        test case 2: the submodules are imported together with the module
+
+        :param self: instance of the class
+        """
+        module = LazyModule("lazy_probe", "lazy_probe.extra")
+
+        self.assertEqual(module.extra.NAME, "extra")
+
+    def test_patch_through_the_proxy(self):
+        """
+        test case 3: patching an attribute of the proxy patches the real module and is undone afterwards
+
+        :param self: instance of the class
+        """
+        module = LazyModule("lazy_probe")
+
+        with patch.object(module, "double", return_value=0):
+            self.assertEqual(module.double(3), 0)
+            self.assertEqual(sys.modules["lazy_probe"].double(3), 0)
+
+        self.assertEqual(module.double(3), 6)
+        self.assertEqual(sys.modules["lazy_probe"].double(3), 6)
+
+    def test_missing_module(self):
+        """
+        test case 4: a missing module raises ImportError on the first use, not when the proxy is created
+
+        :param self: instance of the class
+        """
+        module = LazyModule("lazy_probe_missing")
+
+        with self.assertRaises(ImportError):
+            module.VALUE
+
+
+# run the tests
+if __name__ == '__main__':
+    unittest.main()
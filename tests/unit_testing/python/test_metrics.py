@@ -0,0 +1,135 @@
+# import the required libraries for unit testing
+import unittest
+import sys, os
+from concurrent.futures import ThreadPoolExecutor
+# add the path of the backend folder
+backend_dir = os.path.abspath(os.getcwd()+"/backend")
+sys.path.append(backend_dir)
+from metrics import MetricsRegistry, Counter, Gauge, Histogram
+
+# create a test class that inherits from unittest.TestCase
+class TestMetrics(unittest.TestCase):
+
+    # setup function to print a start message for the test
+    def setUp(self):
+        print("\n---Running metrics tests---")
+        self.registry = MetricsRegistry()
+
+    def test_counter(self):
+        """
+        test case 1: a counter adds up the increments of every label combination and can not go down
+        """
+        counter = self.registry.counter("requests_total", "Requests", ["endpoint", "status"])
+        counter.inc(endpoint="predict_image", status=200)
+        counter.inc(2, endpoint="predict_image", status=200)
+        counter.inc(endpoint="predict_video", status=500)
+
+        self.assertEqual(counter.get(endpoint="predict_image", status=200), 3)
+        self.assertEqual(counter.get(endpoint="predict_video", status=200), 0)
+        self.assertEqual(counter.render().split("\n"), [
+            "# HELP requests_total Requests",
+            "# TYPE requests_total counter",
+            'requests_total{endpoint="predict_image",status="200"} 3',
+            'requests_total{endpoint="predict_video",status="500"} 1',
+        ])
+        with self.assertRaises(ValueError):
+            counter.inc(-1, endpoint="predict_image", status=200)
+
+    def test_labels(self):
+        """
+        test case 2: the labels must match the label names of the metric and their values are escaped
+        """
+        gauge = self.registry.gauge("model_ready", "Ready models", ["model"])
+        with self.assertRaises(ValueError):
+            gauge.set(1)
+        with self.assertRaises(ValueError):
+            gauge.set(1, model="image", extra="x")
+
+        gauge.set(1, model='a "quoted"\\name')
+        self.assertIn('model_ready{model="a \\"quoted\\"\\\\name"} 1', gauge.render())
+
+    def test_gauge_in_progress(self):
+        """
+        test case 3: a gauge goes up and down and counts the code running in a block
+        """
+        gauge = self.registry.gauge("in_flight", "Requests in flight")
+        with gauge.track_inprogress():
+            with gauge.track_inprogress():
+                self.assertEqual(gauge.get(), 2)
+        self.assertEqual(gauge.get(), 0)
+
+        gauge.set(0.25)
+        self.assertIn("in_flight 0.25", gauge.render())
+
+    def test_histogram(self):
+        """
+        test case 4: a histogram writes cumulative buckets, the sum and the count of the observations
+        """
+        histogram = self.registry.histogram("stage_seconds", "Stage latency", ["stage"], buckets=(0.1, 1))
+        for value in (0.05, 0.5, 3):
+            histogram.observe(value, stage="stt")
+
+        self.assertEqual(histogram.count(stage="stt"), 3)
+        self.assertEqual(histogram.count(stage="lip_reading"), 0)
+        self.assertEqual(histogram.samples(), [
+            'stage_seconds_bucket{stage="stt",le="0.1"} 1',
+            'stage_seconds_bucket{stage="stt",le="1"} 2',
+            'stage_seconds_bucket{stage="stt",le="+Inf"} 3',
+            'stage_seconds_sum{stage="stt"} 3.55',
+            'stage_seconds_count{stage="stt"} 3',
+        ])
+
+    def test_histogram_time(self):
+        """
+        test case 5: the time() block is observed also when it raises
+        """
+        histogram = self.registry.histogram("stage_seconds", "Stage latency", ["stage"])
+        with histogram.time(stage="classify_input"):
+            pass
+        with self.assertRaises(RuntimeError):
+            with histogram.time(stage="classify_input"):
+                raise RuntimeError("model crashed")
+
+        self.assertEqual(histogram.count(stage="classify_input"), 2)
+
+    def test_concurrent_updates(self):
+        """
+        test case 6: concurrent updates are not lost
+        """
+        counter = self.registry.counter("events_total", "Events")
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda _: counter.inc(), range(1000)))
+
+        self.assertEqual(counter.get(), 1000)
+
+    def test_counter_set_total(self):
+        """
+        test case 6.1: a counter can copy a total counted elsewhere and is still exported as a counter
+        """
+        hits = self.registry.counter("cache_hits_total", "Cache hits")
+        hits.set_total(7)
+        hits.set_total(9)
+
+        self.assertEqual(hits.get(), 9)
+        self.assertIn("# TYPE cache_hits_total counter\ncache_hits_total 9", hits.render())
+
+    def test_registry(self):
+        """
+        test case 7: the registry runs its collectors and exports every metric, names are unique
+        """
+        entries = self.registry.gauge("cache_entries", "Cache entries")
+        self.registry.counter("requests_total", "Requests")
+        self.registry.add_collector(lambda: entries.set(42))
+        with self.assertRaises(ValueError):
+            self.registry.register(Counter("requests_total", "Requests"))
+
+        text = self.registry.render()
+        self.assertTrue(text.endswith("\n"))
+        self.assertIn("# TYPE cache_entries gauge\ncache_entries 42", text)
+        self.assertIn("# TYPE requests_total counter", text)
+        self.assertIsInstance(self.registry.metrics["cache_entries"], Gauge)
+        self.assertNotIsInstance(self.registry.metrics["cache_entries"], Histogram)
+
+
+if __name__ == "__main__":
+    unittest.main()
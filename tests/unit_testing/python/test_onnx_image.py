@@ -0,0 +1,105 @@
+# import the required libraries for unit testing
+import unittest
+from unittest.mock import patch, MagicMock
+import sys, os
+import tempfile
+import numpy as np
+# add the path of the backend folder
+backend_dir = os.path.abspath(os.getcwd()+"/backend")
+sys.path.append(backend_dir)
+from onnx_image import OnnxImageClassifier, load_onnx_detector
+
+# create a test class that inherits from unittest.TestCase
+class TestOnnxImage(unittest.TestCase):
+
+    # setup function to print a start message for the test
+    def setUp(self):
+        print("\n---Running onnx_image tests---")
+        # onnxruntime is an optional dependency, the session is mocked
+        self.onnxruntime = MagicMock()
+        self.session = self.onnxruntime.InferenceSession.return_value
+        self.image_processor = MagicMock(side_effect=lambda images, return_tensors: {
+            "pixel_values": np.zeros((len(images), 3, 224, 224))})
+
+    def test_classifier_output(self):
+        """
+        test case 1: the classifier returns the labels sorted by softmax score, like the pipeline
+        :param session: mocked ONNX Runtime session returning fixed logits
+        """
+        self.session.run.side_effect = [
+            [np.array([[2.0, 0.0], [0.0, 1.0]], dtype=np.float32)],
+            [np.array([[0.0, 0.0]], dtype=np.float32)],
+        ]
+        with patch.dict(sys.modules, {"onnxruntime": self.onnxruntime}):
+            classifier = OnnxImageClassifier("model.onnx", self.image_processor, {0: "Fake", 1: "Real"})
+
+        results = classifier(["a", "b", "c"], batch_size=2)
+
+        # two batches for three images
+        self.assertEqual(self.session.run.call_count, 2)
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0][0]["label"], "Fake")
+        self.assertAlmostEqual(results[0][0]["score"], np.exp(2) / (np.exp(2) + 1), places=5)
+        self.assertEqual(results[1][0]["label"], "Real")
+        self.assertAlmostEqual(results[2][0]["score"], 0.5, places=5)
+
+    def test_single_image(self):
+        """
+        test case 2: one image returns one list of labels and scores
+        """
+        self.session.run.return_value = [np.array([[0.0, 3.0]], dtype=np.float32)]
+        with patch.dict(sys.modules, {"onnxruntime": self.onnxruntime}):
+            classifier = OnnxImageClassifier("model.onnx", self.image_processor, {0: "Fake", 1: "Real"})
+
+        result = classifier("image")
+        self.assertEqual([r["label"] for r in result], ["Real", "Fake"])
+
+    @patch("onnx_image.quantize_onnx_model")
+    @patch("onnx_image.export_onnx_model")
+    def test_load_onnx_detector(self, mock_export, mock_quantize):
+        """
+        test case 3: without an exported file the pipeline is built, exported and the int8 copy is loaded
+        :param mock_export: mock of the ONNX export
+        :param mock_quantize: mock of the int8 quantization
+        """
+        mock_export.return_value = "models/onnx/image_model.onnx"
+        mock_quantize.return_value = "models/onnx/image_model.int8.onnx"
+        transformers = MagicMock()
+        pipe = transformers.pipeline.return_value
+        pipe.model.config.id2label = {0: "Fake", 1: "Real"}
+
+        with tempfile.TemporaryDirectory() as model_dir:
+            with patch.dict(sys.modules, {"onnxruntime": self.onnxruntime, "transformers": transformers}):
+                load_onnx_detector("image-model", model_dir, quantize=True)
+
+            transformers.pipeline.assert_called_once_with("image-classification", model="image-model")
+            mock_export.assert_called_once_with(pipe.model, pipe.image_processor,
+                                                os.path.join(model_dir, "image_model.onnx"))
+            mock_quantize.assert_called_once_with("models/onnx/image_model.onnx",
+                                                  os.path.join(model_dir, "image_model.int8.onnx"))
+        self.assertEqual(self.onnxruntime.InferenceSession.call_args[0][0], "models/onnx/image_model.int8.onnx")
+
+    @patch("onnx_image.export_onnx_model")
+    def test_load_exported_model(self, mock_export):
+        """
+        test case 4: with an exported file only the image processor and the labels are loaded, not the PyTorch model
+        :param mock_export: mock of the ONNX export
+        """
+        transformers = MagicMock()
+        transformers.AutoConfig.from_pretrained.return_value.id2label = {0: "Fake", 1: "Real"}
+
+        with tempfile.TemporaryDirectory() as model_dir:
+            onnx_path = os.path.join(model_dir, "image_model.onnx")
+            open(onnx_path, "wb").close()
+            with patch.dict(sys.modules, {"onnxruntime": self.onnxruntime, "transformers": transformers}):
+                classifier = load_onnx_detector("image-model", model_dir)
+
+        transformers.pipeline.assert_not_called()
+        mock_export.assert_not_called()
+        transformers.AutoImageProcessor.from_pretrained.assert_called_once_with("image-model")
+        self.assertEqual(self.onnxruntime.InferenceSession.call_args[0][0], onnx_path)
+        self.assertEqual(classifier.id2label, {0: "Fake", 1: "Real"})
+        self.assertIs(classifier.image_processor, transformers.AutoImageProcessor.from_pretrained.return_value)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,13 @@
 import unittest
 from unittest.mock import patch, MagicMock
+from concurrent.futures import Future
 import numpy as np
 import sys, os
 # add the path of the backend folder
 backend_dir = os.path.abspath(os.getcwd()+"/backend")
 sys.path.append(backend_dir)
-from preprocessing import detect_landmark, preprocess_video
+from preprocessing import detect_landmark, preprocess_video, FaceLandmarkTracker, ParallelLandmarkExtractor
+from preprocessing import detect_faces, MouthRoiCropper
 
 # target for mocking cv2.cvtColor
 CVTCOLOR = 'preprocessing.cv2.cvtColor'
@@ -209,9 +211,133 @@ class TestPreprocessing(unittest.TestCase):
         self.mock_predictor.assert_called_once()
 
 
+    @patch("preprocessing.dlib.rectangle")
+    def test_detect_faces_downscaled(self, mock_rectangle):
+        """
+        test case: test that detect_faces() runs the detector on a downscaled frame
+        and maps the rectangles back to full resolution
+
+        Docstring for test_detect_faces_downscaled
+
+        :param self: instance of the class
+        :param mock_rectangle: mock object of dlib.rectangle
+        """
+        # a 1920x1080 frame detected at 480 pixels wide (scale 1/4)
+        gray = np.zeros((1080, 1920), dtype=np.uint8)
+        small_rect = MagicMock()
+        small_rect.left.return_value, small_rect.top.return_value = 100, 50
+        small_rect.right.return_value, small_rect.bottom.return_value = 150, 100
+        self.mock_detector.return_value = [small_rect]
+        mock_rectangle.side_effect = lambda left, top, right, bottom: (left, top, right, bottom)
+
+        rects = detect_faces(gray, self.mock_detector, max_detect_width=480, upsample=0)
+
+        # the detector sees the small frame with the requested upsampling
+        small_gray, upsample = self.mock_detector.call_args[0]
+        self.assertEqual(small_gray.shape, (270, 480))
+        self.assertEqual(upsample, 0)
+        # the rectangle is back in full resolution coordinates
+        self.assertEqual(rects, [(400, 200, 600, 400)])
+
+
+    def test_detect_faces_small_frame_not_scaled(self):
+        """
+        test case: test that detect_faces() keeps frames narrower than max_detect_width as they are
+
+        Docstring for test_detect_faces_small_frame_not_scaled
+
+        :param self: instance of the class
+        """
+        self.mock_detector.return_value = ['mock_rect']
+
+        rects = detect_faces(self.mock_gray_image, self.mock_detector, max_detect_width=640)
+
+        self.mock_detector.assert_called_once_with(self.mock_gray_image, 1)
+        self.assertEqual(rects, ['mock_rect'])
+
+
+    @patch("preprocessing.dlib.rectangle")
+    @patch("preprocessing.dlib.correlation_tracker")
+    @patch(CVTCOLOR)
+    def test_tracker_detects_every_n_frames(self, mock_cvtColor, mock_correlation_tracker, mock_rectangle):
+        """
+        test case: test that FaceLandmarkTracker runs the detector every N frames
+        and only the predictor on the tracked frames
+
+        Docstring for test_tracker_detects_every_n_frames
+
+        :param self: instance of the class
+        :param mock_cvtColor: mock object of cv2.cvtColor
+        :param mock_correlation_tracker: mock object of dlib.correlation_tracker
+        :param mock_rectangle: mock object of dlib.rectangle
+        """
+        mock_cvtColor.return_value = self.mock_gray_image
+        self.mock_detector.return_value = ['mock_rect']
+        # the tracker is always confident
+        mock_correlation_tracker.return_value.update.return_value = 20.0
+        mock_rectangle.return_value = 'tracked_rect'
+
+        tracker = FaceLandmarkTracker(self.mock_detector, self.mock_predictor, detect_every=3)
+        results = [tracker(self.test_image) for _ in range(5)]
+
+        # the detector runs on frames 0 and 3 only
+        self.assertEqual(self.mock_detector.call_count, 2)
+        # the predictor runs on every frame
+        self.assertEqual(self.mock_predictor.call_count, 5)
+        self.mock_predictor.assert_any_call(self.mock_gray_image, 'tracked_rect')
+        for result in results:
+            self.assertTrue(np.array_equal(result, self.expected_coords))
+
+
+    @patch("preprocessing.dlib.rectangle")
+    @patch("preprocessing.dlib.correlation_tracker")
+    @patch(CVTCOLOR)
+    def test_tracker_redetects_on_low_confidence(self, mock_cvtColor, mock_correlation_tracker, mock_rectangle):
+        """
+        test case: test that FaceLandmarkTracker runs the detector again when tracking confidence drops
+
+        Docstring for test_tracker_redetects_on_low_confidence
+
+        :param self: instance of the class
+        :param mock_cvtColor: mock object of cv2.cvtColor
+        :param mock_correlation_tracker: mock object of dlib.correlation_tracker
+        :param mock_rectangle: mock object of dlib.rectangle
+        """
+        mock_cvtColor.return_value = self.mock_gray_image
+        self.mock_detector.return_value = ['mock_rect']
+        # the tracker loses the face
+        mock_correlation_tracker.return_value.update.return_value = 2.0
+
+        tracker = FaceLandmarkTracker(self.mock_detector, self.mock_predictor, detect_every=10)
+        for _ in range(3):
+            tracker(self.test_image)
+
+        # low confidence means the detector runs on every frame
+        self.assertEqual(self.mock_detector.call_count, 3)
+        mock_rectangle.assert_not_called()
+
+
+    @patch(CVTCOLOR)
+    def test_tracker_no_face_detected(self, mock_cvtColor):
+        """
+        test case: test that FaceLandmarkTracker returns None when no face is detected
+
+        Docstring for test_tracker_no_face_detected
+
+        :param self: instance of the class
+        :param mock_cvtColor: mock object of cv2.cvtColor
+        """
+        mock_cvtColor.return_value = self.mock_gray_image
+        self.mock_detector.return_value = []
+
+        tracker = FaceLandmarkTracker(self.mock_detector, self.mock_predictor, detect_every=5)
+
+        self.assertIsNone(tracker(self.test_image))
+        self.mock_predictor.assert_not_called()
+
+
     @patch("preprocessing.write_video_ffmpeg")
-    @patch("preprocessing.crop_patch")
-    @patch("preprocessing.landmarks_interpolate")
+    @patch("preprocessing.MouthRoiCropper")
     @patch("preprocessing.detect_landmark")
     @patch("preprocessing.skvideo.io.vread")
     @patch("preprocessing.dlib.shape_predictor")
@@ -219,8 +345,7 @@ class TestPreprocessing(unittest.TestCase):
     @patch("preprocessing.np.load")
     def test_preprocess_video_success(
         self, mock_npload, mock_detector, mock_predictor,
-        mock_vread, mock_detect, mock_interpolate,
-        mock_crop, mock_write
+        mock_vread, mock_detect, mock_cropper, mock_write
     ):
         """
         test case: test that preprocess_video() runs seuccessfully
@@ -233,8 +358,7 @@ class TestPreprocessing(unittest.TestCase):
         :param mock_predictor: mock object of dlib predictor
         :param mock_vread: mock object of skvideo.io.vread
         :param mock_detect: mock object of detect_landmark()
-        :param mock_interpolate: mock object of landmarks_interpolate()
-        :param mock_crop: mock object of crop_patch
+        :param mock_cropper: mock object of MouthRoiCropper
         :param mock_write: mock object of write_video_ffmpeg
         """
         # return the mean_face_landmarks model
@@ -253,13 +377,10 @@ class TestPreprocessing(unittest.TestCase):
         # return a mock array of landmarks
         mock_detect.return_value = np.zeros((68, 2), dtype=np.int32)
 
-        # mock the behavior of landmarks_interpolate()
-        mock_interpolate.return_value = "smooth_landmarks"
-
-        # mock the path to the cropped video
-        mock_crop.return_value = "cropped_roi"
+        # mock the cropped grayscale roi frames
+        mock_cropper.return_value.finish.return_value = np.zeros((2, 96, 96), dtype=np.uint8)
 
-        preprocess_video(
+        rois = preprocess_video(
             "input.mp4",
             "output.mp4",
             "shape_predictor.dat",
@@ -269,9 +390,297 @@ class TestPreprocessing(unittest.TestCase):
         # assert
         # check that the detector is called once per frame
         self.assertEqual(mock_detect.call_count, 2)  
-        mock_interpolate.assert_called_once()
-        mock_crop.assert_called_once()
+        # check that the decoded frames are cropped (grayscale) without decoding the video again
+        self.assertEqual(mock_cropper.return_value.push.call_count, 2)
+        frame, landmark = mock_cropper.return_value.push.call_args[0]
+        self.assertEqual(frame.shape, (100, 100))
         mock_write.assert_called_once()
+        # check the grayscale roi is returned
+        self.assertEqual(rois.shape, (2, 96, 96))
+
+
+    @patch("preprocessing.write_video_ffmpeg")
+    @patch("preprocessing.MouthRoiCropper")
+    @patch("preprocessing.detect_landmark")
+    @patch("preprocessing.skvideo.io.vread")
+    @patch("preprocessing.dlib.shape_predictor")
+    @patch("preprocessing.dlib.get_frontal_face_detector")
+    @patch("preprocessing.np.load")
+    def test_preprocess_video_in_memory_roi(
+        self, mock_npload, mock_detector, mock_predictor,
+        mock_vread, mock_detect, mock_cropper, mock_write
+    ):
+        """
+        test case: test that preprocess_video() returns the roi without writing a video file
+
+        Docstring for test_preprocess_video_in_memory_roi
+
+        :param self: instance of the class
+        :param mock_npload: mock object of np.load
+        :param mock_detector: mock object of dlib detector
+        :param mock_predictor: mock object of dlib predictor
+        :param mock_vread: mock object of skvideo.io.vread
+        :param mock_detect: mock object of detect_landmark()
+        :param mock_cropper: mock object of MouthRoiCropper
+        :param mock_write: mock object of write_video_ffmpeg
+        """
+        mock_vread.return_value = np.zeros((3, 100, 100, 3), dtype=np.uint8)
+        mock_detect.return_value = np.zeros((68, 2), dtype=np.int32)
+        mock_cropper.return_value.finish.return_value = np.full((3, 96, 96), 255, dtype=np.uint8)
+
+        rois = preprocess_video("input.mp4", None, "shape_predictor.dat", "mean_face_landmarks.npy")
+
+        # nothing is written to disk
+        mock_write.assert_not_called()
+        # the roi frames are returned
+        self.assertEqual(rois.shape, (3, 96, 96))
+        # the whole clip is in memory, so the gaps are interpolated without a bound
+        self.assertIsNone(mock_cropper.call_args[1]["max_gap"])
+
+
+    @patch("preprocessing.write_video_ffmpeg")
+    @patch("preprocessing.MouthRoiCropper")
+    @patch("preprocessing.detect_landmark")
+    @patch("preprocessing.skvideo.io.vread")
+    @patch("preprocessing.skvideo.io.vreader")
+    @patch("preprocessing.dlib.shape_predictor")
+    @patch("preprocessing.dlib.get_frontal_face_detector")
+    @patch("preprocessing.np.load")
+    def test_preprocess_video_streaming(
+        self, mock_npload, mock_detector, mock_predictor,
+        mock_vreader, mock_vread, mock_detect, mock_cropper, mock_write
+    ):
+        """
+        test case: test that preprocess_video() decodes frame by frame in streaming mode
+
+        Docstring for test_preprocess_video_streaming
+
+        :param self: instance of the class
+        :param mock_npload: mock object of np.load
+        :param mock_detector: mock object of dlib detector
+        :param mock_predictor: mock object of dlib predictor
+        :param mock_vreader: mock object of skvideo.io.vreader
+        :param mock_vread: mock object of skvideo.io.vread
+        :param mock_detect: mock object of detect_landmark()
+        :param mock_cropper: mock object of MouthRoiCropper
+        :param mock_write: mock object of write_video_ffmpeg
+        """
+        # use a generator of three frames
+        mock_vreader.return_value = (np.zeros((100, 100, 3), dtype=np.uint8) for _ in range(3))
+        mock_detect.return_value = np.zeros((68, 2), dtype=np.int32)
+
+        preprocess_video(
+            "input.mp4",
+            "output.mp4",
+            "shape_predictor.dat",
+            "mean_face_landmarks.npy",
+            streaming=True,
+            max_gap=50
+        )
+
+        # the whole clip is never decoded at once
+        mock_vread.assert_not_called()
+        mock_vreader.assert_called_once_with("input.mp4")
+        # the landmarks are detected and the mouth is cropped once per streamed frame
+        self.assertEqual(mock_detect.call_count, 3)
+        self.assertEqual(mock_cropper.return_value.push.call_count, 3)
+        mock_cropper.return_value.finish.assert_called_once()
+        # the frames waiting for a detection are bounded
+        self.assertEqual(mock_cropper.call_args[1]["max_gap"], 50)
+
+
+    @patch("preprocessing._detect_landmark_chunk")
+    @patch("preprocessing.ProcessPoolExecutor")
+    def test_parallel_extractor_keeps_frame_order(self, mock_pool, mock_chunk):
+        """
+        test case: test that ParallelLandmarkExtractor splits the frames into chunks
+        and returns the landmarks in frame order
+
+        Docstring for test_parallel_extractor_keeps_frame_order
+
+        :param self: instance of the class
+        :param mock_pool: mock object of ProcessPoolExecutor
+        :param mock_chunk: mock object of _detect_landmark_chunk()
+        """
+        # run every submitted chunk right away
+        def submit(function, chunk):
+            future = Future()
+            future.set_result(function(chunk))
+            return future
+        mock_pool.return_value.submit.side_effect = submit
+        # each "landmark" is the index of its frame
+        mock_chunk.side_effect = lambda chunk: list(chunk)
+
+        extractor = ParallelLandmarkExtractor("shape_predictor.dat", workers=2, chunk_size=3)
+        result = extractor.extract(iter(range(10)))
+
+        # 10 frames in chunks of 3 give 4 chunks, returned in order
+        self.assertEqual(result, list(range(10)))
+        self.assertEqual(mock_chunk.call_count, 4)
+
+
+    @patch("preprocessing.write_video_ffmpeg")
+    @patch("preprocessing.MouthRoiCropper")
+    @patch("preprocessing.get_landmark_extractor")
+    @patch("preprocessing.detect_landmark")
+    @patch("preprocessing.skvideo.io.vread")
+    @patch("preprocessing.np.load")
+    def test_preprocess_video_parallel(
+        self, mock_npload, mock_vread, mock_detect, mock_get_extractor,
+        mock_cropper, mock_write
+    ):
+        """
+        test case: test that preprocess_video() uses the worker pool when workers > 1
+
+        Docstring for test_preprocess_video_parallel
+
+        :param self: instance of the class
+        :param mock_npload: mock object of np.load
+        :param mock_vread: mock object of skvideo.io.vread
+        :param mock_detect: mock object of detect_landmark()
+        :param mock_get_extractor: mock object of get_landmark_extractor()
+        :param mock_cropper: mock object of MouthRoiCropper
+        :param mock_write: mock object of write_video_ffmpeg
+        """
+        frames = np.zeros((2, 100, 100, 3), dtype=np.uint8)
+        mock_vread.return_value = frames
+        mock_get_extractor.return_value.iter_chunks.return_value = [(list(frames), ["landmark_1", "landmark_2"])]
+
+        preprocess_video(
+            "input.mp4",
+            "output.mp4",
+            "shape_predictor.dat",
+            "mean_face_landmarks.npy",
+            workers=4
+        )
+
+        # the landmarks come from the worker pool, not from the request thread
+        mock_get_extractor.assert_called_once_with("shape_predictor.dat", 4, 32, detect_every=1,
+                                                   track_min_confidence=7.0, max_detect_width=None, upsample=1)
+        mock_detect.assert_not_called()
+        # every frame is cropped with its landmarks, in order
+        pushed = [call[0][1] for call in mock_cropper.return_value.push.call_args_list]
+        self.assertEqual(pushed, ["landmark_1", "landmark_2"])
+        # only grayscale frames are sent to the workers
+        sent = list(mock_get_extractor.return_value.iter_chunks.call_args[0][0])
+        self.assertEqual([frame.shape for frame in sent], [(100, 100), (100, 100)])
+        # and the cropper gets grayscale frames
+        self.assertTrue(all(call[0][0].ndim == 2 for call in mock_cropper.return_value.push.call_args_list))
+
+
+    def test_detect_landmark_grayscale(self):
+        """
+        test case: test detect_landmark() accepts a grayscale frame as it is
+
+        :param self: instance of the class
+        """
+        gray = np.ascontiguousarray(self.test_image[:, :, 0])
+        self.mock_detector.return_value = ["face"]
+
+        result = detect_landmark(gray, self.mock_detector, self.mock_predictor)
+
+        self.assertIs(self.mock_detector.call_args[0][0], gray)
+        self.assertIs(self.mock_predictor.call_args[0][0], gray)
+        self.assertEqual(result.shape, (68, 2))
+
+
+class TestMouthRoiCropper(unittest.TestCase):
+    # initial setup
+    def setUp(self):
+        print("\n---Running mouth roi cropper tests---")
+        # a mean face with the mouth (points 48-67) around (128, 170)
+        rng = np.random.default_rng(0)
+        self.mean_face = rng.uniform(60, 200, (68, 2))
+        self.mean_face[48:68] = rng.uniform(160, 180, (20, 2)) - [40, 0]
+        # a frame with a horizontal gradient so every column has a different value
+        self.frame = np.tile(np.arange(256, dtype=np.uint8), (256, 1))
+
+
+    def test_crop_aligned_face(self):
+        """
+        test case: test that a face already aligned to the mean face is cropped around the mouth
+
+        Docstring for test_crop_aligned_face
+
+        :param self: instance of the class
+        """
+        cropper = MouthRoiCropper(self.mean_face)
+        for _ in range(15):
+            cropper.push(self.frame, self.mean_face)
+        rois = cropper.finish()
+
+        # one 96x96 patch per frame
+        self.assertEqual(rois.shape, (15, 96, 96))
+        # the patch is centered on the mouth of the (identity) aligned frame
+        center_x, center_y = np.round(np.mean(self.mean_face[48:68], axis=0)).astype(int)
+        expected = self.frame[center_y - 48:center_y + 48, center_x - 48:center_x + 48]
+        self.assertTrue(np.array_equal(rois[0], expected))
+        self.assertTrue(np.array_equal(rois[-1], expected))
+
+
+    def test_interpolate_missing_landmarks(self):
+        """
+        test case: test that frames without a detected face are interpolated and still cropped
+
+        Docstring for test_interpolate_missing_landmarks
+
+        :param self: instance of the class
+        """
+        # record the landmarks used for every frame
+        cropper = MouthRoiCropper(self.mean_face)
+        resolved = []
+        cropper._crop = lambda frame, landmarks: resolved.append(landmarks)
+
+        # no face on frame 0, frames 2-3 and frame 5, the face moves 3 pixels per frame in between
+        shift = np.array([3.0, 0.0])
+        cropper.push(self.frame, None)
+        cropper.push(self.frame, self.mean_face)
+        cropper.push(self.frame, None)
+        cropper.push(self.frame, None)
+        cropper.push(self.frame, self.mean_face + 3 * shift)
+        cropper.push(self.frame, None)
+        cropper.finish()
+
+        self.assertEqual(len(resolved), 6)
+        # leading frame keeps the first detection, trailing frame keeps the last one
+        self.assertTrue(np.allclose(resolved[0], self.mean_face))
+        self.assertTrue(np.allclose(resolved[5], self.mean_face + 3 * shift))
+        # frames in the gap are interpolated linearly
+        self.assertTrue(np.allclose(resolved[2], self.mean_face + shift))
+        self.assertTrue(np.allclose(resolved[3], self.mean_face + 2 * shift))
+
+
+    def test_bounded_gap(self):
+        """
+        test case: test that at most max_gap frames wait for the next detected face
+
+        Docstring for test_bounded_gap
+
+        :param self: instance of the class
+        """
+        cropper = MouthRoiCropper(self.mean_face, max_gap=5)
+        cropper.push(self.frame, self.mean_face)
+        for _ in range(50):
+            cropper.push(self.frame, None)
+            self.assertLessEqual(len(cropper.pending), 5)
+        rois = cropper.finish()
+        # no frame is lost once a face was detected
+        self.assertEqual(len(rois), 51)
+
+
+    def test_no_face_detected(self):
+        """
+        test case: test that the cropper raises an error when no face is detected in the video
+
+        Docstring for test_no_face_detected
+
+        :param self: instance of the class
+        """
+        cropper = MouthRoiCropper(self.mean_face)
+        for _ in range(5):
+            cropper.push(self.frame, None)
+        with self.assertRaises(ValueError):
+            cropper.finish()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,83 @@
+# import the required libraries for unit testing
+import unittest
+import sys, os
+import hashlib
+import tempfile
+# add the path of the backend folder
+backend_dir = os.path.abspath(os.getcwd()+"/backend")
+sys.path.append(backend_dir)
+from result_cache import ResultCache, hash_file, cache_key
+
+# create a test class that inherits from unittest.TestCase
+class TestResultCache(unittest.TestCase):
+
+    # setup function to print a start message for the test
+    def setUp(self):
+        print("\n---Running result_cache tests---")
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_hits_and_misses(self):
+        """
+        test case 1: stored results are returned and the lookups are counted
+        """
+        cache = ResultCache(max_entries=4)
+        self.assertIsNone(cache.get("a"))
+        cache.put("a", {"label": "Real"})
+        self.assertEqual(cache.get("a"), {"label": "Real"})
+
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hit_rate"], 0.5)
+        self.assertEqual(stats["entries"], 1)
+
+    def test_lru_eviction(self):
+        """
+        test case 2: the least recently used result is evicted when the cache is full
+        """
+        cache = ResultCache(max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        # using "a" makes "b" the least recently used entry
+        cache.get("a")
+        cache.put("c", 3)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_sqlite_store(self):
+        """
+        test case 3: results stored in the database are found by a new cache (e.g. after a restart)
+        :param db_path: path to the temporary database
+        """
+        db_path = os.path.join(self.tmp_dir.name, "results.sqlite")
+        cache = ResultCache(max_entries=1, db_path=db_path)
+        cache.put("a", {"label": "Fake", "score": "90.00"})
+        cache.put("b", {"label": "Real", "score": "80.00"})
+        # "a" was evicted from memory but is still in the database
+        self.assertEqual(cache.get("a"), {"label": "Fake", "score": "90.00"})
+
+        restarted = ResultCache(max_entries=1, db_path=db_path)
+        self.assertEqual(restarted.get("b"), {"label": "Real", "score": "80.00"})
+
+        restarted.clear()
+        self.assertIsNone(ResultCache(db_path=db_path).get("b"))
+
+    def test_hash_and_key(self):
+        """
+        test case 4: the key depends on the content hash and on the model version
+        """
+        path = os.path.join(self.tmp_dir.name, "video.mp4")
+        with open(path, "wb") as f:
+            f.write(b"Dummy video content")
+
+        content_hash = hash_file(path, block_size=4)
+        self.assertEqual(content_hash, hashlib.sha256(b"Dummy video content").hexdigest())
+        self.assertNotEqual(cache_key("video", "1", content_hash), cache_key("video", "2", content_hash))
+
+if __name__ == "__main__":
+    unittest.main()
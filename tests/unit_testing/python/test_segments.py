@@ -0,0 +1,141 @@
+# import the required libraries for unit testing
+import unittest
+from unittest.mock import patch, MagicMock
+import sys, os
+import subprocess
+# add the path of the backend folder
+backend_dir = os.path.abspath(os.getcwd()+"/backend")
+sys.path.append(backend_dir)
+from segments import video_duration, plan_windows, cut_segment, aggregate_segments
+from inference import classify_input
+
+# create a test class that inherits from unittest.TestCase
+class TestSegments(unittest.TestCase):
+
+    # setup function to print a start message for the test
+    def setUp(self):
+        print("\n---Running segments tests---")
+
+    def test_plan_windows(self):
+        """
+        test case 1: the windows overlap, cover the whole video and the last one ends with the video
+        """
+        self.assertEqual(plan_windows(25, window=10, overlap=2), [(0.0, 10.0), (8.0, 18.0), (15.0, 25)])
+        # a short video is a single window
+        self.assertEqual(plan_windows(6, window=10, overlap=2), [(0.0, 6)])
+        with self.assertRaises(ValueError):
+            plan_windows(25, window=2, overlap=2)
+
+    def test_aggregate_segments(self):
+        """
+        test case 2: consecutive Fake windows make the video Fake, the failed windows are skipped,
+        the Fake windows are scored like classify_input does (100 - similarity)
+        """
+        segments = [
+            {"start": 15, "end": 25, "label": "Fake", "score": "70.00"},
+            {"start": 0, "end": 10, "label": "Real", "score": "90.00"},
+            {"start": 8, "end": 18, "label": "Fake", "score": "80.00"},
+            {"start": 22, "end": 30, "error": "No face detected"},
+        ]
+        verdict = aggregate_segments(segments)
+        self.assertEqual(verdict["label"], "Fake")
+        # 100 - the mean similarity (30 and 20) of the Fake votes
+        self.assertEqual(verdict["score"], "75.00")
+        self.assertEqual((verdict["fake_segments"], verdict["fake_votes"], verdict["longest_fake_run"]), (2, 2, 2))
+        self.assertEqual((verdict["analysed_segments"], verdict["total_segments"]), (3, 4))
+
+        # all windows Real: the mean similarity is reported
+        verdict = aggregate_segments([{"label": "Real", "score": "90.00"}, {"label": "Real", "score": "60.00"}])
+        self.assertEqual((verdict["label"], verdict["score"]), ("Real", "75.00"))
+
+        with self.assertRaises(ValueError):
+            aggregate_segments([{"error": "No face detected"}])
+
+    def test_aggregate_segments_classify_input(self):
+        """
+        test case 2.1: windows scored by classify_input with mismatching texts make the video Fake
+        """
+        segments = []
+        for i in range(4):
+            score, label = classify_input("I LOVE", "THE DOG")
+            segments.append({"start": 8 * i, "end": 8 * i + 10, "label": label, "score": f"{score:.2f}"})
+        verdict = aggregate_segments(segments)
+        self.assertEqual((verdict["label"], verdict["fake_votes"], verdict["fake_segments"]), ("Fake", 4, 4))
+        self.assertEqual(verdict["score"], segments[0]["score"])
+
+        # a Real window and a Fake window are averaged on the same similarity scale
+        verdict = aggregate_segments([{"label": "Real", "score": "90.00"}, {"label": "Fake", "score": "52.00"}])
+        self.assertEqual((verdict["label"], verdict["score"]), ("Real", "69.00"))
+
+    def test_aggregate_segments_silent(self):
+        """
+        test case 2.2: the windows where the speaker pauses (an empty text) are not analysed and break the runs
+        """
+        timeline = [{"start": 8 * i, "end": 8 * i + 10, "label": "Real", "score": "90.00",
+                     "lip_reading_text": "THE CAT", "speech_text": "THE CAT"} for i in range(6)]
+        timeline[2] = dict(timeline[2], label="Fake", score="100.00", speech_text="")
+        timeline[3] = dict(timeline[3], label="Fake", score="100.00", lip_reading_text=" ")
+        verdict = aggregate_segments(timeline)
+        self.assertEqual((verdict["label"], verdict["fake_votes"], verdict["analysed_segments"]), ("Real", 0, 4))
+        self.assertEqual(verdict["score"], "90.00")
+
+        with self.assertRaises(ValueError):
+            aggregate_segments(timeline[2:4])
+
+    def test_aggregate_segments_borderline(self):
+        """
+        test case 2.3: one borderline Fake window in a mostly Real timeline keeps the video Real,
+        while a clear Fake window needs a neighbour (or a large share of Fake windows) to make the video Fake
+        """
+        timeline = [{"start": 8 * i, "end": 8 * i + 10, "label": "Real", "score": "88.00"} for i in range(8)]
+        # similarity 48: under the threshold but within the margin
+        timeline[3] = dict(timeline[3], label="Fake", score="52.00")
+        verdict = aggregate_segments(timeline)
+        self.assertEqual((verdict["label"], verdict["fake_segments"], verdict["fake_votes"]), ("Real", 1, 0))
+
+        # one clear Fake window alone is still not enough in a long video
+        timeline[3] = dict(timeline[3], score="90.00")
+        self.assertEqual(aggregate_segments(timeline)["label"], "Real")
+        # two consecutive ones are
+        timeline[4] = dict(timeline[4], label="Fake", score="85.00")
+        self.assertEqual(aggregate_segments(timeline)["label"], "Fake")
+        # a failed window between them breaks the run
+        timeline[4] = {"start": 32, "end": 42, "error": "No face detected"}
+        timeline[6] = dict(timeline[6], label="Fake", score="85.00")
+        self.assertEqual(aggregate_segments(timeline)["longest_fake_run"], 1)
+        self.assertEqual(aggregate_segments(timeline)["label"], "Real")
+        # a short video with a single clear Fake window is Fake (the share rule)
+        self.assertEqual(aggregate_segments([{"label": "Fake", "score": "90.00"}])["label"], "Fake")
+        self.assertEqual(aggregate_segments(timeline, min_share=0.25)["label"], "Fake")
+
+    @patch("segments.subprocess.run")
+    def test_cut_segment(self, mock_run):
+        """
+        test case 3: the window is cut with ffmpeg and its errors are raised as RuntimeError
+        :param mock_run: mock object of the ffmpeg call
+        """
+        self.assertEqual(cut_segment("video.mp4", 8, 18, "segment.mp4"), "segment.mp4")
+        cmd = mock_run.call_args[0][0]
+        self.assertEqual(cmd[cmd.index("-ss") + 1], "8.000")
+        self.assertEqual(cmd[cmd.index("-t") + 1], "10.000")
+
+        mock_run.side_effect = subprocess.CalledProcessError(1, "ffmpeg", stderr=b"invalid data")
+        with self.assertRaises(RuntimeError):
+            cut_segment("video.mp4", 8, 18, "segment.mp4")
+
+    @patch("segments.cv2.VideoCapture")
+    def test_video_duration(self, mock_videocap):
+        """
+        test case 4: the duration is the number of frames over the frame rate
+        :param mock_videocap: mock object of cv2.VideoCapture
+        """
+        properties = {7: 750, 5: 25}  # CAP_PROP_FRAME_COUNT, CAP_PROP_FPS
+        mock_videocap.return_value.get.side_effect = lambda prop: properties[prop]
+        self.assertEqual(video_duration("video.mp4"), 30)
+
+        properties[5] = 0
+        with self.assertRaises(ValueError):
+            video_duration("video.mp4")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+# import the required libraries for unit testing
+import unittest
+from unittest.mock import patch, MagicMock
+import sys, os
+import tempfile
+import numpy as np
+import cv2
+# add the path of the backend folder
+backend_dir = os.path.abspath(os.getcwd()+"/backend")
+sys.path.append(backend_dir)
+import triage
+from triage import run_triage, TriageError
+
+# function to write a test video of the given duration and size
+def write_video(path, seconds, width, height, fps=25):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    for _ in range(int(seconds * fps)):
+        writer.write(np.full((height, width, 3), 128, dtype=np.uint8))
+    writer.release()
+
+# create a test class that inherits from unittest.TestCase
+class TestTriage(unittest.TestCase):
+
+    # setup function to create the test videos
+    def setUp(self):
+        print("\n---Running triage tests---")
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.video_path = os.path.join(self.tmp_dir.name, "video.mp4")
+        write_video(self.video_path, 2, 320, 240)
+        # the face detector and the audio are mocked
+        patcher = patch("triage.get_face_detector", return_value=MagicMock())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    @patch("triage.load_audio")
+    @patch("triage.detect_faces")
+    def test_valid_video(self, mock_detect_faces, mock_load_audio):
+        """
+        test case 1: a video with a face and speech passes the triage
+        :param mock_detect_faces: mock object of the face detection
+        :param mock_load_audio: mock object of the audio decoding
+        """
+        mock_detect_faces.return_value = [MagicMock()]
+        mock_load_audio.return_value = 0.3 * np.sin(np.arange(32000) / 5).astype(np.float32)
+
+        result = run_triage(self.video_path, face_samples=3)
+
+        self.assertAlmostEqual(result["duration"], 2.0, places=1)
+        self.assertEqual((result["width"], result["height"]), (320, 240))
+        self.assertEqual(result["face_ratio"], 1.0)
+        self.assertGreater(result["speech_seconds"], 1.5)
+        self.assertEqual(mock_detect_faces.call_count, 3)
+
+    def test_duration_and_resolution(self):
+        """
+        test case 2: unreadable, too short, too long and low resolution videos are rejected before the face check
+        """
+        checks = [
+            (os.path.join(self.tmp_dir.name, "missing.mp4"), {}, triage.UNREADABLE_VIDEO),
+            (self.video_path, {"min_duration": 5}, triage.TOO_SHORT),
+            (self.video_path, {"max_duration": 1}, triage.TOO_LONG),
+            (self.video_path, {"min_height": 480}, triage.LOW_RESOLUTION),
+        ]
+        with patch("triage.face_ratio") as mock_face_ratio:
+            for path, options, status in checks:
+                with self.assertRaises(TriageError) as context:
+                    run_triage(path, **options)
+                self.assertEqual(context.exception.status, status)
+            mock_face_ratio.assert_not_called()
+
+    @patch("triage.load_audio")
+    @patch("triage.detect_faces")
+    def test_no_face_and_no_speech(self, mock_detect_faces, mock_load_audio):
+        """
+        test case 3: videos without a face or without speech are rejected
+        :param mock_detect_faces: mock object of the face detection
+        :param mock_load_audio: mock object of the audio decoding
+        """
+        mock_detect_faces.return_value = []
+        with self.assertRaises(TriageError) as context:
+            run_triage(self.video_path)
+        self.assertEqual(context.exception.status, triage.NO_FACE)
+        # the audio is not decoded when there is no face
+        mock_load_audio.assert_not_called()
+
+        mock_detect_faces.return_value = [MagicMock()]
+        mock_load_audio.return_value = np.zeros(32000, dtype=np.float32)
+        with self.assertRaises(TriageError) as context:
+            run_triage(self.video_path)
+        self.assertEqual(context.exception.status, triage.NO_SPEECH)
+
+        # a video without audio track has no speech
+        mock_load_audio.side_effect = RuntimeError("no audio stream")
+        self.assertEqual(triage.speech_seconds(self.video_path), 0.0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+# import the required libraries for unit testing
+import unittest
+from unittest.mock import MagicMock
+import sys, os
+import threading
+# add the path of the backend folder
+backend_dir = os.path.abspath(os.getcwd()+"/backend")
+sys.path.append(backend_dir)
+from warmup import ModelRegistry, NOT_LOADED, PENDING, READY, FAILED
+
+# create a test class that inherits from unittest.TestCase
+class TestModelRegistry(unittest.TestCase):
+
+    # setup function to print a start message for the test
+    def setUp(self):
+        print("\n---Running warmup tests---")
+        self.calls = []
+        self.registry = ModelRegistry({
+            "image": lambda: self.calls.append("image"),
+            "whisper": lambda: self.calls.append("whisper"),
+        })
+
+    def test_warmup_in_order(self):
+        """
+        test case 1: the models are warmed up one after the other and reported ready with their warmup time
+        """
+        self.assertTrue(self.registry.ready())
+        self.assertEqual(self.registry.status()["image"]["state"], NOT_LOADED)
+
+        self.registry.start_warmup(background=False)
+
+        self.assertEqual(self.calls, ["image", "whisper"])
+        status = self.registry.status()
+        self.assertEqual({name: model["state"] for name, model in status.items()}, {"image": READY, "whisper": READY})
+        self.assertIsNotNone(status["image"]["warmup_seconds"])
+        self.assertTrue(self.registry.ready())
+
+    def test_failed_warmup(self):
+        """
+        test case 2: a failing warmup is recorded with its error and the next models still warm up
+        """
+        self.registry.warmups["image"] = MagicMock(side_effect=RuntimeError("checkpoint not found"))
+
+        self.registry.start_warmup(background=False)
+
+        status = self.registry.status()
+        self.assertEqual(status["image"]["state"], FAILED)
+        self.assertEqual(status["image"]["error"], "checkpoint not found")
+        self.assertEqual(status["whisper"]["state"], READY)
+        self.assertFalse(self.registry.ready())
+
+    def test_not_ready_while_loading(self):
+        """
+        test case 3: the registry is not ready while a model waits for its warmup, the others do not count
+        """
+        release = threading.Event()
+        self.registry.warmups["image"] = lambda: release.wait(5)
+
+        thread = self.registry.start_warmup(["image"])
+        self.assertFalse(self.registry.ready())
+        self.assertEqual(self.registry.status()["whisper"]["state"], NOT_LOADED)
+
+        release.set()
+        thread.join(5)
+        self.assertEqual(self.registry.status()["image"]["state"], READY)
+        self.assertTrue(self.registry.ready())
+
+    def test_single_warmup(self):
+        """
+        test case 4: only the first call starts a warmup and unknown models are rejected
+        """
+        with self.assertRaises(ValueError):
+            self.registry.start_warmup(["image", "unknown"])
+        self.assertEqual(self.registry.status()["image"]["state"], NOT_LOADED)
+
+        first = self.registry.start_warmup(background=False)
+        second = self.registry.start_warmup(background=False)
+
+        self.assertIs(first, second)
+        self.assertEqual(self.calls, ["image", "whisper"])
+
+
+if __name__ == "__main__":
+    unittest.main()